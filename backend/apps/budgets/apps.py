@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class BudgetsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.budgets'
\ No newline at end of file
+    name = 'apps.budgets'
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.budgets.models import MonthlyBudget
+from apps.budgets.services import BudgetService
+from apps.common.date_utils import shift_month
+
+
+class Command(BaseCommand):
+    help = 'Recalcular el gasto de los presupuestos y corregir desviaciones de los deltas incrementales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--año', type=int, dest='año', help='Año a reconciliar')
+        parser.add_argument('--mes', type=int, help='Mes a reconciliar (1-12)')
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Reconciliar todos los meses con presupuestos activos'
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            periodos = MonthlyBudget.objects.filter(activo=True).values_list('año', 'mes').distinct().order_by('año', 'mes')
+        elif options['año'] and options['mes']:
+            periodos = [(options['año'], options['mes'])]
+        else:
+            # Por defecto el mes actual y el anterior, que son los que reciben gastos
+            today = timezone.localdate()
+            periodos = [shift_month(today.year, today.month, -1), (today.year, today.month)]
+
+        total = 0
+        for año, mes in periodos:
+            corrected = BudgetService.reconcile_month(año, mes)
+            total += corrected
+            self.stdout.write(f'{mes}/{año}: {corrected} presupuestos corregidos')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Reconciliación completada ({total} correcciones)'))
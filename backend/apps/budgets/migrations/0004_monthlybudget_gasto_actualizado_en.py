@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0003_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlybudget',
+            name='gasto_actualizado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -3,7 +3,7 @@ from django.contrib.auth.models import User
 from apps.categories.models import Category
 from decimal import Decimal
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
 from apps.common.mixins import ProgressMixin
 
 class MonthlyBudget(models.Model, ProgressMixin):
@@ -13,6 +13,8 @@ class MonthlyBudget(models.Model, ProgressMixin):
     mes = models.IntegerField()  # 1-12
     presupuesto_total = models.DecimalField(max_digits=12, decimal_places=2)
     gastado_actual = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Último recálculo completo del gasto; entre recálculos se aplican deltas
+    gasto_actualizado_en = models.DateTimeField(null=True, blank=True)
     activo = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -52,7 +54,6 @@ class MonthlyBudget(models.Model, ProgressMixin):
             else:
                 ultimo_dia = datetime(self.año, self.mes + 1, 1).date()
             
-            from datetime import timedelta
             ultimo_dia = ultimo_dia - timedelta(days=1)
             return (ultimo_dia - today).days + 1
         return 0
@@ -63,6 +64,12 @@ class MonthlyBudget(models.Model, ProgressMixin):
         if dias_restantes > 0:
             return self.presupuesto_restante / dias_restantes
         return 0
+    
+    def puede_refrescar_gasto(self, intervalo_segundos):
+        """Indica si pasó el intervalo mínimo desde el último recálculo completo"""
+        if self.gasto_actualizado_en is None:
+            return True
+        return timezone.now() - self.gasto_actualizado_en >= timedelta(seconds=intervalo_segundos)
 
 class CategoryBudget(models.Model, ProgressMixin):
     """Presupuesto por categoría dentro de un presupuesto mensual"""
@@ -51,12 +51,12 @@ class MonthlyBudgetSerializer(serializers.ModelSerializer):
     class Meta:
         model = MonthlyBudget
         fields = [
-            'id', 'año', 'mes', 'presupuesto_total', 'gastado_actual', 'activo',
-            'category_budgets', 'porcentaje_gastado', 'presupuesto_restante',
+            'id', 'año', 'mes', 'presupuesto_total', 'gastado_actual',
+            'gasto_actualizado_en', 'activo', 'category_budgets', 'porcentaje_gastado', 'presupuesto_restante',
             'esta_excedido', 'dias_restantes_mes', 'presupuesto_diario_sugerido',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'gastado_actual', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'gastado_actual', 'gasto_actualizado_en', 'created_at', 'updated_at']
     
     def create(self, validated_data):
         validated_data['usuario'] = self.context['request'].user
@@ -74,6 +74,7 @@ class MonthlyBudgetSerializer(serializers.ModelSerializer):
                 'mes': instance.mes if hasattr(instance, 'mes') else 0,
                 'presupuesto_total': float(instance.presupuesto_total) if hasattr(instance, 'presupuesto_total') else 0,
                 'gastado_actual': float(instance.gastado_actual) if hasattr(instance, 'gastado_actual') else 0,
+                'gasto_actualizado_en': getattr(instance, 'gasto_actualizado_en', None),
                 'activo': instance.activo if hasattr(instance, 'activo') else True,
                 'category_budgets': [],
                 'porcentaje_gastado': getattr(instance, 'porcentaje_gastado', 0),
@@ -0,0 +1,342 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import F, Prefetch, Sum
+from django.utils import timezone
+from apps.common.date_utils import get_month_date_range
+from apps.common.budget_utils import check_budget_alert_needed
+from apps.common.cache_utils import bump_user_cache_version
+from .models import MonthlyBudget, CategoryBudget, BudgetAlert
+
+
+class BudgetService:
+    """Servicio para mantener el gasto acumulado de los presupuestos"""
+
+    @staticmethod
+    def apply_expense_change(usuario, previous=None, current=None):
+        """
+        Aplicar a los presupuestos la diferencia entre el estado anterior y el
+        nuevo de un gasto. ``previous`` y ``current`` son tuplas
+        ``(fecha, categoria_id, monto)``; ``None`` indica creación o eliminación.
+        """
+        monthly_deltas = defaultdict(Decimal)
+        category_deltas = defaultdict(Decimal)
+
+        for state, sign in ((previous, -1), (current, 1)):
+            if state is None:
+                continue
+            fecha, categoria_id, monto = state
+            monthly_deltas[(fecha.year, fecha.month)] += sign * monto
+            if categoria_id:
+                category_deltas[(fecha.year, fecha.month, categoria_id)] += sign * monto
+
+        for (año, mes), delta in monthly_deltas.items():
+            if delta:
+                MonthlyBudget.objects.filter(
+                    usuario=usuario, año=año, mes=mes, activo=True
+                ).update(gastado_actual=F('gastado_actual') + delta)
+
+        for (año, mes, categoria_id), delta in category_deltas.items():
+            if not delta:
+                continue
+            category_budgets = CategoryBudget.objects.filter(
+                presupuesto_mensual__usuario=usuario,
+                presupuesto_mensual__año=año,
+                presupuesto_mensual__mes=mes,
+                presupuesto_mensual__activo=True,
+                categoria_id=categoria_id
+            )
+            updated = category_budgets.update(gastado_actual=F('gastado_actual') + delta)
+
+            # Solo un aumento del gasto puede disparar una alerta nueva
+            if updated and delta > 0:
+                for category_budget in category_budgets.filter(
+                    gastado_actual__gte=F('limite_asignado') * F('alerta_porcentaje') / 100
+                ).select_related('presupuesto_mensual__usuario', 'categoria'):
+                    BudgetService.check_category_alerts(category_budget)
+
+    @staticmethod
+    def check_category_alerts(category_budget):
+        """Crear una alerta para la categoría si superó el umbral y no hay una de hoy"""
+        needs_alert = check_budget_alert_needed(
+            category_budget.gastado_actual,
+            category_budget.limite_asignado,
+            category_budget.alerta_porcentaje
+        )
+        if not needs_alert:
+            return None
+
+        usuario = category_budget.presupuesto_mensual.usuario
+        existing_alert = BudgetAlert.objects.filter(
+            usuario=usuario,
+            presupuesto_categoria=category_budget,
+            activa=True,
+            created_at__date=timezone.localdate()
+        ).exists()
+        if existing_alert:
+            return None
+
+        return BudgetAlert.objects.create(**BudgetService.build_category_alert(category_budget))
+
+    @staticmethod
+    def check_category_alerts_bulk(category_budgets):
+        """
+        Versión por lotes de check_category_alerts: una consulta para las
+        alertas de hoy y un bulk_create para las nuevas.
+
+        Returns:
+            list: Alertas creadas
+        """
+        candidates = [
+            category_budget for category_budget in category_budgets
+            if check_budget_alert_needed(
+                category_budget.gastado_actual,
+                category_budget.limite_asignado,
+                category_budget.alerta_porcentaje
+            )
+        ]
+        if not candidates:
+            return []
+
+        already_alerted = set(BudgetAlert.objects.filter(
+            presupuesto_categoria__in=candidates,
+            activa=True,
+            created_at__date=timezone.localdate()
+        ).values_list('presupuesto_categoria_id', flat=True))
+
+        return BudgetAlert.objects.bulk_create([
+            BudgetAlert(**BudgetService.build_category_alert(category_budget))
+            for category_budget in candidates
+            if category_budget.id not in already_alerted
+        ])
+
+    @staticmethod
+    def build_category_alert(category_budget):
+        """Datos de la alerta de una categoría que superó su umbral"""
+        alert_type = 'category_exceeded' if category_budget.esta_excedido else 'category_warning'
+        return {
+            'usuario': category_budget.presupuesto_mensual.usuario,
+            'tipo': alert_type,
+            'presupuesto_categoria': category_budget,
+            'mensaje': f"Has gastado {category_budget.porcentaje_gastado:.1f}% de tu presupuesto en {category_budget.categoria.nombre}",
+            'porcentaje_gastado': Decimal(str(category_budget.porcentaje_gastado)),
+            'monto_excedido': max(category_budget.gastado_actual - category_budget.limite_asignado, 0),
+        }
+
+    @staticmethod
+    def summary_budget(usuario, today):
+        """Presupuesto del mes con sus categorías, o None si no existe"""
+        return MonthlyBudget.objects.prefetch_related(
+            Prefetch(
+                'category_budgets',
+                queryset=CategoryBudget.objects.select_related('categoria')
+            )
+        ).filter(usuario=usuario, año=today.year, mes=today.month).first()
+
+    @staticmethod
+    def summary_alerts(usuario, today):
+        """Alertas activas creadas en el mes"""
+        return list(BudgetAlert.objects.filter(
+            usuario=usuario,
+            activa=True,
+            created_at__month=today.month,
+            created_at__year=today.year
+        ).select_related('presupuesto_categoria__categoria'))
+
+    @staticmethod
+    def build_summary(budget, alertas):
+        """
+        Armar el resumen de presupuestos sobre el presupuesto y las alertas ya
+        cargados, sin más consultas.
+
+        Returns:
+            dict: Datos para BudgetSummarySerializer
+        """
+        # Estadísticas sobre los presupuestos por categoría ya cargados
+        category_budgets = list(budget.category_budgets.all())
+        categorias_excedidas = sum(
+            1 for cb in category_budgets if cb.gastado_actual > cb.limite_asignado
+        )
+        categorias_en_alerta = sum(
+            1 for cb in category_budgets
+            if cb.gastado_actual >= cb.limite_asignado * cb.alerta_porcentaje / 100
+        )
+
+        # Categoría más gastada
+        categoria_mas_gastada = max(
+            category_budgets, key=lambda cb: cb.gastado_actual, default=None
+        )
+        categoria_mas_gastada_data = {}
+        if categoria_mas_gastada:
+            try:
+                categoria_mas_gastada_data = {
+                    'nombre': categoria_mas_gastada.categoria.nombre,
+                    'gastado': float(categoria_mas_gastada.gastado_actual),
+                    'limite': float(categoria_mas_gastada.limite_asignado),
+                    'porcentaje': categoria_mas_gastada.porcentaje_gastado
+                }
+            except Exception:
+                categoria_mas_gastada_data = {}
+
+        # Recomendaciones
+        try:
+            recomendaciones = BudgetService.generate_recommendations(budget)
+        except Exception:
+            recomendaciones = []
+
+        return {
+            'presupuesto_mensual': budget,
+            'alertas_activas': alertas,
+            'categorias_excedidas': categorias_excedidas,
+            'categorias_en_alerta': categorias_en_alerta,
+            'categoria_mas_gastada': categoria_mas_gastada_data,
+            'recomendaciones': recomendaciones
+        }
+
+    @staticmethod
+    def generate_recommendations(budget):
+        """Generar recomendaciones basadas en el presupuesto"""
+        recomendaciones = []
+
+        try:
+            # Recomendación general
+            if hasattr(budget, 'esta_excedido') and budget.esta_excedido:
+                exceso = budget.gastado_actual - budget.presupuesto_total
+                recomendaciones.append({
+                    'tipo': 'warning',
+                    'titulo': 'Presupuesto mensual excedido',
+                    'mensaje': f'Has excedido tu presupuesto mensual por ${exceso:.2f}. Considera revisar tus gastos.'
+                })
+            elif hasattr(budget, 'porcentaje_gastado') and budget.porcentaje_gastado > 80:
+                dias_restantes = getattr(budget, 'dias_restantes_mes', 0)
+                recomendaciones.append({
+                    'tipo': 'caution',
+                    'titulo': 'Presupuesto casi agotado',
+                    'mensaje': f'Has gastado {budget.porcentaje_gastado:.1f}% de tu presupuesto. Te quedan {dias_restantes} días del mes.'
+                })
+
+            # Recomendaciones por categoría - usa los presupuestos ya cargados
+            try:
+                category_budgets = sorted(
+                    (cb for cb in budget.category_budgets.all() if cb.gastado_actual > 0),
+                    key=lambda cb: cb.porcentaje_gastado,
+                    reverse=True
+                )[:3]
+                for cat_budget in category_budgets:
+                    try:
+                        if hasattr(cat_budget, 'esta_excedido') and cat_budget.esta_excedido:
+                            exceso = cat_budget.gastado_actual - cat_budget.limite_asignado
+                            categoria_nombre = getattr(cat_budget.categoria, 'nombre', 'Categoría')
+                            recomendaciones.append({
+                                'tipo': 'category_exceeded',
+                                'titulo': f'{categoria_nombre} excedida',
+                                'mensaje': f'Has excedido el presupuesto de {categoria_nombre} por ${exceso:.2f}'
+                            })
+                        elif hasattr(cat_budget, 'necesita_alerta') and cat_budget.necesita_alerta:
+                            categoria_nombre = getattr(cat_budget.categoria, 'nombre', 'Categoría')
+                            porcentaje = getattr(cat_budget, 'porcentaje_gastado', 0)
+                            recomendaciones.append({
+                                'tipo': 'category_warning',
+                                'titulo': f'Cuidado con {categoria_nombre}',
+                                'mensaje': f'Has gastado {porcentaje:.1f}% del presupuesto en {categoria_nombre}'
+                            })
+                    except Exception:
+                        continue
+            except Exception:
+                pass
+
+        except Exception:
+            pass
+
+        return recomendaciones
+
+    @staticmethod
+    def refresh_budget_spending(budget):
+        """
+        Recalcular desde cero el gasto de un presupuesto mensual y de todas sus
+        categorías con un número constante de consultas: una agregación, un
+        UPDATE del presupuesto, un bulk_update de categorías y la revisión de
+        alertas por lotes.
+        """
+        from apps.transactions.models import Expense
+
+        start_date, end_date = get_month_date_range(budget.año, budget.mes)
+        gastos_por_categoria = {
+            row['categoria_id']: row['total']
+            for row in Expense.objects.filter(
+                usuario_id=budget.usuario_id,
+                fecha__range=[start_date, end_date]
+            ).values('categoria_id').annotate(total=Sum('monto')).order_by()
+        }
+
+        budget.gastado_actual = sum(gastos_por_categoria.values(), Decimal('0'))
+        budget.gasto_actualizado_en = timezone.now()
+        budget.save(update_fields=['gastado_actual', 'gasto_actualizado_en', 'updated_at'])
+
+        category_budgets = list(
+            budget.category_budgets.select_related('categoria', 'presupuesto_mensual__usuario')
+        )
+        for category_budget in category_budgets:
+            category_budget.gastado_actual = gastos_por_categoria.get(category_budget.categoria_id, Decimal('0'))
+        CategoryBudget.objects.bulk_update(category_budgets, ['gastado_actual'], batch_size=500)
+
+        BudgetService.check_category_alerts_bulk(category_budgets)
+        # bulk_update/bulk_create no disparan señales
+        bump_user_cache_version(budget.usuario_id)
+        return category_budgets
+
+    @staticmethod
+    def reconcile_month(año, mes, batch_size=500):
+        """
+        Recalcular desde cero el gasto de los presupuestos activos de un mes y
+        corregir los que se hayan desviado de los deltas aplicados.
+
+        Returns:
+            int: Cantidad de presupuestos (mensuales y por categoría) corregidos
+        """
+        from apps.transactions.models import Expense
+
+        start_date, end_date = get_month_date_range(año, mes)
+        budgets = MonthlyBudget.objects.filter(año=año, mes=mes, activo=True).order_by('id')
+        corrected = 0
+        last_id = 0
+
+        while True:
+            batch = list(
+                budgets.filter(id__gt=last_id).prefetch_related('category_budgets')[:batch_size]
+            )
+            if not batch:
+                return corrected
+            last_id = batch[-1].id
+
+            usuario_ids = [budget.usuario_id for budget in batch]
+            totals = defaultdict(Decimal)
+            category_totals = {}
+            for row in Expense.objects.filter(
+                usuario_id__in=usuario_ids,
+                fecha__range=[start_date, end_date]
+            ).values('usuario_id', 'categoria_id').annotate(total=Sum('monto')).order_by():
+                totals[row['usuario_id']] += row['total']
+                category_totals[(row['usuario_id'], row['categoria_id'])] = row['total']
+
+            drifted_budgets = []
+            drifted_categories = []
+            affected_users = set()
+            for budget in batch:
+                expected = totals[budget.usuario_id]
+                if budget.gastado_actual != expected:
+                    budget.gastado_actual = expected
+                    drifted_budgets.append(budget)
+                    affected_users.add(budget.usuario_id)
+
+                for category_budget in budget.category_budgets.all():
+                    expected = category_totals.get((budget.usuario_id, category_budget.categoria_id), Decimal('0'))
+                    if category_budget.gastado_actual != expected:
+                        category_budget.gastado_actual = expected
+                        drifted_categories.append(category_budget)
+                        affected_users.add(budget.usuario_id)
+
+            MonthlyBudget.objects.bulk_update(drifted_budgets, ['gastado_actual'])
+            CategoryBudget.objects.bulk_update(drifted_categories, ['gastado_actual'])
+            for usuario_id in affected_users:
+                bump_user_cache_version(usuario_id)
+            corrected += len(drifted_budgets) + len(drifted_categories)
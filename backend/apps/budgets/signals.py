@@ -0,0 +1,19 @@
+"""
+Signal handlers for budget models.
+"""
+from apps.common.cache_utils import invalidate_user_cache_on_change
+from .models import MonthlyBudget, CategoryBudget, BudgetAlert
+
+
+def _category_budget_user_id(instance):
+    budget = instance._state.fields_cache.get('presupuesto_mensual')
+    if budget is not None:
+        return budget.usuario_id
+    return MonthlyBudget.objects.filter(
+        pk=instance.presupuesto_mensual_id
+    ).values_list('usuario_id', flat=True).first()
+
+
+invalidate_user_cache_on_change(MonthlyBudget, lambda instance: instance.usuario_id)
+invalidate_user_cache_on_change(CategoryBudget, _category_budget_user_id)
+invalidate_user_cache_on_change(BudgetAlert, lambda instance: instance.usuario_id)
@@ -123,3 +123,71 @@ class TestBudgetsAPI:
 
         response = authenticated_client.get(f'/api/budgets/monthly/{budget.id}/')
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestBudgetSummaryAPI:
+    """Tests para el resumen de presupuestos como lectura pura"""
+
+    def create_current_budget(self, user, num_categories):
+        from django.utils import timezone
+        from apps.categories.models import Category
+
+        today = timezone.now().date()
+        budget = MonthlyBudget.objects.create(
+            usuario=user,
+            año=today.year,
+            mes=today.month,
+            presupuesto_total=Decimal('3000'),
+            gastado_actual=Decimal('900')
+        )
+        for i in range(num_categories):
+            categoria = Category.objects.create(nombre=f'Categoría {i}', color='#000000')
+            CategoryBudget.objects.create(
+                presupuesto_mensual=budget,
+                categoria=categoria,
+                limite_asignado=Decimal('100'),
+                gastado_actual=Decimal(str(i * 10))
+            )
+        return budget
+
+    @pytest.mark.parametrize('num_categories', [1, 20])
+    def test_summary_is_read_only_with_bounded_queries(self, authenticated_client, user, num_categories):
+        """Verifica que summary no escribe y su costo no depende de las categorías"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.create_current_budget(user, num_categories)
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get('/api/budgets/monthly/summary/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['presupuesto_mensual']['category_budgets']) == num_categories
+        statements = [query['sql'].split()[0].upper() for query in context.captured_queries]
+        assert statements.count('SELECT') <= 6
+        assert not {'INSERT', 'UPDATE', 'DELETE'} & set(statements)
+
+    def test_summary_recommends_top_categories(self, authenticated_client, user):
+        """Verifica que las recomendaciones por categoría se generan"""
+        self.create_current_budget(user, 12)
+
+        response = authenticated_client.get('/api/budgets/monthly/summary/')
+
+        tipos = [item['tipo'] for item in response.data['recomendaciones']]
+        assert tipos.count('category_exceeded') + tipos.count('category_warning') == 3
+        assert response.data['categorias_excedidas'] == 1
+
+    def test_refresh_spending_is_rate_limited(self, authenticated_client, user, category):
+        """Verifica que el recálculo explícito se limita por intervalo"""
+        budget = self.create_current_budget(user, 0)
+        Expense.objects.create(usuario=user, categoria=category, monto=Decimal('250'), fecha=date.today())
+
+        response = authenticated_client.post(f'/api/budgets/monthly/{budget.id}/refresh_spending/')
+        assert response.status_code == status.HTTP_200_OK
+        assert Decimal(response.data['gastado_actual']) == Decimal('250')
+        assert response.data['gasto_actualizado_en'] is not None
+
+        response = authenticated_client.post(f'/api/budgets/monthly/{budget.id}/refresh_spending/')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert 'Retry-After' in response
@@ -0,0 +1,55 @@
+import pytest
+from decimal import Decimal
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient
+from django.urls import include, path
+from django.utils import timezone
+from apps.budgets.models import MonthlyBudget, CategoryBudget
+from apps.budgets.views import summary_async
+
+# Las vistas async solo se enrutan con ASYNC_VIEWS; aquí se montan aparte
+urlpatterns = [
+    path('async/summary/', summary_async),
+    path('', include('finance_api.urls')),
+]
+
+
+async def async_get(client, url):
+    return await client.get(url)
+
+
+@pytest.mark.urls(__name__)
+@pytest.mark.django_db(transaction=True)
+class TestBudgetSummaryAsync:
+    """Tests para la versión async del resumen de presupuestos"""
+
+    def test_matches_sync_summary(self, user, category, authenticated_client):
+        """Verifica que la versión async devuelve lo mismo que la acción síncrona"""
+        today = timezone.now().date()
+        budget = MonthlyBudget.objects.create(
+            usuario=user, año=today.year, mes=today.month, presupuesto_total=Decimal('1000')
+        )
+        CategoryBudget.objects.create(
+            presupuesto_mensual=budget, categoria=category,
+            limite_asignado=Decimal('100'), gastado_actual=Decimal('120')
+        )
+        expected = authenticated_client.get('/api/budgets/monthly/summary/').json()
+        cache.clear()
+
+        client = AsyncClient()
+        client.force_login(user)
+        response = async_to_sync(async_get)(client, '/async/summary/')
+
+        assert response.status_code == 200
+        assert response.json() == expected
+        assert expected['categorias_excedidas'] == 1
+
+    def test_without_budget(self, user):
+        """Verifica la respuesta cuando no hay presupuesto del mes"""
+        client = AsyncClient()
+        client.force_login(user)
+
+        response = async_to_sync(async_get)(client, '/async/summary/')
+
+        assert response.status_code == 404
@@ -0,0 +1,149 @@
+import pytest
+from decimal import Decimal
+from datetime import date
+from django.core.management import call_command
+from apps.budgets.models import MonthlyBudget, CategoryBudget
+from apps.budgets.services import BudgetService
+from apps.transactions.models import Expense
+
+
+@pytest.fixture
+def budgets(user, categories):
+    """Presupuestos de enero y febrero con límite por categoría"""
+    result = {}
+    for mes in (1, 2):
+        monthly = MonthlyBudget.objects.create(
+            usuario=user, año=2024, mes=mes, presupuesto_total=Decimal('1000')
+        )
+        result[mes] = {
+            'mensual': monthly,
+            'categorias': [
+                CategoryBudget.objects.create(
+                    presupuesto_mensual=monthly, categoria=categoria, limite_asignado=Decimal('500')
+                )
+                for categoria in categories[:2]
+            ]
+        }
+    return result
+
+
+def refreshed(instance):
+    instance.refresh_from_db()
+    return instance.gastado_actual
+
+
+@pytest.mark.django_db
+class TestBudgetDeltas:
+    """Tests para la actualización incremental del gasto de presupuestos"""
+
+    def test_create_update_delete_via_api(self, authenticated_client, budgets, categories):
+        """Verifica create, cambio de mes/categoría y delete a través de la API"""
+        response = authenticated_client.post('/api/transactions/gastos/', {
+            'categoria': categories[0].id, 'monto': '100.00', 'fecha': '2024-01-10'
+        }, format='json')
+        assert response.status_code == 201
+        expense_id = response.data['id']
+
+        assert refreshed(budgets[1]['mensual']) == Decimal('100')
+        assert refreshed(budgets[1]['categorias'][0]) == Decimal('100')
+
+        response = authenticated_client.patch(f'/api/transactions/gastos/{expense_id}/', {
+            'categoria': categories[1].id, 'monto': '40.00', 'fecha': '2024-02-03'
+        }, format='json')
+        assert response.status_code == 200
+
+        assert refreshed(budgets[1]['mensual']) == Decimal('0')
+        assert refreshed(budgets[1]['categorias'][0]) == Decimal('0')
+        assert refreshed(budgets[2]['mensual']) == Decimal('40')
+        assert refreshed(budgets[2]['categorias'][1]) == Decimal('40')
+
+        response = authenticated_client.delete(f'/api/transactions/gastos/{expense_id}/')
+        assert response.status_code == 204
+
+        assert refreshed(budgets[2]['mensual']) == Decimal('0')
+        assert refreshed(budgets[2]['categorias'][1]) == Decimal('0')
+
+    def test_same_bucket_update_is_single_delta(self, user, budgets, categories, django_assert_num_queries):
+        """Verifica que editar el monto en el mismo mes y categoría cuesta dos UPDATE"""
+        BudgetService.apply_expense_change(
+            user, current=(date(2024, 1, 10), categories[0].id, Decimal('150'))
+        )
+
+        # Una reducción no necesita revisar alertas
+        with django_assert_num_queries(2):
+            BudgetService.apply_expense_change(
+                user,
+                previous=(date(2024, 1, 10), categories[0].id, Decimal('150')),
+                current=(date(2024, 1, 12), categories[0].id, Decimal('100'))
+            )
+
+        assert refreshed(budgets[1]['mensual']) == Decimal('100')
+        assert refreshed(budgets[1]['categorias'][0]) == Decimal('100')
+
+    def test_delta_crossing_threshold_creates_alert(self, user, budgets, categories):
+        """Verifica que se crea una alerta al superar el umbral de la categoría"""
+        BudgetService.apply_expense_change(
+            user, current=(date(2024, 1, 10), categories[0].id, Decimal('450'))
+        )
+
+        category_budget = budgets[1]['categorias'][0]
+        assert category_budget.budgetalert_set.count() == 1
+
+
+@pytest.mark.django_db
+class TestBudgetReconcile:
+    """Tests para la reconciliación periódica"""
+
+    def test_reconcile_fixes_drift(self, user, budgets, categories):
+        """Verifica que la reconciliación corrige gastos desviados"""
+        Expense.objects.create(usuario=user, categoria=categories[0], monto=Decimal('70'), fecha=date(2024, 1, 5))
+        MonthlyBudget.objects.filter(pk=budgets[1]['mensual'].pk).update(gastado_actual=Decimal('999'))
+
+        corrected = BudgetService.reconcile_month(2024, 1)
+
+        assert corrected == 2
+        assert refreshed(budgets[1]['mensual']) == Decimal('70')
+        assert refreshed(budgets[1]['categorias'][0]) == Decimal('70')
+        assert BudgetService.reconcile_month(2024, 1) == 0
+
+    def test_reconcile_command(self, user, budgets, categories):
+        """Verifica el comando de reconciliación"""
+        Expense.objects.create(usuario=user, categoria=categories[1], monto=Decimal('30'), fecha=date(2024, 2, 5))
+
+        call_command('reconcile_budget_spending', '--año', '2024', '--mes', '2')
+
+        assert refreshed(budgets[2]['categorias'][1]) == Decimal('30')
+
+
+@pytest.mark.django_db
+class TestBudgetRefresh:
+    """Tests para el recálculo completo por lotes"""
+
+    def test_refresh_50_categories_constant_queries(self, user, django_assert_max_num_queries):
+        """Verifica que recalcular 50 categorías no hace consultas por categoría"""
+        from apps.budgets.models import BudgetAlert
+        from apps.categories.models import Category
+
+        budget = MonthlyBudget.objects.create(
+            usuario=user, año=2024, mes=1, presupuesto_total=Decimal('10000')
+        )
+        for i in range(50):
+            categoria = Category.objects.create(nombre=f'Categoría {i}', color='#000000')
+            CategoryBudget.objects.create(
+                presupuesto_mensual=budget, categoria=categoria, limite_asignado=Decimal('100')
+            )
+            # La mitad de las categorías supera el umbral del 80%
+            monto = Decimal('90') if i % 2 else Decimal('10')
+            Expense.objects.create(usuario=user, categoria=categoria, monto=monto, fecha=date(2024, 1, 15))
+
+        # Agregación + UPDATE + SELECT categorías + bulk_update + alertas existentes + bulk_create
+        with django_assert_max_num_queries(6):
+            BudgetService.refresh_budget_spending(budget)
+
+        assert refreshed(budget) == Decimal('2500')
+        assert BudgetAlert.objects.filter(usuario=user).count() == 25
+
+        # Un segundo recálculo el mismo día no duplica alertas
+        with django_assert_max_num_queries(5):
+            BudgetService.refresh_budget_spending(budget)
+        assert BudgetAlert.objects.filter(usuario=user).count() == 25
@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import MonthlyBudgetViewSet, CategoryBudgetViewSet, BudgetAlertViewSet
+from .views import MonthlyBudgetViewSet, CategoryBudgetViewSet, BudgetAlertViewSet, summary_async
 
 router = DefaultRouter()
 router.register(r'monthly', MonthlyBudgetViewSet, basename='monthly-budgets')
@@ -9,4 +10,8 @@ router.register(r'alerts', BudgetAlertViewSet, basename='budget-alerts')
 
 urlpatterns = [
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_VIEWS:
+    # Antes que la ruta de la acción summary del router
+    urlpatterns.insert(0, path('monthly/summary/', summary_async, name='monthly-budgets-summary-async'))
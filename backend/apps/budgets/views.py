@@ -2,21 +2,23 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
 from django.utils import timezone
-from django.db.models import Sum, Q, F
-from django.db import models
 from decimal import Decimal
 from .models import MonthlyBudget, CategoryBudget, BudgetAlert
+from .services import BudgetService
 from .serializers import (
     MonthlyBudgetSerializer, CategoryBudgetSerializer, 
     BudgetAlertSerializer, BudgetSummarySerializer
 )
-from apps.transactions.models import Expense
 from apps.categories.models import Category
-from apps.common.date_utils import get_month_date_range
-from apps.common.budget_utils import calculate_budget_spending, check_budget_alert_needed
+from apps.common.async_views import async_api_view, run_concurrently
+from apps.common.budget_utils import calculate_budget_spending
+from apps.common.cache_utils import cache_user_response, ConditionalGetMixin
 
-class MonthlyBudgetViewSet(viewsets.ModelViewSet):
+class MonthlyBudgetViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = MonthlyBudgetSerializer
     permission_classes = [IsAuthenticated]
     
@@ -113,67 +115,23 @@ class MonthlyBudgetViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     @action(detail=False, methods=['get'])
+    @cache_user_response('budgets.summary')
     def summary(self, request):
-        """Obtener resumen completo de presupuestos"""
+        """
+        Obtener resumen completo de presupuestos.
+        
+        Es una lectura pura: el gasto se mantiene con deltas al registrar
+        gastos y se recalcula de forma explícita con refresh_spending.
+        """
         try:
             today = timezone.now().date()
-            
-            try:
-                budget = MonthlyBudget.objects.get(
-                    usuario=request.user,
-                    año=today.year,
-                    mes=today.month
-                )
-            except MonthlyBudget.DoesNotExist:
+            budget = BudgetService.summary_budget(request.user, today)
+            if budget is None:
                 return Response({'message': 'No hay presupuesto para este mes'}, 
                               status=status.HTTP_404_NOT_FOUND)
             
-            # Actualizar gastos antes de mostrar resumen
-            self.update_budget_spending(budget)
-            
-            # Obtener alertas activas
-            alertas = BudgetAlert.objects.filter(
-                usuario=request.user,
-                activa=True,
-                created_at__month=today.month,
-                created_at__year=today.year
-            )
-            
-            # Estadísticas
-            category_budgets = budget.category_budgets.all()
-            categorias_excedidas = category_budgets.filter(gastado_actual__gt=F('limite_asignado')).count()
-            categorias_en_alerta = category_budgets.filter(
-                gastado_actual__gte=F('limite_asignado') * F('alerta_porcentaje') / 100
-            ).count()
-            
-            # Categoría más gastada
-            categoria_mas_gastada = category_budgets.order_by('-gastado_actual').first()
-            categoria_mas_gastada_data = {}
-            if categoria_mas_gastada:
-                try:
-                    categoria_mas_gastada_data = {
-                        'nombre': categoria_mas_gastada.categoria.nombre,
-                        'gastado': float(categoria_mas_gastada.gastado_actual),
-                        'limite': float(categoria_mas_gastada.limite_asignado),
-                        'porcentaje': categoria_mas_gastada.porcentaje_gastado
-                    }
-                except Exception:
-                    categoria_mas_gastada_data = {}
-            
-            # Recomendaciones
-            try:
-                recomendaciones = self.generate_recommendations(budget)
-            except Exception:
-                recomendaciones = []
-            
-            data = {
-                'presupuesto_mensual': MonthlyBudgetSerializer(budget).data,
-                'alertas_activas': BudgetAlertSerializer(alertas, many=True).data,
-                'categorias_excedidas': categorias_excedidas,
-                'categorias_en_alerta': categorias_en_alerta,
-                'categoria_mas_gastada': categoria_mas_gastada_data,
-                'recomendaciones': recomendaciones
-            }
+            alertas = BudgetService.summary_alerts(request.user, today)
+            data = BudgetService.build_summary(budget, alertas)
             
             serializer = BudgetSummarySerializer(data)
             return Response(serializer.data)
@@ -184,41 +142,28 @@ class MonthlyBudgetViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def update_budget_spending(self, budget):
-        """Actualizar gastos del presupuesto mensual"""
-        # Calcular gasto total del mes
-        total_gastado = calculate_budget_spending(
-            budget.usuario,
-            budget.año,
-            budget.mes
-        )
-        
-        budget.gastado_actual = total_gastado
-        budget.save()
-        
-        # Actualizar gastos por categoría - optimized with single query
-        category_budgets = budget.category_budgets.select_related('categoria').all()
-        
-        # Get all expenses grouped by category in one query
-        start_date, end_date = get_month_date_range(budget.año, budget.mes)
-        gastos_por_categoria = Expense.objects.filter(
-            usuario=budget.usuario,
-            fecha__range=[start_date, end_date]
-        ).values('categoria').annotate(
-            total=Sum('monto')
-        )
+    @action(detail=True, methods=['post'])
+    def refresh_spending(self, request, pk=None):
+        """Recalcular el gasto del presupuesto, como máximo una vez por intervalo"""
+        budget = self.get_object()
+        intervalo = settings.BUDGET_SPENDING_REFRESH_INTERVAL
         
-        # Create a dictionary for fast lookup
-        gastos_dict = {item['categoria']: item['total'] for item in gastos_por_categoria}
+        if not budget.puede_refrescar_gasto(intervalo):
+            restante = intervalo - (timezone.now() - budget.gasto_actualizado_en).total_seconds()
+            response = Response(
+                {'error': 'El gasto se recalculó recientemente, intenta más tarde'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = str(max(int(restante), 1))
+            return response
         
-        # Update all category budgets
-        for category_budget in category_budgets:
-            gasto_categoria = gastos_dict.get(category_budget.categoria.id, Decimal('0'))
-            category_budget.gastado_actual = gasto_categoria
-            category_budget.save()
-            
-            # Verificar alertas
-            self.check_category_alerts(category_budget)
+        self.update_budget_spending(budget)
+        serializer = self.get_serializer(budget)
+        return Response(serializer.data)
+    
+    def update_budget_spending(self, budget):
+        """Actualizar gastos del presupuesto mensual y de todas sus categorías"""
+        BudgetService.refresh_budget_spending(budget)
     
     def update_category_spending(self, category_budget):
         """Actualizar gastos de una categoría específica"""
@@ -240,89 +185,31 @@ class MonthlyBudgetViewSet(viewsets.ModelViewSet):
     
     def check_category_alerts(self, category_budget):
         """Verificar y crear alertas para categoría"""
-        needs_alert = check_budget_alert_needed(
-            category_budget.gastado_actual,
-            category_budget.limite_asignado,
-            category_budget.alerta_porcentaje
-        )
-        
-        if needs_alert:
-            # Verificar si ya existe una alerta reciente
-            existing_alert = BudgetAlert.objects.filter(
-                usuario=category_budget.presupuesto_mensual.usuario,
-                presupuesto_categoria=category_budget,
-                activa=True,
-                created_at__date=timezone.now().date()
-            ).exists()
-            
-            if not existing_alert:
-                alert_type = 'category_exceeded' if category_budget.esta_excedido else 'category_warning'
-                mensaje = f"Has gastado {category_budget.porcentaje_gastado:.1f}% de tu presupuesto en {category_budget.categoria.nombre}"
-                
-                BudgetAlert.objects.create(
-                    usuario=category_budget.presupuesto_mensual.usuario,
-                    tipo=alert_type,
-                    presupuesto_categoria=category_budget,
-                    mensaje=mensaje,
-                    porcentaje_gastado=Decimal(str(category_budget.porcentaje_gastado)),
-                    monto_excedido=max(category_budget.gastado_actual - category_budget.limite_asignado, 0)
-                )
+        BudgetService.check_category_alerts(category_budget)
     
     def generate_recommendations(self, budget):
         """Generar recomendaciones basadas en el presupuesto"""
-        recomendaciones = []
-        
-        try:
-            # Recomendación general
-            if hasattr(budget, 'esta_excedido') and budget.esta_excedido:
-                exceso = budget.gastado_actual - budget.presupuesto_total
-                recomendaciones.append({
-                    'tipo': 'warning',
-                    'titulo': 'Presupuesto mensual excedido',
-                    'mensaje': f'Has excedido tu presupuesto mensual por ${exceso:.2f}. Considera revisar tus gastos.'
-                })
-            elif hasattr(budget, 'porcentaje_gastado') and budget.porcentaje_gastado > 80:
-                dias_restantes = getattr(budget, 'dias_restantes_mes', 0)
-                recomendaciones.append({
-                    'tipo': 'caution',
-                    'titulo': 'Presupuesto casi agotado',
-                    'mensaje': f'Has gastado {budget.porcentaje_gastado:.1f}% de tu presupuesto. Te quedan {dias_restantes} días del mes.'
-                })
-            
-            # Recomendaciones por categoría - optimized query
-            try:
-                category_budgets = budget.category_budgets.select_related('categoria').filter(
-                    gastado_actual__gt=0
-                ).order_by('-porcentaje_gastado')[:3]
-                for cat_budget in category_budgets:
-                    try:
-                        if hasattr(cat_budget, 'esta_excedido') and cat_budget.esta_excedido:
-                            exceso = cat_budget.gastado_actual - cat_budget.limite_asignado
-                            categoria_nombre = getattr(cat_budget.categoria, 'nombre', 'Categoría')
-                            recomendaciones.append({
-                                'tipo': 'category_exceeded',
-                                'titulo': f'{categoria_nombre} excedida',
-                                'mensaje': f'Has excedido el presupuesto de {categoria_nombre} por ${exceso:.2f}'
-                            })
-                        elif hasattr(cat_budget, 'necesita_alerta') and cat_budget.necesita_alerta:
-                            categoria_nombre = getattr(cat_budget.categoria, 'nombre', 'Categoría')
-                            porcentaje = getattr(cat_budget, 'porcentaje_gastado', 0)
-                            recomendaciones.append({
-                                'tipo': 'category_warning',
-                                'titulo': f'Cuidado con {categoria_nombre}',
-                                'mensaje': f'Has gastado {porcentaje:.1f}% del presupuesto en {categoria_nombre}'
-                            })
-                    except Exception:
-                        continue
-            except Exception:
-                pass
-                
-        except Exception:
-            pass
-        
-        return recomendaciones
+        return BudgetService.generate_recommendations(budget)
+
+@async_api_view('budgets.summary')
+async def summary_async(request):
+    """
+    Versión async del resumen de presupuestos para el modo ASGI: el
+    presupuesto con sus categorías y las alertas se consultan en paralelo.
+    """
+    today = timezone.now().date()
+    budget, alertas = await run_concurrently(
+        lambda: BudgetService.summary_budget(request.user, today),
+        lambda: BudgetService.summary_alerts(request.user, today),
+    )
+    if budget is None:
+        return JsonResponse({'message': 'No hay presupuesto para este mes'}, status=status.HTTP_404_NOT_FOUND)
+    # El serializador puede recorrer relaciones: fuera del event loop
+    return await sync_to_async(
+        lambda: BudgetSummarySerializer(BudgetService.build_summary(budget, alertas)).data
+    )()
 
-class CategoryBudgetViewSet(viewsets.ModelViewSet):
+class CategoryBudgetViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = CategoryBudgetSerializer
     permission_classes = [IsAuthenticated]
     
@@ -332,7 +219,7 @@ class CategoryBudgetViewSet(viewsets.ModelViewSet):
             presupuesto_mensual__usuario=self.request.user
         ).select_related('categoria', 'presupuesto_mensual')
 
-class BudgetAlertViewSet(viewsets.ReadOnlyModelViewSet):
+class BudgetAlertViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = BudgetAlertSerializer
     permission_classes = [IsAuthenticated]
     
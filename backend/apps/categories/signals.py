@@ -0,0 +1,8 @@
+"""
+Signal handlers for category models.
+"""
+from apps.common.cache_utils import invalidate_all_caches_on_change
+from .models import Category
+
+# Las categorías son compartidas y aparecen en las respuestas de todos los usuarios
+invalidate_all_caches_on_change(Category)
@@ -0,0 +1,136 @@
+"""
+Helpers for the async views served in ASGI mode (``finance_api.asgi``).
+
+The ORM is synchronous, so ``run_concurrently`` runs independent queries
+with ``sync_to_async(thread_sensitive=False)``: every call gets a thread and
+a database connection of its own and the queries overlap instead of running
+one after another on the request's connection.
+"""
+import asyncio
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.http.response import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from rest_framework.renderers import JSONRenderer
+from apps.common.cache_utils import (
+    build_response_cache_key, get_conditional_validators, set_conditional_headers
+)
+from apps.common.metrics import record_cache_lookup
+
+
+def _with_own_connection(call):
+    # Same connection handling Django applies around a request: reuse the
+    # thread's connection while CONN_MAX_AGE allows it, close it otherwise
+    @wraps(call)
+    def wrapper():
+        close_old_connections()
+        try:
+            return call()
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+async def run_concurrently(*calls):
+    """
+    Run zero-argument callables that use the ORM in parallel threads.
+
+    Returns:
+        list: The results, in the order of ``calls``
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_with_own_connection(call), thread_sensitive=False)()
+        for call in calls
+    ))
+
+
+async def _iterate_in_request_thread(iterator):
+    # thread_sensitive: the ASGI handler serves each request (and its
+    # streaming body) from one sync thread, so the iterator keeps using the
+    # connection and the server-side cursor it opened there
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    try:
+        while True:
+            chunk = await next_chunk(iterator, done)
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        if hasattr(iterator, 'close'):
+            await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def streaming_content(request, iterator):
+    """
+    Adapt a sync generator for a ``StreamingHttpResponse``. Under ASGI Django
+    would consume a sync iterator with ``sync_to_async(list)``, building the
+    whole body in memory before sending it; an async iterator that pulls one
+    chunk at a time keeps the response streaming.
+    """
+    if isinstance(request, ASGIRequest):
+        return _iterate_in_request_thread(iter(iterator))
+    return iterator
+
+
+def render_json(data):
+    """Serialize like the DRF views do, so both versions return the same body."""
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json')
+
+
+def async_api_view(cache_endpoint=None):
+    """
+    Turn ``async def view(request)`` returning plain data into a GET JSON
+    endpoint with the session authentication of the API, the per-user
+    response cache of ``cache_user_response`` and the ETag/304 handling of
+    ``ConditionalGetMixin``. Cache keys and validators are the same, so the
+    sync and async versions of an endpoint share their entries and ETags.
+
+    The view may also return an ``HttpResponse`` (errors), which is sent
+    as is and not cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return HttpResponseNotAllowed(['GET'])
+            user = await sync_to_async(get_user)(request)
+            if not user.is_authenticated:
+                return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+            request.user = user
+
+            validators = None
+            if settings.CONDITIONAL_GET_ENABLED:
+                validators = await sync_to_async(get_conditional_validators)(user.pk)
+                etag, last_modified = validators
+                if get_conditional_response(request, etag=etag, last_modified=last_modified) is not None:
+                    response = HttpResponse(status=304)
+                    set_conditional_headers(response, validators)
+                    return response
+
+            key = None
+            data = None
+            if cache_endpoint:
+                key = await sync_to_async(build_response_cache_key)(user.pk, cache_endpoint, request.GET)
+                data = await cache.aget(key)
+                record_cache_lookup(cache_endpoint, data is not None)
+
+            if data is None:
+                data = await view(request, *args, **kwargs)
+                if isinstance(data, HttpResponseBase):
+                    return data
+                if key is not None:
+                    await cache.aset(key, data, settings.API_CACHE_TIMEOUT)
+
+            response = render_json(data)
+            if validators is not None:
+                set_conditional_headers(response, validators)
+            return response
+        return wrapper
+    return decorator
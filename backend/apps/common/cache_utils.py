@@ -0,0 +1,251 @@
+"""
+Per-user response caching with write-driven invalidation.
+
+Every user has a generation counter stored in the cache. Cached responses are
+keyed by that generation, so bumping it after a write makes all of the
+user's cached responses unreachable without having to know their keys. A
+global generation covers shared data such as categories.
+
+The same generations back the ETag/Last-Modified validators of
+``ConditionalGetMixin``.
+"""
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+from apps.common.metrics import record_cache_lookup
+
+GLOBAL_SCOPE = 'global'
+
+
+def _version_key(scope):
+    return f'user-cache-version:{scope}'
+
+
+def _modified_key(scope):
+    return f'user-cache-modified:{scope}'
+
+
+def _get_version(scope):
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_user_cache_version(user_id):
+    """
+    Return the current cache generation of a user, creating it if needed.
+
+    New generations start from a millisecond timestamp so that a counter lost
+    to eviction or a restart never reuses the value of an older generation.
+    The global generation is part of the value.
+    """
+    return f'{_get_version(GLOBAL_SCOPE)}.{_get_version(user_id)}'
+
+
+def get_user_last_modified(user_id):
+    """
+    Return the timestamp of the last invalidation of a user or of the global
+    scope, or None when it is unknown (e.g. the cache was cleared).
+    """
+    values = cache.get_many([_modified_key(GLOBAL_SCOPE), _modified_key(user_id)]).values()
+    return max(values) if values else None
+
+
+def _bump(scope):
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+    cache.set(_modified_key(scope), int(time.time()), timeout=None)
+
+
+def _bump_scope(scope):
+    _bump(scope)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scope))
+
+
+def bump_user_cache_version(user_id):
+    """
+    Invalidate every cached response of a user.
+
+    The counter is bumped right away and again once the surrounding
+    transaction commits, so a read that races with the write cannot keep
+    caching the pre-commit data under the new generation.
+    """
+    if user_id is None:
+        return
+    _bump_scope(user_id)
+
+
+def bump_global_cache_version():
+    """Invalidate the cached responses of every user."""
+    _bump_scope(GLOBAL_SCOPE)
+
+
+def build_response_cache_key(user_id, endpoint, params):
+    """
+    Build the cache key of an endpoint response for a user.
+
+    Args:
+        user_id (int): User id
+        endpoint (str): Stable endpoint name, e.g. 'transactions.dashboard'
+        params (QueryDict): Request query parameters
+    """
+    items = sorted((key, tuple(params.getlist(key))) for key in params.keys())
+    digest = hashlib.md5(repr(items).encode('utf-8')).hexdigest()
+    version = get_user_cache_version(user_id)
+    return f'api-response:{user_id}:{version}:{endpoint}:{digest}'
+
+
+def cache_user_response(endpoint, timeout=None):
+    """
+    Cache the data of successful responses of a viewset action per user,
+    endpoint and query parameters.
+
+    Args:
+        endpoint (str): Stable endpoint name used in the cache key
+        timeout (int): Seconds to keep the response, API_CACHE_TIMEOUT by default
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = build_response_cache_key(request.user.pk, endpoint, request.query_params)
+            data = cache.get(key)
+            record_cache_lookup(endpoint, data is not None)
+            if data is not None:
+                return Response(data)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(
+                    key,
+                    response.data,
+                    settings.API_CACHE_TIMEOUT if timeout is None else timeout
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_user_cache_on_change(model, get_user_id):
+    """
+    Bump the owner's cache generation whenever an instance of ``model`` is
+    saved or deleted.
+
+    Args:
+        model: Model class to watch
+        get_user_id (callable): Returns the owner's user id for an instance
+    """
+    def handler(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        bump_user_cache_version(get_user_id(instance))
+
+    uid = f'user-cache-invalidation:{model._meta.label}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+def invalidate_all_caches_on_change(model):
+    """
+    Bump the global cache generation whenever an instance of a model shared
+    by all users is saved or deleted.
+    """
+    def handler(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        bump_global_cache_version()
+
+    uid = f'global-cache-invalidation:{model._meta.label}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+class NotModified(Exception):
+    """Raised by ConditionalGetMixin to end a request with a 304 response."""
+
+
+def get_conditional_validators(user_id):
+    """
+    Return the (ETag, Last-Modified timestamp or None) of the data of a user,
+    derived from the user's cache generation.
+    """
+    etag = quote_etag(
+        f'{user_id}-{get_user_cache_version(user_id)}-{timezone.localdate().isoformat()}'
+    )
+    last_modified = get_user_last_modified(user_id)
+    if last_modified is not None:
+        start_of_day = timezone.make_aware(
+            datetime.combine(timezone.localdate(), datetime.min.time())
+        ).timestamp()
+        last_modified = max(last_modified, int(start_of_day))
+    return f'W/{etag}', last_modified
+
+
+def set_conditional_headers(response, validators):
+    """Add the validators returned by ``get_conditional_validators`` to a response."""
+    etag, last_modified = validators
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified support for viewsets whose data belongs to the
+    requesting user.
+
+    Validators come from the user's cache generation, so a matching
+    If-None-Match/If-Modified-Since is answered with 304 before the handler
+    runs: no queries and no serialization. They are read before the handler,
+    so a write that races with the request can only make the validators
+    older than the body, never newer. The current date is part of the ETag
+    because some serializers expose values relative to today.
+
+    The generations are only consistent across workers with a shared cache,
+    so the mixin does nothing unless ``CONDITIONAL_GET_ENABLED`` is set.
+    """
+
+    def get_conditional_validators(self, request):
+        """Return (etag, last_modified timestamp or None) for the request."""
+        return get_conditional_validators(request.user.pk)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_validators = None
+        if not settings.CONDITIONAL_GET_ENABLED:
+            return
+        if request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+            return
+
+        self.conditional_validators = self.get_conditional_validators(request)
+        etag, last_modified = self.conditional_validators
+        if get_conditional_response(request, etag=etag, last_modified=last_modified) is not None:
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=304)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'conditional_validators', None)
+        if validators and response.status_code in (200, 304):
+            set_conditional_headers(response, validators)
+        return response
@@ -1,7 +1,9 @@
 """
 Common date utilities for the finance system.
 """
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
 
 
 def get_month_date_range(year, month):
@@ -23,3 +25,85 @@ def get_month_date_range(year, month):
         end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
     
     return start_date, end_date
+
+
+def shift_month(year, month, offset):
+    """
+    Move a (year, month) pair by a number of months.
+    
+    Args:
+        year (int): The year
+        month (int): The month (1-12)
+        offset (int): Months to move, negative to go backwards
+        
+    Returns:
+        tuple: (year, month) after applying the offset
+    """
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+
+def truncate_date(value, granularity):
+    """
+    Return the first day of the period that contains a date, matching the
+    database ``Trunc`` functions (weeks start on Monday).
+    
+    Args:
+        value (date): The date to truncate
+        granularity (str): One of GRANULARITIES
+        
+    Returns:
+        date: First day of the period
+    """
+    if granularity == 'day':
+        return value
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    if granularity == 'year':
+        return value.replace(month=1, day=1)
+    raise ValueError(f'Unknown granularity: {granularity}')
+
+
+def next_period(value, granularity):
+    """
+    Return the first day of the period that follows a truncated date.
+    
+    Args:
+        value (date): First day of a period
+        granularity (str): One of GRANULARITIES
+        
+    Returns:
+        date: First day of the next period
+    """
+    if granularity == 'day':
+        return value + timedelta(days=1)
+    if granularity == 'week':
+        return value + timedelta(weeks=1)
+    if granularity == 'month':
+        year, month = shift_month(value.year, value.month, 1)
+        return date(year, month, 1)
+    if granularity == 'year':
+        return date(value.year + 1, 1, 1)
+    raise ValueError(f'Unknown granularity: {granularity}')
+
+
+def iter_periods(start, end, granularity):
+    """
+    Yield the first day of every period between two dates, both included.
+    
+    Args:
+        start (date): First date of the range
+        end (date): Last date of the range
+        granularity (str): One of GRANULARITIES
+    """
+    current = truncate_date(start, granularity)
+    while current <= end:
+        yield current
+        try:
+            current = next_period(current, granularity)
+        except (ValueError, OverflowError):
+            # The next period would start after date.max
+            return
@@ -0,0 +1,173 @@
+"""
+Bounded connection pool used by the ``apps.common.pooled_postgresql`` backend.
+
+Each process keeps up to ``max_size`` connections per database alias. A
+thread that asks for a connection while all of them are in use waits up to
+``timeout`` seconds and then fails, instead of opening connections until the
+server runs out of slots. Connections that sat idle are checked before they
+are handed out, since the driver only notices a server-side disconnect on
+the next query. Wait time, timeouts and the number of connections
+in use are exported through ``apps.common.metrics``.
+
+Connections inherited through ``fork`` (``ProcessPoolExecutor`` in the
+management commands) share their socket with the parent, so the child drops
+them without closing and starts with an empty pool.
+"""
+import os
+import threading
+import time
+from collections import deque
+from apps.common.metrics import POOL_CONNECTIONS, POOL_MAX_SIZE, POOL_TIMEOUTS, POOL_WAIT
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Process-local pool of database connections.
+
+    Args:
+        alias (str): Database alias, used as metric label
+        max_size (int): Maximum connections open at the same time
+        timeout (float): Seconds to wait for a free connection
+        max_idle (float): Idle connections older than this are reopened
+        reset (callable): Prepares a returned connection for reuse; returns
+            False when the connection must be closed instead
+        check (callable): Tells whether an idle connection still works
+            (e.g. after a server restart); returns False to discard it
+        check_after (float): Only check connections idle for at least this
+            many seconds, so busy pools do not pay a round trip per checkout
+    """
+
+    def __init__(self, alias, max_size, timeout, max_idle, reset=None, check=None, check_after=0):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.reset = reset
+        self.check = check
+        self.check_after = check_after
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self.in_use = 0
+        POOL_MAX_SIZE.labels(alias).set(max_size)
+
+    def acquire(self, connect):
+        """
+        Take an idle connection or open one with ``connect()``.
+
+        Raises:
+            PoolTimeout: All connections stayed in use for ``timeout`` seconds
+        """
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            POOL_TIMEOUTS.labels(self.alias).inc()
+            raise PoolTimeout(
+                f'No database connection available for "{self.alias}" after {self.timeout}s '
+                f'({self.max_size} in use)'
+            )
+        POOL_WAIT.labels(self.alias).observe(time.perf_counter() - started)
+
+        try:
+            connection = self._take_idle()
+            if connection is None:
+                connection = connect()
+        except BaseException:
+            self._slots.release()
+            raise
+        self._track(1)
+        return connection
+
+    def _take_idle(self):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, released_at = self._idle.pop()
+                POOL_CONNECTIONS.labels(self.alias, 'idle').dec()
+            idle_for = now - released_at
+            if idle_for < self.max_idle and not getattr(connection, 'closed', False):
+                if self.check is None or idle_for < self.check_after or self._works(connection):
+                    return connection
+            self._close(connection)
+
+    def _works(self, connection):
+        try:
+            return self.check(connection)
+        except Exception:
+            return False
+
+    def release(self, connection, discard=False):
+        """Give a connection back; broken or discarded ones are closed."""
+        try:
+            reusable = not discard and not getattr(connection, 'closed', False)
+            if reusable and self.reset is not None:
+                try:
+                    reusable = self.reset(connection)
+                except Exception:
+                    reusable = False
+            if reusable:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+                    POOL_CONNECTIONS.labels(self.alias, 'idle').inc()
+            else:
+                self._close(connection)
+        finally:
+            self._track(-1)
+            self._slots.release()
+
+    def _track(self, delta):
+        with self._lock:
+            self.in_use += delta
+        POOL_CONNECTIONS.labels(self.alias, 'in_use').inc(delta)
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {'max': self.max_size, 'in_use': self.in_use, 'idle': len(self._idle)}
+
+    def close_idle(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            POOL_CONNECTIONS.labels(self.alias, 'idle').dec(len(idle))
+        for connection, _ in idle:
+            self._close(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, **options):
+    """Return the pool of ``alias`` for this process, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(alias, **options)
+        return pool
+
+
+def pool_stats():
+    """Usage of every pool of this process, by alias."""
+    with _pools_lock:
+        return {alias: pool.stats() for alias, pool in _pools.items()}
+
+
+def _forget_pools_after_fork():
+    # The sockets belong to the parent: closing them here would end its sessions
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools_after_fork)
@@ -0,0 +1,134 @@
+"""
+Readiness checks for the load balancer.
+
+``readiness()`` verifies that the instance can actually serve requests:
+the database answers within ``HEALTH_CHECK_DB_TIMEOUT`` seconds, there are
+no unapplied migrations, the cache works and this process' connection pool
+is not exhausted. The result is kept in process memory for
+``HEALTH_CHECK_CACHE_SECONDS`` so frequent probes do not reach the database
+(the Django cache is one of the things being checked, so it cannot hold it).
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from apps.common.db_pool import pool_stats
+
+# A single thread: a probe stuck on a dead database makes the next probes
+# time out too instead of piling up threads and connections
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='readiness')
+_lock = threading.Lock()
+_cached = {'expires': 0.0, 'result': None}
+# Applied migrations do not become unapplied while the process runs
+_migrations_applied = False
+
+
+def check_database_state():
+    """
+    Run the database checks in the probe thread, on its own connection.
+
+    Returns:
+        dict: Result of the connectivity, migrations and saturation checks
+    """
+    global _migrations_applied
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        checks = {'database': {'status': 'ok', 'ms': round((time.perf_counter() - started) * 1000, 1)}}
+
+        if not _migrations_applied:
+            executor = MigrationExecutor(connection)
+            pending = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            _migrations_applied = not pending
+        checks['migrations'] = (
+            {'status': 'ok'} if _migrations_applied
+            else {'status': 'error', 'pending': len(pending)}
+        )
+
+        checks['connections'] = check_connection_saturation(connection)
+        return checks
+    finally:
+        connection.close()
+
+
+def check_connection_saturation(connection):
+    """
+    Usage of this process' pool when the pooled backend is active, plus the
+    share of the server's connection slots in use (PostgreSQL only).
+
+    Only the pool can fail the check: the server-wide count includes every
+    other client of the database, and taking this instance out of rotation
+    would not free any of those connections.
+    """
+    result = {'status': 'ok'}
+    pool = pool_stats().get(connection.alias)
+    if pool:
+        # The probe holds one of the connections, so the pool only counts as
+        # saturated when the probe took one of the last free ones
+        if pool['in_use'] / pool['max'] >= settings.HEALTH_CHECK_DB_SATURATION:
+            result['status'] = 'error'
+        result['pool'] = pool
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM pg_stat_activity')
+            used = cursor.fetchone()[0]
+            cursor.execute('SHOW max_connections')
+            limit = int(cursor.fetchone()[0])
+        result['server'] = {'used': used, 'max': limit}
+    elif not pool:
+        return {'status': 'skipped'}
+    return result
+
+
+def check_cache():
+    token = uuid.uuid4().hex
+    cache.set('health:probe', token, 10)
+    return {'status': 'ok' if cache.get('health:probe') == token else 'error'}
+
+
+def run_checks():
+    future = _executor.submit(check_database_state)
+    try:
+        checks = future.result(timeout=settings.HEALTH_CHECK_DB_TIMEOUT)
+    except TimeoutError:
+        checks = {'database': {'status': 'error', 'error': 'timeout'}}
+    except Exception as e:
+        checks = {'database': {'status': 'error', 'error': str(e)}}
+
+    try:
+        checks['cache'] = check_cache()
+    except Exception as e:
+        checks['cache'] = {'status': 'error', 'error': str(e)}
+
+    healthy = all(check['status'] != 'error' for check in checks.values())
+    return {'status': 'ok' if healthy else 'error', 'checks': checks}
+
+
+def readiness():
+    """
+    Return the readiness result, running the checks at most once every
+    HEALTH_CHECK_CACHE_SECONDS per process.
+
+    Returns:
+        dict: ``status`` ('ok' or 'error') and the detail of each check
+    """
+    with _lock:
+        now = time.monotonic()
+        if _cached['result'] is None or now >= _cached['expires']:
+            _cached['result'] = run_checks()
+            _cached['expires'] = now + settings.HEALTH_CHECK_CACHE_SECONDS
+        return _cached['result']
+
+
+def reset():
+    """Forget the cached result (tests)."""
+    global _migrations_applied
+    with _lock:
+        _cached['result'] = None
+        _migrations_applied = False
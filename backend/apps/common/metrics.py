@@ -0,0 +1,187 @@
+"""
+Prometheus metrics for the API and the background jobs.
+
+Under gunicorn every worker is a separate process, so the metrics use the
+``prometheus_client`` multiprocess mode when ``PROMETHEUS_MULTIPROC_DIR``
+is set: each process writes its values to files in that shared directory
+and the ``/metrics`` endpoint aggregates them at scrape time. The variable
+must be set (and the directory emptied) before the workers start, see
+``start_render.sh`` and ``gunicorn.conf.py``. Management commands run with
+the same variable land in the same directory.
+
+Cache hit ratio per endpoint::
+
+    sum by (endpoint) (rate(finance_cache_requests_total{result="hit"}[5m]))
+      / sum by (endpoint) (rate(finance_cache_requests_total[5m]))
+
+Connection pool saturation::
+
+    finance_db_pool_connections{state="in_use"} / finance_db_pool_max_connections
+"""
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+
+REQUEST_LATENCY = Histogram(
+    'finance_http_request_duration_seconds',
+    'Request latency by view and action',
+    ['view', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'finance_http_request_db_queries',
+    'Database queries per request',
+    ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+REQUEST_DB_TIME = Histogram(
+    'finance_http_request_db_duration_seconds',
+    'Database time per request',
+    ['view'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CACHE_REQUESTS = Counter(
+    'finance_cache_requests_total',
+    'Response and count cache lookups',
+    ['endpoint', 'result'],
+)
+JOB_DURATION = Histogram(
+    'finance_job_duration_seconds',
+    'Background job duration',
+    ['job'],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600),
+)
+JOB_ROWS = Counter(
+    'finance_job_rows_total',
+    'Rows produced by background jobs',
+    ['job', 'kind'],
+)
+JOB_FAILURES = Counter(
+    'finance_job_failures_total',
+    'Background job runs that raised',
+    ['job'],
+)
+JOB_LAST_SUCCESS = Gauge(
+    'finance_job_last_success_timestamp_seconds',
+    'Unix time of the last successful run',
+    ['job'],
+    multiprocess_mode='max',
+)
+POOL_WAIT = Histogram(
+    'finance_db_pool_acquire_wait_seconds',
+    'Time spent waiting for a pooled database connection',
+    ['alias'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+POOL_TIMEOUTS = Counter(
+    'finance_db_pool_timeouts_total',
+    'Requests for a pooled connection that gave up waiting',
+    ['alias'],
+)
+POOL_CONNECTIONS = Gauge(
+    'finance_db_pool_connections',
+    'Pooled database connections by state',
+    ['alias', 'state'],
+    multiprocess_mode='livesum',
+)
+POOL_MAX_SIZE = Gauge(
+    'finance_db_pool_max_connections',
+    'Pool capacity summed over the live processes',
+    ['alias'],
+    multiprocess_mode='livesum',
+)
+
+
+def view_label(request):
+    """
+    Stable label for the view that served a request: ``ExpenseViewSet.dashboard``
+    for viewset actions, the class name for API views and the function name
+    for plain views.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    func = match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return getattr(func, '__name__', 'unknown')
+    actions = getattr(func, 'actions', None)
+    action = actions.get(request.method.lower()) if actions else None
+    return f'{view_class.__name__}.{action}' if action else view_class.__name__
+
+
+def observe_request(request, response, duration, queries=None, db_duration=None):
+    """
+    Record latency, query count and database time of a finished request.
+    The query metrics are skipped when they were not measured.
+    """
+    view = view_label(request)
+    REQUEST_LATENCY.labels(view, request.method, response.status_code).observe(duration)
+    if queries is not None:
+        REQUEST_QUERIES.labels(view).observe(queries)
+        REQUEST_DB_TIME.labels(view).observe(db_duration)
+
+
+def record_cache_lookup(endpoint, hit):
+    CACHE_REQUESTS.labels(endpoint, 'hit' if hit else 'miss').inc()
+
+
+class JobTracker:
+    """Handle yielded by ``track_job`` to count the rows a job produces."""
+
+    def __init__(self, job):
+        self.job = job
+        self.failed = False
+
+    def add_rows(self, kind, count):
+        if count:
+            JOB_ROWS.labels(self.job, kind).inc(count)
+
+    def fail(self):
+        """Count the run as failed when the job handles its own exception."""
+        self.failed = True
+
+
+@contextmanager
+def track_job(job):
+    """
+    Time a background job run and record its outcome.
+
+    Example::
+
+        with track_job('goal_notifications') as tracker:
+            stats = run()
+            tracker.add_rows('goal_deadline', stats['goal_deadline'])
+    """
+    started = time.perf_counter()
+    tracker = JobTracker(job)
+    try:
+        yield tracker
+    except BaseException:
+        JOB_FAILURES.labels(job).inc()
+        raise
+    if tracker.failed:
+        JOB_FAILURES.labels(job).inc()
+        return
+    JOB_DURATION.labels(job).observe(time.perf_counter() - started)
+    JOB_LAST_SUCCESS.labels(job).set_to_current_time()
+
+
+def render_metrics():
+    """
+    Return the metrics in the Prometheus text format, aggregated over all
+    processes when running in multiprocess mode.
+
+    Returns:
+        tuple: (body, content type)
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
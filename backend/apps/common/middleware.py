@@ -0,0 +1,195 @@
+"""
+Per-request SQL profiling.
+
+``QueryProfilingMiddleware`` installs a ``connection.execute_wrapper`` for
+the duration of each sampled request. The wrapper only counts, times and
+tallies the SQL text of every statement (Django keeps parameters apart, so
+the same statement with different values is the same string), which keeps
+the overhead low enough to leave on in production.
+"""
+import json
+import logging
+import random
+import time
+from collections import Counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from apps.common.metrics import observe_request
+
+logger = logging.getLogger('finance_api.sql')
+
+# Characters of SQL kept in log records
+SQL_LOG_LENGTH = 500
+
+
+class QueryProfile:
+    """Query statistics of one request, collected by the execute wrapper."""
+
+    def __init__(self, slow_query_ms, track_statements=True):
+        self.slow_query_ms = slow_query_ms
+        self.track_statements = track_statements
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.duration += elapsed
+            if self.track_statements:
+                self.statements[sql] += 1
+                if elapsed >= self.slow_query_ms:
+                    self.slow_queries.append((sql, elapsed))
+
+    def duplicates(self, threshold):
+        """Statements executed at least ``threshold`` times (likely N+1), most repeated first."""
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+class QueryProfilingMiddleware:
+    """
+    Count queries and database time per request, emit a ``Server-Timing``
+    header and log a structured record for requests that are slow, run too
+    many queries or repeat the same statement (N+1).
+
+    With ``METRICS_ENABLED`` the count, database time and latency of every
+    request also feed the Prometheus histograms in ``apps.common.metrics``;
+    sampling only limits the per-statement tally, the header and the log.
+
+    Streaming responses are measured until their iterator is exhausted or
+    closed, so the queries that produce the body are counted; they get no
+    ``Server-Timing`` header because it is sent before the body.
+
+    Settings:
+        SQL_PROFILING_ENABLED: Turn the profiling off (metrics still work)
+        SQL_PROFILING_SAMPLE_RATE: Fraction of requests profiled (0-1)
+        SQL_PROFILING_SERVER_TIMING: Add the Server-Timing header
+        SQL_PROFILING_SLOW_REQUEST_MS: Log requests slower than this
+        SQL_PROFILING_MAX_QUERIES: Log requests with more queries than this
+        SQL_PROFILING_DUPLICATE_THRESHOLD: Repetitions of a statement reported as N+1
+        SQL_PROFILING_SLOW_QUERY_MS: Include statements slower than this in the record
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SQL_PROFILING_ENABLED and not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample_rate = settings.SQL_PROFILING_SAMPLE_RATE if settings.SQL_PROFILING_ENABLED else 0
+        sampled = sample_rate >= 1 or random.random() < sample_rate
+        if not sampled and not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        profile = QueryProfile(settings.SQL_PROFILING_SLOW_QUERY_MS, track_statements=sampled)
+        started = time.perf_counter()
+        with self.wrap_connections(profile):
+            response = self.get_response(request)
+
+        if response.streaming:
+            # The body (CSV/XLSX export, SSE) is generated after this method
+            # returns: keep profiling until the iterator ends. The headers are
+            # already gone by then, so there is no Server-Timing
+            profile_stream = self.aprofile_stream if response.is_async else self.profile_stream
+            response.streaming_content = profile_stream(
+                request, response, response.streaming_content, profile, started, sampled
+            )
+            return response
+
+        self.finish(request, response, profile, started, sampled, server_timing=True)
+        return response
+
+    def wrap_connections(self, profile):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile))
+        return stack
+
+    def profile_stream(self, request, response, content, profile, started, sampled):
+        try:
+            with self.wrap_connections(profile):
+                yield from content
+        finally:
+            self.finish(request, response, profile, started, sampled, server_timing=False)
+
+    async def aprofile_stream(self, request, response, content, profile, started, sampled):
+        # Under ASGI the chunks are produced in the request's sync thread
+        # (see apps.common.async_views.streaming_content); the wrappers go on
+        # that thread's connections
+        stack = await sync_to_async(self.wrap_connections, thread_sensitive=True)(profile)
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            await sync_to_async(stack.close, thread_sensitive=True)()
+            self.finish(request, response, profile, started, sampled, server_timing=False)
+
+    def finish(self, request, response, profile, started, sampled, server_timing):
+        total = (time.perf_counter() - started) * 1000
+
+        if settings.METRICS_ENABLED:
+            observe_request(request, response, total / 1000, profile.count, profile.duration / 1000)
+        if not sampled:
+            return
+
+        if server_timing and settings.SQL_PROFILING_SERVER_TIMING:
+            timing = f'db;dur={profile.duration:.1f};desc="{profile.count} queries", app;dur={total:.1f}'
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        self.log_request(request, response, profile, total)
+
+    async def __acall__(self, request):
+        # Fully async chain (ASGI): the ORM runs in other threads, out of reach
+        # of the execute wrapper, so only the latency is recorded
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        if settings.METRICS_ENABLED:
+            observe_request(request, response, time.perf_counter() - started)
+        return response
+
+    def log_request(self, request, response, profile, total):
+        duplicates = profile.duplicates(settings.SQL_PROFILING_DUPLICATE_THRESHOLD)
+        if (
+            total < settings.SQL_PROFILING_SLOW_REQUEST_MS
+            and profile.count <= settings.SQL_PROFILING_MAX_QUERIES
+            and not duplicates
+            and not profile.slow_queries
+        ):
+            return
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        user = getattr(request, 'user', None)
+        record = {
+            'event': 'sql_profile',
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'duration_ms': round(total, 1),
+            'db_ms': round(profile.duration, 1),
+            'queries': profile.count,
+            'duplicates': [
+                {'sql': sql[:SQL_LOG_LENGTH], 'count': count} for sql, count in duplicates
+            ],
+            'slow_queries': [
+                {'sql': sql[:SQL_LOG_LENGTH], 'ms': round(elapsed, 1)} for sql, elapsed in profile.slow_queries
+            ],
+        }
+        logger.warning(json.dumps(record), extra={'sql_profile': record})
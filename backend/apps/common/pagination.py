@@ -0,0 +1,140 @@
+"""
+Pagination classes shared by the API viewsets.
+"""
+import base64
+import json
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from apps.common.cache_utils import build_response_cache_key
+from apps.common.metrics import record_cache_lookup
+
+
+class KeysetPagination:
+    """
+    Keyset pagination over ``(fecha, id)``, newest first.
+
+    The cursor stores the ``(fecha, id)`` of the last row of the page, so every
+    page is a range scan on the ``(usuario, -fecha)`` indexes with no OFFSET
+    and no COUNT: page 10,000 costs the same as page 1. The total is an
+    approximation cached per user and filters.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self, count_key):
+        self.count_key = count_key
+
+    def get_page_size(self, request):
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return min(max(requested, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Return (fecha, id, reverse) or None for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return date.fromisoformat(data['f']), int(data['i']), bool(data.get('r'))
+        except (ValueError, KeyError, TypeError):
+            raise NotFound('Cursor inválido.')
+
+    def encode_cursor(self, obj, reverse=False):
+        data = {'f': obj.fecha.isoformat(), 'i': obj.pk}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.count_queryset = queryset
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        reverse = False
+        if cursor is not None:
+            fecha, pk, reverse = cursor
+            if reverse:
+                queryset = queryset.filter(Q(fecha__gt=fecha) | Q(fecha=fecha, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=pk))
+
+        ordering = ('fecha', 'id') if reverse else ('-fecha', '-id')
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = bool(rows) and (has_more or reverse)
+        self.has_previous = bool(rows) and cursor is not None and (has_more or not reverse)
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_approximate_count(self):
+        """
+        Total rows for the user and filters, cached for
+        PAGINATION_COUNT_CACHE_TIMEOUT seconds. The key follows the user's
+        cache generation, so it is recomputed after writes, not per page.
+        """
+        params = self.request.query_params.copy()
+        for param in (self.cursor_query_param, self.page_size_query_param):
+            params.pop(param, None)
+        key = build_response_cache_key(self.request.user.pk, f'count:{self.count_key}', params)
+        count = cache.get(key)
+        record_cache_lookup(f'count:{self.count_key}', count is not None)
+        if count is None:
+            count = self.count_queryset.count()
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.get_approximate_count(),
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default; keyset pagination when the request
+    carries ``?cursor=`` (an empty value starts at the first page).
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class(queryset.model._meta.label_lower)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,63 @@
+"""
+PostgreSQL backend that takes its connections from ``apps.common.db_pool``.
+
+Django closes the connection at the end of each request (use it with
+``CONN_MAX_AGE = 0``); this backend gives it back to the process pool
+instead, so the next request reuses it without a new connect/TLS handshake.
+Pool options come from the ``POOL`` key of the database settings.
+"""
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+from apps.common.db_pool import get_pool
+
+
+def reset_connection(connection):
+    """Leave a returned connection outside any transaction, or discard it."""
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_IDLE:
+        return True
+    if status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+        connection.rollback()
+        return True
+    # Active query or unknown (broken) connection
+    return False
+
+
+def check_connection(connection):
+    """Ping an idle connection; psycopg2 only marks it closed after a failed query."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return reset_connection(connection)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get('POOL', {})
+        return get_pool(
+            self.alias,
+            max_size=options.get('MAX_SIZE', 5),
+            timeout=options.get('TIMEOUT', 5),
+            max_idle=options.get('MAX_IDLE', 300),
+            reset=reset_connection,
+            check=check_connection,
+            check_after=options.get('CHECK_AFTER', 1),
+        )
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        connection = self.pool.acquire(lambda: connect(conn_params))
+        # A reused connection skips the parent method, which is what sets the
+        # isolation level Django expects
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            base.IsolationLevel(isolation_level) if isolation_level is not None
+            else base.IsolationLevel.READ_COMMITTED
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            # Inside atomic() Django still considers the transaction open
+            self.pool.release(self.connection, discard=self.in_atomic_block)
@@ -5,7 +5,25 @@ from django.test import TestCase
 from django.contrib.auth.models import User
 from decimal import Decimal
 from datetime import date
-from apps.common.date_utils import get_month_date_range
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
+from django.http import HttpResponse, QueryDict, StreamingHttpResponse
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, RequestFactory, override_settings
+from apps.common.async_views import streaming_content
+from apps.common.cache_utils import (
+    build_response_cache_key, bump_user_cache_version, get_user_cache_version
+)
+from apps.common import health
+from apps.common.db_pool import ConnectionPool, PoolTimeout
+from apps.common.middleware import QueryProfilingMiddleware
+from apps.common.date_utils import get_month_date_range, iter_periods, shift_month, truncate_date
 from apps.common.mixins import ProgressMixin
 from apps.common.budget_utils import calculate_budget_spending, check_budget_alert_needed
 from apps.transactions.models import Expense
@@ -32,6 +50,25 @@ class DateUtilsTest(TestCase):
         start, end = get_month_date_range(2024, 12)
         self.assertEqual(start, date(2024, 12, 1))
         self.assertEqual(end, date(2024, 12, 31))
+    
+    def test_shift_month_across_years(self):
+        """Test month shifting backwards and forwards across year boundaries."""
+        self.assertEqual(shift_month(2024, 1, -1), (2023, 12))
+        self.assertEqual(shift_month(2024, 3, -14), (2023, 1))
+        self.assertEqual(shift_month(2024, 12, 1), (2025, 1))
+    
+    def test_iter_periods(self):
+        """Test period iteration for every granularity, including partial edges."""
+        self.assertEqual(truncate_date(date(2024, 1, 10), 'week'), date(2024, 1, 8))
+        self.assertEqual(
+            list(iter_periods(date(2023, 12, 15), date(2024, 2, 1), 'month')),
+            [date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1)]
+        )
+        self.assertEqual(len(list(iter_periods(date(2024, 1, 1), date(2024, 12, 31), 'day'))), 366)
+        self.assertEqual(list(iter_periods(date(2024, 6, 1), date(2025, 1, 1), 'year')), [date(2024, 1, 1), date(2025, 1, 1)])
+        # Stops at the last representable period instead of overflowing
+        for granularity in ('day', 'week', 'month', 'year'):
+            self.assertLessEqual(list(iter_periods(date(9999, 12, 1), date.max, granularity))[-1], date.max)
 
 
 class ProgressMixinTest(TestCase):
@@ -159,3 +196,304 @@ class BudgetUtilsTest(TestCase):
             Decimal('90'), Decimal('100'), 80
         )
         self.assertTrue(needs_alert)
+
+
+class CacheUtilsTest(TestCase):
+    """Tests for per-user response cache keys."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_key_ignores_parameter_order(self):
+        """Test that the same parameters in another order share a key."""
+        first = build_response_cache_key(1, 'endpoint', QueryDict('mes=1&año=2024'))
+        second = build_response_cache_key(1, 'endpoint', QueryDict('año=2024&mes=1'))
+        self.assertEqual(first, second)
+
+    def test_bump_changes_only_that_user(self):
+        """Test that bumping a user's version leaves other users untouched."""
+        params = QueryDict('mes=1')
+        user_key = build_response_cache_key(1, 'endpoint', params)
+        other_key = build_response_cache_key(2, 'endpoint', params)
+
+        bump_user_cache_version(1)
+
+        self.assertNotEqual(build_response_cache_key(1, 'endpoint', params), user_key)
+        self.assertEqual(build_response_cache_key(2, 'endpoint', params), other_key)
+
+    def test_bump_with_file_based_cache(self):
+        """Test versioning on the file-based backend shared across workers."""
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }}):
+                version = get_user_cache_version(1)
+                bump_user_cache_version(1)
+                self.assertNotEqual(get_user_cache_version(1), version)
+
+
+@override_settings(SQL_PROFILING_SAMPLE_RATE=1.0, SQL_PROFILING_SERVER_TIMING=True)
+class QueryProfilingMiddlewareTest(TestCase):
+    """Tests for the per-request SQL profiling middleware."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='profiled', password='pass123')
+
+    def n_plus_one_view(self, request):
+        for _ in range(6):
+            User.objects.filter(pk=self.user.pk).first()
+        return HttpResponse('ok')
+
+    def test_server_timing_and_duplicate_log(self):
+        """Test the Server-Timing header and the structured N+1 record."""
+        middleware = QueryProfilingMiddleware(self.n_plus_one_view)
+
+        with self.assertLogs('finance_api.sql', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/api/demo/'))
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="6 queries"', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['queries'], 6)
+        self.assertEqual(record['path'], '/api/demo/')
+        self.assertEqual(record['duplicates'][0]['count'], 6)
+
+    def test_quiet_below_thresholds(self):
+        """Test that fast requests without repeated queries are not logged."""
+        def view(request):
+            User.objects.count()
+            return HttpResponse('ok')
+
+        with self.assertNoLogs('finance_api.sql', 'WARNING'):
+            response = QueryProfilingMiddleware(view)(RequestFactory().get('/'))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    @override_settings(SQL_PROFILING_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        """Test that sampled requests are still logged without exposing the header."""
+        with self.assertLogs('finance_api.sql', 'WARNING'):
+            response = QueryProfilingMiddleware(self.n_plus_one_view)(RequestFactory().get('/'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(SQL_PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_profiled(self):
+        """Test that requests outside the sample skip the wrapper."""
+        response = QueryProfilingMiddleware(self.n_plus_one_view)(RequestFactory().get('/'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_streaming_body_queries_are_counted(self):
+        """Test that queries run while iterating a streaming body are profiled."""
+        def rows():
+            for _ in range(6):
+                yield f'{User.objects.filter(pk=self.user.pk).count()}\n'
+
+        def view(request):
+            return StreamingHttpResponse(rows())
+
+        response = QueryProfilingMiddleware(view)(RequestFactory().get('/export/'))
+        self.assertNotIn('Server-Timing', response)
+
+        with self.assertLogs('finance_api.sql', 'WARNING') as logs:
+            self.assertEqual(b''.join(response.streaming_content), b'1\n' * 6)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['queries'], 6)
+        self.assertEqual(record['path'], '/export/')
+
+    def test_async_streaming_body_queries_are_counted(self):
+        """Test the profiling of a streaming body served as an async iterator (ASGI)."""
+        def rows():
+            for _ in range(6):
+                yield f'{User.objects.filter(pk=self.user.pk).count()}\n'
+
+        def view(request):
+            return StreamingHttpResponse(streaming_content(request, rows()))
+
+        response = QueryProfilingMiddleware(view)(AsyncRequestFactory().get('/export/'))
+        self.assertTrue(response.is_async)
+
+        async def consume():
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        with self.assertLogs('finance_api.sql', 'WARNING') as logs:
+            self.assertEqual(async_to_sync(consume)(), b'1\n' * 6)
+        self.assertEqual(json.loads(logs.records[0].getMessage())['queries'], 6)
+
+
+class MetricsTest(TestCase):
+    """Tests for the Prometheus metrics endpoint."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='scraped', password='pass123')
+        self.client.force_login(self.user)
+
+    def test_request_and_cache_metrics(self):
+        """Test that a served request shows up in the latency and cache series."""
+        cache.clear()
+        self.client.get('/api/transactions/gastos/dashboard/')
+        self.client.get('/api/transactions/gastos/dashboard/')
+
+        response = self.client.get('/metrics/')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'finance_http_request_duration_seconds_count{method="GET",status="200",view="ExpenseViewSet.dashboard"}',
+            body
+        )
+        self.assertIn('finance_http_request_db_queries_bucket{le="+Inf",view="ExpenseViewSet.dashboard"}', body)
+        self.assertIn('finance_cache_requests_total{endpoint="transactions.dashboard",result="hit"}', body)
+
+    def test_forbidden_for_remote_clients(self):
+        """Test that only the allowed addresses can scrape the metrics."""
+        response = self.client.get('/metrics/', REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, 403)
+
+    def test_multiprocess_aggregation(self):
+        """Test that values written by separate worker processes are summed."""
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory}
+            worker = (
+                "from apps.common.metrics import record_cache_lookup\n"
+                "record_cache_lookup('demo', True)\n"
+            )
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', worker], env=env, check=True)
+            output = subprocess.run(
+                [sys.executable, '-c', 'from apps.common.metrics import render_metrics; print(render_metrics()[0].decode())'],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+
+        self.assertIn('finance_cache_requests_total{endpoint="demo",result="hit"} 2.0', output)
+
+
+class ReadinessTest(TestCase):
+    """Tests for the liveness and readiness endpoints."""
+
+    def setUp(self):
+        health.reset()
+
+    def tearDown(self):
+        health.reset()
+
+    def test_liveness(self):
+        """Test that liveness answers without checking dependencies."""
+        response = self.client.get('/health/live/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_ready(self):
+        """Test that a working instance reports every check as ok."""
+        response = self.client.get('/health/ready/')
+
+        self.assertEqual(response.status_code, 200)
+        checks = response.json()['checks']
+        self.assertEqual(checks['database']['status'], 'ok')
+        self.assertEqual(checks['migrations']['status'], 'ok')
+        self.assertEqual(checks['cache']['status'], 'ok')
+
+    @override_settings(HEALTH_CHECK_DB_TIMEOUT=0.05)
+    def test_database_timeout(self):
+        """Test that a database that does not answer in time makes the instance unready."""
+        with patch.object(health, 'check_database_state', side_effect=lambda: time.sleep(0.3)):
+            response = self.client.get('/health/ready/')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['database'], {'status': 'error', 'error': 'timeout'})
+
+    def test_result_is_cached(self):
+        """Test that consecutive probes reuse the last result."""
+        with patch.object(health, 'check_database_state', wraps=health.check_database_state) as check:
+            self.client.get('/health/ready/')
+            self.client.get('/health/ready/')
+        self.assertEqual(check.call_count, 1)
+
+
+    def test_saturation_only_fails_on_own_pool(self):
+        """Test that the server-wide connection count never fails readiness, only this process' pool."""
+        connection = MagicMock(alias='default', vendor='postgresql')
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.side_effect = [(99,), ('100',), (99,), ('100',)]
+
+        with patch.object(health, 'pool_stats', return_value={'default': {'max': 5, 'in_use': 2, 'idle': 0}}):
+            result = health.check_connection_saturation(connection)
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(result['server'], {'used': 99, 'max': 100})
+
+        with patch.object(health, 'pool_stats', return_value={'default': {'max': 5, 'in_use': 5, 'idle': 0}}):
+            result = health.check_connection_saturation(connection)
+        self.assertEqual(result['status'], 'error')
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(TestCase):
+    """Tests for the per-process database connection pool."""
+
+    def make_pool(self, **options):
+        options = {'max_size': 2, 'timeout': 0.05, 'max_idle': 300, **options}
+        return ConnectionPool('test', **options)
+
+    def test_reuses_released_connections(self):
+        """Test that a released connection is handed out again."""
+        pool = self.make_pool()
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+
+        self.assertIs(pool.acquire(FakeConnection), first)
+        self.assertEqual(pool.stats(), {'max': 2, 'in_use': 1, 'idle': 0})
+
+    def test_bounded(self):
+        """Test that callers wait and then fail when every connection is in use."""
+        pool = self.make_pool()
+        pool.acquire(FakeConnection)
+        pool.acquire(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+
+    def test_discards_unusable_connections(self):
+        """Test that discarded, closed and stale connections are not reused."""
+        pool = self.make_pool(reset=lambda connection: False)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertTrue(connection.closed)
+
+        pool = self.make_pool(max_idle=0)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(FakeConnection), connection)
+        self.assertTrue(connection.closed)
+
+    def test_checks_idle_connections_on_checkout(self):
+        """Test that idle connections that fail the check are replaced, and recently used ones skip it."""
+        def server_gone(connection):
+            raise OSError('server closed the connection unexpectedly')
+
+        pool = self.make_pool(check=server_gone)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(FakeConnection), connection)
+        self.assertTrue(connection.closed)
+
+        check = MagicMock(return_value=False)
+        pool = self.make_pool(check=check, check_after=60)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertIs(pool.acquire(FakeConnection), connection)
+        check.assert_not_called()
+
+    def test_failed_connect_frees_the_slot(self):
+        """Test that a connection error does not leak a pool slot."""
+        pool = self.make_pool(max_size=1)
+
+        def broken():
+            raise OSError('connection refused')
+
+        with self.assertRaises(OSError):
+            pool.acquire(broken)
+        self.assertIsInstance(pool.acquire(FakeConnection), FakeConnection)
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from apps.common.health import readiness
+from apps.common.metrics import render_metrics
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint.
+
+    Only answers to the addresses in METRICS_ALLOWED_IPS (localhost by
+    default); ``X-Forwarded-For`` is ignored on purpose so a client behind the
+    proxy cannot claim to be local.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+def liveness_view(request):
+    """The process is up and serving requests; no dependency is checked."""
+    return JsonResponse({'status': 'ok'})
+
+
+def readiness_view(request):
+    """
+    Whether the instance should receive traffic: 200 when the database,
+    migrations, cache and connection checks pass, 503 otherwise.
+    """
+    result = readiness()
+    return JsonResponse(result, status=200 if result['status'] == 'ok' else 503)
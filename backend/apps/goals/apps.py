@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class GoalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.goals'
\ No newline at end of file
+    name = 'apps.goals'
+
+    def ready(self):
+        from . import signals  # noqa: F401
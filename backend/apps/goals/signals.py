@@ -0,0 +1,7 @@
+"""
+Signal handlers for saving goal models.
+"""
+from apps.common.cache_utils import invalidate_user_cache_on_change
+from .models import SavingGoal
+
+invalidate_user_cache_on_change(SavingGoal, lambda instance: instance.usuario_id)
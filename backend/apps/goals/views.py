@@ -9,8 +9,9 @@ from .serializers import SavingGoalSerializer
 from apps.transactions.models import Expense
 from apps.categories.models import Category
 from apps.notifications.services import NotificationService
+from apps.common.cache_utils import ConditionalGetMixin
 
-class SavingGoalViewSet(viewsets.ModelViewSet):
+class SavingGoalViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = SavingGoalSerializer
     permission_classes = [IsAuthenticated]
 
@@ -7,14 +7,14 @@ class LoanAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'amount', 'installments', 'date', 'created_at']
     list_filter = ['date', 'created_at']
     search_fields = ['name', 'user__username', 'user__email']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['paid_total', 'paid_count', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Información básica', {
             'fields': ('user', 'name', 'description')
         }),
         ('Detalles financieros', {
-            'fields': ('amount', 'installments', 'date')
+            'fields': ('amount', 'installments', 'date', 'paid_total', 'paid_count')
         }),
 
         ('Metadatos', {
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class LoansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.loans'
\ No newline at end of file
+    name = 'apps.loans'
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
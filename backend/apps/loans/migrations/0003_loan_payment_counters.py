@@ -0,0 +1,44 @@
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    """Calcular los acumulados a partir de los pagos existentes"""
+    Loan = apps.get_model('loans', 'Loan')
+    LoanPayment = apps.get_model('loans', 'LoanPayment')
+
+    payments = LoanPayment.objects.filter(loan=models.OuterRef('pk')).order_by().values('loan')
+    Loan.objects.update(
+        paid_total=Coalesce(
+            models.Subquery(payments.annotate(total=models.Sum('amount')).values('total')),
+            Decimal('0'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        ),
+        paid_count=Coalesce(
+            models.Subquery(payments.annotate(total=models.Count('id')).values('total')),
+            0,
+            output_field=models.PositiveIntegerField()
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0002_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='paid_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Cuotas pagadas'),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='paid_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12, verbose_name='Total pagado'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
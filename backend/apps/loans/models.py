@@ -22,9 +22,19 @@ class Loan(models.Model, ProgressMixin):
         verbose_name='Número de cuotas'
     )
     date = models.DateField(verbose_name='Fecha del préstamo')
+    # Acumulados de los pagos, mantenidos por las señales de LoanPayment
+    paid_total = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0'),
+        verbose_name='Total pagado'
+    )
+    paid_count = models.PositiveIntegerField(default=0, verbose_name='Cuotas pagadas')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    COUNTER_FIELDS = ('paid_total', 'paid_count')
+
     class Meta:
         verbose_name = 'Préstamo'
         verbose_name_plural = 'Préstamos'
@@ -42,12 +52,19 @@ class Loan(models.Model, ProgressMixin):
         """Calcula el monto por cuota"""
         return self.amount / self.installments
     
+    def save(self, *args, **kwargs):
+        # Los acumulados solo se escriben con F() desde las señales de los
+        # pagos: guardar una instancia leída antes de un pago no debe pisarlos
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def get_total_paid(self):
         """Calcula el total pagado hasta ahora"""
-        # Use annotated value if available, otherwise calculate
-        if hasattr(self, '_total_paid'):
-            return self._total_paid or Decimal('0')
-        return self.payments.aggregate(total=models.Sum('amount'))['total'] or Decimal('0')
+        return self.paid_total
     
     @property
     def total_paid(self):
@@ -61,10 +78,7 @@ class Loan(models.Model, ProgressMixin):
     
     def get_paid_installments(self):
         """Cuenta las cuotas pagadas"""
-        # Use annotated value if available, otherwise calculate
-        if hasattr(self, '_paid_installments'):
-            return self._paid_installments or 0
-        return self.payments.count()
+        return self.paid_count
     
     @property
     def paid_installments(self):
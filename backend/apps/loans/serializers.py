@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Loan, LoanPayment
+from .services import LoanService, LoanCompletedError
 
 
 class LoanPaymentSerializer(serializers.ModelSerializer):
@@ -33,6 +34,14 @@ class LoanSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class LoanCompactSerializer(LoanSerializer):
+    """Préstamo para listados: acumulados y solo los últimos pagos"""
+    recent_payments = LoanPaymentSerializer(many=True, read_only=True)
+
+    class Meta(LoanSerializer.Meta):
+        fields = [field for field in LoanSerializer.Meta.fields if field != 'payments'] + ['recent_payments']
+
+
 class LoanPaymentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = LoanPayment
@@ -45,9 +54,8 @@ class LoanPaymentCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("No se pudo identificar el préstamo")
         
         try:
-            loan = Loan.objects.get(id=loan_id, user=self.context['request'].user)
+            return LoanService.add_payment(loan_id, self.context['request'].user, validated_data)
         except Loan.DoesNotExist:
             raise serializers.ValidationError("Préstamo no encontrado")
-        
-        validated_data['loan'] = loan
-        return super().create(validated_data)
\ No newline at end of file
+        except LoanCompletedError as e:
+            raise serializers.ValidationError(str(e))
\ No newline at end of file
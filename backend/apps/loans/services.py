@@ -0,0 +1,137 @@
+from decimal import Decimal
+from django.db.models import (
+    Count, DateField, DecimalField, F, FloatField, Func, IntegerField, Min, OuterRef, Q, Subquery, Sum
+)
+from django.db import transaction
+from django.db.models.functions import Cast, Coalesce
+from .models import Loan, LoanPayment
+
+
+class AddMonths(Func):
+    """Fecha más un número de meses calculado en la base de datos"""
+    output_field = DateField()
+
+    def _compile_args(self, compiler, connection):
+        date_sql, date_params = compiler.compile(self.source_expressions[0])
+        months_sql, months_params = compiler.compile(self.source_expressions[1])
+        return date_sql, months_sql, (*date_params, *months_params)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        date_sql, months_sql, params = self._compile_args(compiler, connection)
+        return f'DATE_ADD({date_sql}, INTERVAL ({months_sql}) MONTH)', params
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        date_sql, months_sql, params = self._compile_args(compiler, connection)
+        return f'({date_sql} + make_interval(months => ({months_sql})::integer))::date', params
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite desborda los fines de mes (31 de enero + 1 mes = 2 de marzo);
+        # se limita al último día del mes destino, como PostgreSQL y MySQL
+        date_sql, months_sql, params = self._compile_args(compiler, connection)
+        return (
+            f"min(date({date_sql}, '+' || ({months_sql}) || ' months'), "
+            f"date({date_sql}, 'start of month', '+' || (({months_sql}) + 1) || ' months', '-1 day'))"
+        ), params * 2
+
+
+class LoanCompletedError(Exception):
+    """El préstamo ya tiene todas sus cuotas pagadas"""
+
+
+def _payment_totals():
+    payments = LoanPayment.objects.filter(loan=OuterRef('pk')).order_by().values('loan')
+    return {
+        'paid_total': Coalesce(
+            Subquery(payments.annotate(total=Sum('amount')).values('total'), output_field=DecimalField()),
+            Decimal('0'),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+        'paid_count': Coalesce(
+            Subquery(payments.annotate(total=Count('id')).values('total'), output_field=IntegerField()),
+            0
+        ),
+    }
+
+
+class LoanService:
+    """Servicio para pagos y consultas agregadas de préstamos"""
+
+    @staticmethod
+    def apply_payment_delta(loan_id, amount, count):
+        """Sumar a los acumulados del préstamo con F() para no pisar escrituras concurrentes"""
+        Loan.objects.filter(pk=loan_id).update(
+            paid_total=F('paid_total') + amount,
+            paid_count=F('paid_count') + count
+        )
+
+    @staticmethod
+    def add_payment(loan_id, user, data):
+        """
+        Registrar un pago bloqueando el préstamo, para que dos pagos
+        simultáneos no puedan pasar ambos el control de cuotas.
+
+        Raises:
+            Loan.DoesNotExist: El préstamo no existe o es de otro usuario
+            LoanCompletedError: El préstamo ya está completamente pagado
+        """
+        with transaction.atomic():
+            loan = Loan.objects.select_for_update().get(pk=loan_id, user=user)
+            if loan.is_completed:
+                raise LoanCompletedError('Este préstamo ya está completamente pagado')
+            return LoanPayment.objects.create(loan=loan, **data)
+
+    @staticmethod
+    def rebuild_payment_counters(loan_ids=None):
+        """
+        Recalcular los acumulados desde los pagos, p. ej. tras insertar pagos
+        con bulk_create, que no dispara señales.
+
+        Returns:
+            int: Préstamos actualizados
+        """
+        loans = Loan.objects.all()
+        if loan_ids is not None:
+            loans = loans.filter(pk__in=loan_ids)
+        return loans.update(**_payment_totals())
+
+    @staticmethod
+    def portfolio_summary(user):
+        """
+        Resumen de todos los préstamos del usuario en una sola consulta sobre
+        los acumulados de cada préstamo, sin leer sus pagos.
+
+        Las cuotas se consideran mensuales desde la fecha del préstamo: la
+        cuota k vence k meses después, así que la próxima de un préstamo activo
+        vence (cuotas pagadas + 1) meses después de su fecha. El servicio
+        mensual de deuda es la suma de las cuotas de los préstamos activos.
+
+        Returns:
+            dict: Totales, contadores, próximo vencimiento y servicio mensual
+        """
+        activo = Q(paid_count__lt=F('installments'))
+        totals = Loan.objects.filter(user=user).aggregate(
+            total_loans=Count('id'),
+            active_loans=Count('id', filter=activo),
+            total_debt=Sum('amount'),
+            total_paid=Sum('paid_total'),
+            next_installment_due=Min(AddMonths(F('date'), F('paid_count') + 1), filter=activo),
+            monthly_debt_service=Sum(
+                Cast('amount', FloatField()) / F('installments'),
+                filter=activo,
+                output_field=FloatField()
+            ),
+        )
+
+        total_debt = totals['total_debt'] or Decimal('0')
+        total_paid = totals['total_paid'] or Decimal('0')
+        return {
+            'total_loans': totals['total_loans'],
+            'active_loans': totals['active_loans'],
+            'completed_loans': totals['total_loans'] - totals['active_loans'],
+            'total_debt': total_debt,
+            'total_paid': total_paid,
+            'remaining_debt': total_debt - total_paid,
+            'completion_percentage': (total_paid / total_debt * 100) if total_debt > 0 else 0,
+            'next_installment_due': totals['next_installment_due'],
+            'monthly_debt_service': Decimal(str(round(totals['monthly_debt_service'] or 0, 2))),
+        }
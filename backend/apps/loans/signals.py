@@ -0,0 +1,82 @@
+"""
+Signal handlers for loan models: cache invalidation and the paid_total /
+paid_count counters stored on Loan.
+"""
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from apps.common.cache_utils import invalidate_user_cache_on_change
+from .models import Loan, LoanPayment
+from .services import LoanService
+
+
+def _snapshot(instance):
+    """Return (loan_id, amount) of a payment, or None if some are deferred."""
+    if 'loan_id' not in instance.__dict__ or 'amount' not in instance.__dict__:
+        return None
+    amount = instance._meta.get_field('amount').to_python(instance.amount)
+    return instance.loan_id, amount
+
+
+def _load_state(pk):
+    return LoanPayment.objects.filter(pk=pk).values_list('loan_id', 'amount').first()
+
+
+def _apply(state, sign):
+    loan_id, amount = state
+    LoanService.apply_payment_delta(loan_id, sign * amount, sign)
+
+
+@receiver(post_init, sender=LoanPayment)
+def remember_payment_state(sender, instance, **kwargs):
+    """Guardar los valores originales para calcular deltas al guardar"""
+    instance._counter_state = _snapshot(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=LoanPayment)
+def load_payment_state(sender, instance, raw=False, **kwargs):
+    """Recuperar los valores originales si la instancia se cargó con campos diferidos"""
+    if raw or not instance.pk or getattr(instance, '_counter_state', None) is not None:
+        return
+    instance._counter_state = _load_state(instance.pk)
+
+
+@receiver(post_save, sender=LoanPayment)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """Aplicar a los acumulados del préstamo la diferencia entre el pago anterior y el nuevo"""
+    if raw:
+        return
+
+    previous = None if created else getattr(instance, '_counter_state', None)
+    current = _snapshot(instance)
+    if current is None:
+        current = _load_state(instance.pk)
+
+    if previous is not None and current is not None and previous[0] == current[0]:
+        if previous[1] != current[1]:
+            LoanService.apply_payment_delta(current[0], current[1] - previous[1], 0)
+    elif previous != current:
+        if previous is not None:
+            _apply(previous, -1)
+        if current is not None:
+            _apply(current, 1)
+
+    instance._counter_state = current
+
+
+@receiver(post_delete, sender=LoanPayment)
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Restar de los acumulados del préstamo el pago eliminado"""
+    state = getattr(instance, '_counter_state', None) or _snapshot(instance)
+    if state is not None:
+        _apply(state, -1)
+
+
+def _payment_user_id(instance):
+    loan = instance._state.fields_cache.get('loan')
+    if loan is not None:
+        return loan.user_id
+    return Loan.objects.filter(pk=instance.loan_id).values_list('user_id', flat=True).first()
+
+
+invalidate_user_cache_on_change(Loan, lambda instance: instance.user_id)
+invalidate_user_cache_on_change(LoanPayment, _payment_user_id)
@@ -114,3 +114,175 @@ class TestLoansAPI:
 
         response = authenticated_client.get(f'/api/loans/{loan.id}/')
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_add_payment_to_completed_loan(self, authenticated_client, user):
+        """Verifica que no se aceptan pagos en un préstamo ya pagado"""
+        loan = Loan.objects.create(
+            user=user,
+            name='Préstamo',
+            amount=Decimal('1000'),
+            installments=1,
+            date=date.today()
+        )
+        data = {'amount': '1000', 'date': '2024-01-15'}
+
+        first = authenticated_client.post(f'/api/loans/{loan.id}/add_payment/', data, format='json')
+        second = authenticated_client.post(f'/api/loans/{loan.id}/add_payment/', data, format='json')
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert second.status_code == status.HTTP_400_BAD_REQUEST
+        assert second.data['error'] == 'Este préstamo ya está completamente pagado'
+        loan.refresh_from_db()
+        assert (loan.paid_total, loan.paid_count) == (Decimal('1000'), 1)
+
+    def test_add_payment_to_foreign_loan(self, authenticated_client, another_user):
+        """Verifica que no se pueden agregar pagos a préstamos de otros usuarios"""
+        loan = Loan.objects.create(
+            user=another_user,
+            name='Préstamo de otro',
+            amount=Decimal('5000'),
+            installments=6,
+            date=date.today()
+        )
+
+        response = authenticated_client.post(
+            f'/api/loans/{loan.id}/add_payment/',
+            {'amount': '100', 'date': '2024-01-15'},
+            format='json'
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not LoanPayment.objects.filter(loan=loan).exists()
+
+
+@pytest.mark.django_db
+class TestLoanSummary:
+    """Tests para el resumen de préstamos calculado en la base de datos"""
+
+    @pytest.mark.parametrize('pagos', [1, 15])
+    def test_single_query_independent_of_payments(self, authenticated_client, user, another_user, pagos,
+                                                  django_assert_num_queries):
+        """Verifica los totales en una consulta sin importar cuántos pagos existen"""
+        activo = Loan.objects.create(
+            user=user, name='Auto', amount=Decimal('12000'), installments=24, date=date(2024, 1, 10)
+        )
+        completado = Loan.objects.create(
+            user=user, name='Celular', amount=Decimal('900'), installments=3, date=date(2024, 2, 1)
+        )
+        Loan.objects.create(
+            user=another_user, name='Ajeno', amount=Decimal('5000'), installments=5, date=date(2024, 1, 1)
+        )
+        for i in range(pagos):
+            LoanPayment.objects.create(loan=activo, amount=Decimal('100'), date=date(2024, 2, 10))
+        for i in range(3):
+            LoanPayment.objects.create(loan=completado, amount=Decimal('300'), date=date(2024, 3, 1))
+
+        with django_assert_num_queries(1):
+            response = authenticated_client.get('/api/loans/summary/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total_loans'] == 2
+        assert response.data['active_loans'] == 1
+        assert response.data['completed_loans'] == 1
+        assert response.data['total_debt'] == Decimal('12900')
+        assert response.data['total_paid'] == Decimal('900') + pagos * Decimal('100')
+        assert response.data['remaining_debt'] == Decimal('12000') - pagos * Decimal('100')
+        # La cuota pagos + 1 del préstamo activo vence pagos + 1 meses después de su fecha
+        assert response.data['next_installment_due'] == date(2024 + (pagos + 1) // 12, (pagos + 1) % 12 + 1, 10)
+        assert response.data['monthly_debt_service'] == Decimal('500.00')
+
+    @pytest.mark.parametrize('pagos,vencimiento', [(0, date(2024, 2, 29)), (1, date(2024, 3, 31)), (2, date(2024, 4, 30))])
+    def test_next_installment_due_clamps_month_end(self, authenticated_client, user, pagos, vencimiento):
+        """Verifica que un préstamo de fin de mes vence el último día de los meses más cortos"""
+        loan = Loan.objects.create(
+            user=user, name='Fin de mes', amount=Decimal('1200'), installments=12, date=date(2024, 1, 31)
+        )
+        for i in range(pagos):
+            LoanPayment.objects.create(loan=loan, amount=Decimal('100'), date=date(2024, 2, 1))
+
+        response = authenticated_client.get('/api/loans/summary/')
+
+        assert response.data['next_installment_due'] == vencimiento
+
+    def test_empty_portfolio(self, authenticated_client):
+        """Verifica el resumen sin préstamos"""
+        response = authenticated_client.get('/api/loans/summary/')
+
+        assert response.data['total_loans'] == 0
+        assert response.data['total_debt'] == Decimal('0')
+        assert response.data['next_installment_due'] is None
+        assert response.data['monthly_debt_service'] == Decimal('0')
+
+
+@pytest.mark.django_db
+class TestLoanCompactList:
+    """Tests para el listado compacto y la ruta anidada de pagos"""
+
+    @pytest.fixture
+    def loan(self, user):
+        loan = Loan.objects.create(
+            user=user, name='Hipoteca', amount=Decimal('120000'), installments=120, date=date(2020, 1, 1)
+        )
+        for month in range(1, 13):
+            LoanPayment.objects.create(loan=loan, amount=Decimal('1000'), date=date(2023, month, 5))
+        return loan
+
+    def test_compact_list_returns_counters_and_recent_payments(self, authenticated_client, loan,
+                                                               django_assert_max_num_queries):
+        """Verifica que el listado compacto trae los acumulados y solo los últimos N pagos"""
+        with django_assert_max_num_queries(6):
+            response = authenticated_client.get('/api/loans/?compact=1&recent_payments=2')
+
+        assert response.status_code == status.HTTP_200_OK
+        item = response.data['results'][0]
+        assert 'payments' not in item
+        assert item['paid_installments'] == 12
+        assert item['total_paid'] == Decimal('12000')
+        assert [p['date'] for p in item['recent_payments']] == ['2023-12-05', '2023-11-05']
+
+    def test_full_list_keeps_payments(self, authenticated_client, loan):
+        """Verifica que sin compact el listado mantiene todos los pagos"""
+        response = authenticated_client.get('/api/loans/')
+
+        assert len(response.data['results'][0]['payments']) == 12
+
+    def test_nested_payments_filtered_and_paginated(self, authenticated_client, user, loan):
+        """Verifica que loans/{id}/payments/ filtra por préstamo y pagina"""
+        other = Loan.objects.create(
+            user=user, name='Auto', amount=Decimal('5000'), installments=5, date=date(2023, 1, 1)
+        )
+        LoanPayment.objects.create(loan=other, amount=Decimal('1000'), date=date(2023, 2, 1))
+
+        response = authenticated_client.get(f'/api/loans/{loan.id}/payments/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 12
+        assert response.data['results'][0]['date'] == '2023-12-05'
+
+        response = authenticated_client.get(f'/api/loans/{other.id}/payments/')
+        assert response.data['count'] == 1
+
+    def test_nested_payments_of_foreign_loan(self, authenticated_client, another_user):
+        """Verifica que no se listan los pagos de préstamos de otros usuarios"""
+        loan = Loan.objects.create(
+            user=another_user, name='Ajeno', amount=Decimal('5000'), installments=5, date=date(2023, 1, 1)
+        )
+        LoanPayment.objects.create(loan=loan, amount=Decimal('1000'), date=date(2023, 2, 1))
+
+        response = authenticated_client.get(f'/api/loans/{loan.id}/payments/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_nested_create_rejects_completed_loan(self, authenticated_client, user):
+        """Verifica que crear pagos por la ruta anidada respeta el límite de cuotas"""
+        loan = Loan.objects.create(
+            user=user, name='Celular', amount=Decimal('500'), installments=1, date=date(2023, 1, 1)
+        )
+        data = {'amount': '500', 'date': '2023-02-01'}
+
+        first = authenticated_client.post(f'/api/loans/{loan.id}/payments/', data, format='json')
+        second = authenticated_client.post(f'/api/loans/{loan.id}/payments/', data, format='json')
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert second.status_code == status.HTTP_400_BAD_REQUEST
+        assert LoanPayment.objects.filter(loan=loan).count() == 1
@@ -2,6 +2,7 @@ import pytest
 from decimal import Decimal
 from datetime import date
 from apps.loans.models import Loan, LoanPayment
+from apps.loans.services import LoanService
 
 
 @pytest.mark.django_db
@@ -77,3 +78,70 @@ class TestLoanPaymentModel:
         )
 
         assert str(payment) == 'Pago de $500 para Préstamo'
+
+
+@pytest.mark.django_db
+class TestLoanPaymentCounters:
+    """Tests para los acumulados de pagos guardados en Loan"""
+
+    @pytest.fixture
+    def loan(self, user):
+        return Loan.objects.create(
+            user=user, name='Préstamo', amount=Decimal('3000'), installments=3, date=date(2024, 1, 1)
+        )
+
+    def test_counters_follow_create_update_and_delete(self, loan):
+        """Verifica que crear, editar y eliminar pagos actualiza los acumulados"""
+        first = LoanPayment.objects.create(loan=loan, amount=Decimal('1000'), date=date(2024, 2, 1))
+        LoanPayment.objects.create(loan=loan, amount=Decimal('1000'), date=date(2024, 3, 1))
+        loan.refresh_from_db()
+        assert (loan.paid_total, loan.paid_count) == (Decimal('2000'), 2)
+
+        first.amount = Decimal('750')
+        first.save()
+        loan.refresh_from_db()
+        assert (loan.paid_total, loan.paid_count) == (Decimal('1750'), 2)
+
+        first.delete()
+        loan.refresh_from_db()
+        assert (loan.paid_total, loan.paid_count) == (Decimal('1000'), 1)
+
+    def test_moving_payment_between_loans(self, user, loan):
+        """Verifica que cambiar el préstamo de un pago mueve sus montos"""
+        other = Loan.objects.create(
+            user=user, name='Otro', amount=Decimal('500'), installments=1, date=date(2024, 1, 1)
+        )
+        payment = LoanPayment.objects.create(loan=loan, amount=Decimal('500'), date=date(2024, 2, 1))
+        payment.loan = other
+        payment.save()
+
+        loan.refresh_from_db()
+        other.refresh_from_db()
+        assert (loan.paid_total, loan.paid_count) == (Decimal('0'), 0)
+        assert (other.paid_total, other.paid_count) == (Decimal('500'), 1)
+
+    def test_saving_stale_loan_keeps_counters(self, loan):
+        """Verifica que guardar una instancia leída antes de un pago no pisa los acumulados"""
+        stale = Loan.objects.get(pk=loan.pk)
+        LoanPayment.objects.create(loan=loan, amount=Decimal('1000'), date=date(2024, 2, 1))
+
+        stale.name = 'Renombrado'
+        stale.save()
+
+        loan.refresh_from_db()
+        assert loan.name == 'Renombrado'
+        assert (loan.paid_total, loan.paid_count) == (Decimal('1000'), 1)
+        assert loan.progress_percentage == pytest.approx(100 / 3)
+
+    def test_rebuild_after_bulk_create(self, loan):
+        """Verifica que rebuild_payment_counters recalcula los pagos insertados sin señales"""
+        LoanPayment.objects.bulk_create([
+            LoanPayment(loan=loan, amount=Decimal('1000'), date=date(2024, 2, 1)),
+            LoanPayment(loan=loan, amount=Decimal('400'), date=date(2024, 3, 1)),
+        ])
+        loan.refresh_from_db()
+        assert loan.paid_count == 0
+
+        assert LoanService.rebuild_payment_counters([loan.pk]) == 1
+        loan.refresh_from_db()
+        assert (loan.paid_total, loan.paid_count) == (Decimal('1400'), 2)
@@ -2,105 +2,103 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Q, Count
-from decimal import Decimal
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from apps.common.cache_utils import cache_user_response, ConditionalGetMixin
 from .models import Loan, LoanPayment
-from .serializers import LoanSerializer, LoanPaymentSerializer, LoanPaymentCreateSerializer
+from .services import LoanService, LoanCompletedError
+from .serializers import (
+    LoanSerializer, LoanCompactSerializer, LoanPaymentSerializer, LoanPaymentCreateSerializer
+)
 
 
-class LoanViewSet(viewsets.ModelViewSet):
+class LoanViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = LoanSerializer
     permission_classes = [IsAuthenticated]
+    # Listado compacto: ?compact=1 devuelve los acumulados y los últimos
+    # ?recent_payments=N pagos; el historial completo está en loans/{id}/payments/
+    recent_payments_default = 3
+    recent_payments_max = 20
+
+    def is_compact(self):
+        return self.action == 'list' and self.request.query_params.get('compact', '').lower() in ('1', 'true')
+
+    def get_recent_payments_limit(self):
+        try:
+            limit = int(self.request.query_params['recent_payments'])
+        except (KeyError, ValueError):
+            return self.recent_payments_default
+        return min(max(limit, 0), self.recent_payments_max)
     
     def get_queryset(self):
-        """Optimize queryset with annotations to avoid N+1 queries"""
-        return Loan.objects.filter(user=self.request.user).prefetch_related('payments').annotate(
-            _total_paid=Sum('payments__amount'),
-            _paid_installments=Count('payments')
-        )
+        """Los totales pagados vienen de los acumulados del préstamo, sin agregar pagos"""
+        queryset = Loan.objects.filter(user=self.request.user)
+        if self.is_compact():
+            # Prefetch recortado: la base de datos devuelve solo N pagos por préstamo
+            recent = LoanPayment.objects.order_by('-date', '-created_at')[:self.get_recent_payments_limit()]
+            return queryset.prefetch_related(Prefetch('payments', queryset=recent, to_attr='recent_payments'))
+        return queryset.prefetch_related('payments')
+
+    def get_serializer_class(self):
+        if self.is_compact():
+            return LoanCompactSerializer
+        return LoanSerializer
     
     @action(detail=False, methods=['get'])
+    @cache_user_response('loans.summary')
     def summary(self, request):
-        """Obtiene un resumen de todos los préstamos del usuario"""
-        loans = self.get_queryset()
-        
-        # Calculate totals correctly by iterating through loans
-        total_debt = Decimal('0')
-        total_paid = Decimal('0')
-        remaining_debt = Decimal('0')
-        active_loans = 0
-        completed_loans = 0
-        
-        for loan in loans:
-            total_debt += loan.amount
-            paid_amount = loan.total_paid
-            total_paid += paid_amount
-            remaining_debt += (loan.amount - paid_amount)
-            
-            if loan.is_completed:
-                completed_loans += 1
-            else:
-                active_loans += 1
-        
-        return Response({
-            'total_loans': loans.count(),
-            'active_loans': active_loans,
-            'completed_loans': completed_loans,
-            'total_debt': total_debt,
-            'total_paid': total_paid,
-            'remaining_debt': remaining_debt,
-            'completion_percentage': (total_paid / total_debt * 100) if total_debt > 0 else 0
-        })
+        """
+        Obtiene un resumen de todos los préstamos del usuario, calculado en
+        una sola consulta agregada que no depende de la cantidad de pagos
+        """
+        return Response(LoanService.portfolio_summary(request.user))
     
     @action(detail=True, methods=['post'])
     def add_payment(self, request, pk=None):
-        """Agrega un pago a un préstamo específico"""
+        """
+        Agrega un pago a un préstamo específico. El préstamo se bloquea al
+        registrar el pago, así dos pagos simultáneos no pueden superar el
+        número de cuotas
+        """
         try:
-            loan = self.get_object()
-            
-            # Verificar que el préstamo no esté completamente pagado
-            if loan.is_completed:
-                return Response(
-                    {'error': 'Este préstamo ya está completamente pagado'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            serializer = LoanPaymentCreateSerializer(
-                data=request.data,
-                context={'request': request, 'view': self}
+            serializer = LoanPaymentCreateSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                payment = LoanService.add_payment(pk, request.user, serializer.validated_data)
+            except Loan.DoesNotExist:
+                return Response({'detail': 'No encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+            except LoanCompletedError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response(
+                LoanPaymentSerializer(payment).data,
+                status=status.HTTP_201_CREATED
             )
             
-            if serializer.is_valid():
-                payment = serializer.save()
-                return Response(
-                    LoanPaymentSerializer(payment).data,
-                    status=status.HTTP_201_CREATED
-                )
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            
         except Exception as e:
             return Response(
                 {'error': f'Error al procesar el pago: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-    
-    @action(detail=True, methods=['get'])
-    def payments(self, request, pk=None):
-        """Obtiene todos los pagos de un préstamo específico"""
-        loan = self.get_object()
-        payments = loan.payments.all()
-        serializer = LoanPaymentSerializer(payments, many=True)
-        return Response(serializer.data)
 
 
-class LoanPaymentViewSet(viewsets.ModelViewSet):
+class LoanPaymentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = LoanPaymentSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return LoanPayment.objects.filter(
-            loan__user=self.request.user
-        ).select_related('loan')
+        """
+        Pagos del usuario; en la ruta anidada loans/{loan_pk}/payments/ solo
+        los del préstamo indicado, del más reciente al más antiguo y paginados
+        """
+        queryset = LoanPayment.objects.filter(loan__user=self.request.user)
+        loan_pk = self.kwargs.get('loan_pk')
+        if loan_pk is not None:
+            get_object_or_404(Loan, pk=loan_pk, user=self.request.user)
+            return queryset.filter(loan_id=loan_pk)
+        return queryset.select_related('loan')
     
     def get_serializer_class(self):
         if self.action == 'create':
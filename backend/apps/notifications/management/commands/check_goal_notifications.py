@@ -1,18 +1,128 @@
-from django.core.management.base import BaseCommand
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import get_context
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from apps.common.metrics import track_job
+from apps.notifications.models import GoalNotificationCheckpoint
 from apps.notifications.services import NotificationService
 
+
+def run_partition(particion, total_particiones, batch_size, fecha, dry_run=False):
+    """
+    Revisar las metas de una partición de usuarios guardando el avance tras
+    cada lote, para que una ejecución interrumpida continúe donde quedó. Si
+    la revisión del día ya terminó, se recorre todo de nuevo: las metas
+    creadas o modificadas después también se revisan y las notificaciones
+    ya enviadas no se repiten.
+
+    Returns:
+        dict: Estadísticas acumuladas de la partición
+    """
+    fecha = date.fromisoformat(fecha)
+    partition = (particion, total_particiones) if total_particiones > 1 else None
+
+    if dry_run:
+        return dict(NotificationService.check_and_create_goal_notifications(
+            batch_size, partition=partition, today=fecha, dry_run=True
+        ))
+
+    checkpoint, _ = GoalNotificationCheckpoint.objects.get_or_create(
+        fecha=fecha, particion=particion, total_particiones=total_particiones
+    )
+    if checkpoint.completado:
+        checkpoint.ultimo_id = 0
+        checkpoint.estadisticas = {}
+        checkpoint.completado = False
+        checkpoint.save(update_fields=['ultimo_id', 'estadisticas', 'completado', 'updated_at'])
+
+    stats = Counter(checkpoint.estadisticas)
+
+    def save_progress(last_id, batch_stats):
+        stats.update(batch_stats)
+        checkpoint.ultimo_id = last_id
+        checkpoint.estadisticas = dict(stats)
+        checkpoint.save(update_fields=['ultimo_id', 'estadisticas', 'updated_at'])
+
+    NotificationService.check_and_create_goal_notifications(
+        batch_size,
+        after_id=checkpoint.ultimo_id,
+        partition=partition,
+        today=fecha,
+        on_batch=save_progress
+    )
+    checkpoint.completado = True
+    checkpoint.save(update_fields=['completado', 'updated_at'])
+    return dict(stats)
+
+
 class Command(BaseCommand):
     help = 'Verificar metas y crear notificaciones necesarias'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Metas por lote (por defecto 1000)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Procesos en paralelo; cada uno revisa los usuarios con usuario_id %% workers == índice'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Calcular las notificaciones sin crearlas ni guardar avance'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Descartar el avance de una ejecución interrumpida hoy y revisar todo de nuevo'
+        )
+
     def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        fecha = timezone.localdate().isoformat()
+        dry_run = options['dry_run']
+
         self.stdout.write('Verificando metas y creando notificaciones...')
-        
-        try:
-            NotificationService.check_and_create_goal_notifications()
-            self.stdout.write(
-                self.style.SUCCESS('✅ Notificaciones verificadas exitosamente')
-            )
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'❌ Error al verificar notificaciones: {str(e)}')
-            )
\ No newline at end of file
+        if dry_run:
+            self.stdout.write('Modo simulación: no se crearán notificaciones')
+        elif options['restart']:
+            GoalNotificationCheckpoint.objects.filter(fecha=fecha).delete()
+
+        error = None
+        with track_job('goal_notifications') as job:
+            try:
+                args = [(particion, workers, options['batch_size'], fecha, dry_run) for particion in range(workers)]
+                if workers == 1:
+                    results = [run_partition(*args[0])]
+                else:
+                    # Cada proceso abre su propia conexión. Con fork los hijos
+                    # heredan Django ya configurado; con spawn (macOS, Windows)
+                    # arrancarían sin django.setup()
+                    connections.close_all()
+                    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('fork')) as pool:
+                        results = list(pool.map(run_partition, *zip(*args)))
+            except Exception as e:
+                job.fail()
+                error = e
+            else:
+                stats = Counter()
+                for result in results:
+                    stats.update(result)
+                if not dry_run:
+                    for tipo, total in stats.items():
+                        job.add_rows(tipo, total)
+
+        if error is not None:
+            if not dry_run:
+                self.stdout.write('El avance quedó guardado; la próxima ejecución continuará desde el último lote')
+            raise CommandError(f'Error al verificar notificaciones: {error}') from error
+
+        self.stdout.write(f"Metas revisadas: {stats.pop('goals', 0)}")
+        for tipo, total in sorted(stats.items()):
+            self.stdout.write(f'  {tipo}: {total}')
+        self.stdout.write(
+            self.style.SUCCESS('✅ Notificaciones verificadas exitosamente')
+        )
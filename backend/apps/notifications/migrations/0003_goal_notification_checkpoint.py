@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalNotificationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('particion', models.PositiveIntegerField(default=0)),
+                ('total_particiones', models.PositiveIntegerField(default=1)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('estadisticas', models.JSONField(blank=True, default=dict)),
+                ('completado', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Avance de revisión de metas',
+                'verbose_name_plural': 'Avances de revisión de metas',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='goalnotificationcheckpoint',
+            constraint=models.UniqueConstraint(fields=('fecha', 'particion', 'total_particiones'), name='unique_goal_checkpoint_particion'),
+        ),
+    ]
@@ -80,4 +80,27 @@ class NotificationPreference(models.Model):
         verbose_name_plural = 'Preferencias de Notificaciones'
     
     def __str__(self):
-        return f"Preferencias de {self.usuario.username}"
\ No newline at end of file
+        return f"Preferencias de {self.usuario.username}"
+
+class GoalNotificationCheckpoint(models.Model):
+    """Avance de la revisión diaria de metas, por partición de usuarios"""
+    fecha = models.DateField()
+    particion = models.PositiveIntegerField(default=0)
+    total_particiones = models.PositiveIntegerField(default=1)
+    ultimo_id = models.BigIntegerField(default=0)  # Última meta procesada
+    estadisticas = models.JSONField(default=dict, blank=True)
+    completado = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Avance de revisión de metas'
+        verbose_name_plural = 'Avances de revisión de metas'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'particion', 'total_particiones'],
+                name='unique_goal_checkpoint_particion'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.particion + 1}/{self.total_particiones} - meta {self.ultimo_id}"
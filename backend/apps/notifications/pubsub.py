@@ -0,0 +1,194 @@
+"""
+Pub/sub de eventos de notificaciones para el stream SSE.
+
+El backend se elige con ``NOTIFICATIONS_PUBSUB_BACKEND`` (por defecto
+``LocalSocketPubSub``):
+
+- ``InProcessPubSub``: colas en memoria, solo entrega a suscriptores del
+  mismo proceso (runserver, un único worker con hilos).
+- ``LocalSocketPubSub``: un socket Unix de datagramas por suscriptor en
+  ``NOTIFICATIONS_PUBSUB_SOCKET_DIR``, entrega entre todos los workers de la
+  misma máquina sin servicios externos.
+
+Las suscripciones tienen ``get`` para el stream síncrono y ``aget`` para el
+stream async, que espera en el event loop sin ocupar un hilo.
+"""
+import asyncio
+import glob
+import json
+import os
+import queue
+import socket
+import threading
+import uuid
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class InProcessPubSub:
+    """Pub/sub con colas en memoria del proceso actual"""
+
+    class Subscription:
+        def __init__(self, pubsub, user_id):
+            self.pubsub = pubsub
+            self.user_id = user_id
+            self.queue = queue.Queue()
+            self.waiter = None
+
+        def get(self, timeout=None):
+            """Esperar el siguiente evento, ``None`` si se agota el timeout"""
+            try:
+                return self.queue.get(timeout=timeout)
+            except queue.Empty:
+                return None
+
+        async def aget(self, timeout=None):
+            """Versión async de ``get``"""
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            # Registrar la espera antes de mirar la cola para no perder un
+            # evento publicado entre ambas cosas
+            self.waiter = (loop, future)
+            try:
+                try:
+                    return self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    await asyncio.wait_for(future, timeout)
+                except asyncio.TimeoutError:
+                    return None
+            finally:
+                self.waiter = None
+            try:
+                return self.queue.get_nowait()
+            except queue.Empty:
+                return None
+
+        def wake(self):
+            waiter = self.waiter
+            if waiter is not None:
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+                except RuntimeError:
+                    # El event loop ya terminó
+                    pass
+
+        def close(self):
+            self.pubsub._unsubscribe(self)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, user_id):
+        subscription = self.Subscription(self, user_id)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.queue.put(event)
+            subscription.wake()
+
+
+class LocalSocketPubSub:
+    """Pub/sub entre procesos de la misma máquina con sockets Unix de datagramas"""
+
+    # Los eventos se envían en un solo datagrama
+    MAX_EVENT_SIZE = 64 * 1024
+
+    class Subscription:
+        def __init__(self, path):
+            self.path = path
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.socket.bind(path)
+
+        def get(self, timeout=None):
+            """Esperar el siguiente evento, ``None`` si se agota el timeout"""
+            self.socket.settimeout(timeout)
+            try:
+                data = self.socket.recv(LocalSocketPubSub.MAX_EVENT_SIZE)
+            except socket.timeout:
+                return None
+            return json.loads(data)
+
+        async def aget(self, timeout=None):
+            """Versión async de ``get``"""
+            self.socket.setblocking(False)
+            loop = asyncio.get_running_loop()
+            try:
+                data = await asyncio.wait_for(
+                    loop.sock_recv(self.socket, LocalSocketPubSub.MAX_EVENT_SIZE), timeout
+                )
+            except asyncio.TimeoutError:
+                return None
+            return json.loads(data)
+
+        def close(self):
+            self.socket.close()
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __init__(self, directory=None):
+        self.directory = directory or settings.NOTIFICATIONS_PUBSUB_SOCKET_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def subscribe(self, user_id):
+        path = os.path.join(self.directory, f'{user_id}-{uuid.uuid4().hex}.sock')
+        return self.Subscription(path)
+
+    def publish(self, user_id, event):
+        data = json.dumps(event, cls=DjangoJSONEncoder).encode('utf-8')
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            for path in glob.glob(os.path.join(self.directory, f'{user_id}-*.sock')):
+                try:
+                    sender.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Suscriptor de un proceso que terminó sin cerrar su socket
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                except BlockingIOError:
+                    # Buffer del suscriptor lleno: descarta el evento, el
+                    # cliente se resincroniza al reconectar
+                    pass
+        finally:
+            sender.close()
+
+
+_pubsub = None
+_pubsub_lock = threading.Lock()
+
+
+def get_pubsub():
+    """Instancia única del backend configurado"""
+    global _pubsub
+    if _pubsub is None:
+        with _pubsub_lock:
+            if _pubsub is None:
+                _pubsub = import_string(settings.NOTIFICATIONS_PUBSUB_BACKEND)()
+    return _pubsub
+
+
+def reset_pubsub():
+    """Descartar la instancia actual (p. ej. tras cambiar la configuración)"""
+    global _pubsub
+    _pubsub = None
@@ -1,6 +1,13 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Mod
 from django.utils import timezone
-from datetime import timedelta
+from apps.common.cache_utils import bump_user_cache_version
 from .models import Notification, NotificationPreference
+from .pubsub import get_pubsub
+from .serializers import NotificationSerializer
 from apps.goals.models import SavingGoal
 
 class NotificationService:
@@ -9,7 +16,7 @@ class NotificationService:
     @staticmethod
     def create_notification(usuario, tipo, titulo, mensaje, meta_relacionada=None, prioridad='medium', data_extra=None):
         """Crear una nueva notificación"""
-        return Notification.objects.create(
+        notification = Notification.objects.create(
             usuario=usuario,
             tipo=tipo,
             titulo=titulo,
@@ -18,6 +25,47 @@ class NotificationService:
             prioridad=prioridad,
             data_extra=data_extra or {}
         )
+        NotificationService.publish_notifications([notification])
+        return notification
+
+    @staticmethod
+    def publish_notifications(notifications):
+        """
+        Enviar al stream las notificaciones nuevas y el contador actualizado de
+        cada usuario afectado, con una sola consulta para los contadores.
+        """
+        def publish():
+            pubsub = get_pubsub()
+            por_usuario = defaultdict(list)
+            for notification in notifications:
+                por_usuario[notification.usuario_id].append(notification)
+
+            unread_counts = dict(
+                Notification.objects.filter(usuario_id__in=por_usuario, leida=False)
+                .values('usuario_id').annotate(total=Count('id')).values_list('usuario_id', 'total')
+            )
+            for usuario_id, nuevas in por_usuario.items():
+                for notification in nuevas:
+                    pubsub.publish(usuario_id, {
+                        'type': 'notification',
+                        'notification': NotificationSerializer(notification).data,
+                    })
+                pubsub.publish(usuario_id, {
+                    'type': 'unread_count',
+                    'unread_count': unread_counts.get(usuario_id, 0),
+                })
+
+        if notifications:
+            transaction.on_commit(publish)
+
+    @staticmethod
+    def publish_unread_count(usuario_id):
+        """Enviar al stream la cantidad actual de notificaciones no leídas"""
+        def publish():
+            unread_count = Notification.objects.filter(usuario_id=usuario_id, leida=False).count()
+            get_pubsub().publish(usuario_id, {'type': 'unread_count', 'unread_count': unread_count})
+
+        transaction.on_commit(publish)
     
     @staticmethod
     def notify_goal_completed(goal):
@@ -50,21 +98,26 @@ class NotificationService:
         ).first()
         
         if preferences and days_remaining <= preferences.deadline_days_before:
-            prioridad = 'urgent' if days_remaining <= 3 else 'high'
-            
             return NotificationService.create_notification(
                 usuario=goal.usuario,
-                tipo='goal_deadline',
-                titulo='⏰ Meta próxima a vencer',
-                mensaje=f'Tu meta "{goal.nombre}" vence en {days_remaining} día{"s" if days_remaining > 1 else ""}. Te faltan {goal.monto_faltante} para completarla.',
-                meta_relacionada=goal,
-                prioridad=prioridad,
-                data_extra={
-                    'days_remaining': days_remaining,
-                    'monto_faltante': float(goal.monto_faltante),
-                    'porcentaje_completado': goal.porcentaje_completado
-                }
+                **NotificationService.goal_deadline_data(goal, days_remaining)
             )
+
+    @staticmethod
+    def goal_deadline_data(goal, days_remaining):
+        """Contenido de la notificación de meta próxima a vencer"""
+        return {
+            'tipo': 'goal_deadline',
+            'titulo': '⏰ Meta próxima a vencer',
+            'mensaje': f'Tu meta "{goal.nombre}" vence en {days_remaining} día{"s" if days_remaining > 1 else ""}. Te faltan {goal.monto_faltante} para completarla.',
+            'meta_relacionada': goal,
+            'prioridad': 'urgent' if days_remaining <= 3 else 'high',
+            'data_extra': {
+                'days_remaining': days_remaining,
+                'monto_faltante': float(goal.monto_faltante),
+                'porcentaje_completado': goal.porcentaje_completado
+            }
+        }
     
     @staticmethod
     def notify_goal_overdue(goal):
@@ -79,16 +132,23 @@ class NotificationService:
             
             return NotificationService.create_notification(
                 usuario=goal.usuario,
-                tipo='goal_overdue',
-                titulo='📅 Meta vencida',
-                mensaje=f'Tu meta "{goal.nombre}" venció hace {days_overdue} día{"s" if days_overdue > 1 else ""}. ¿Quieres extender la fecha límite?',
-                meta_relacionada=goal,
-                prioridad='medium',
-                data_extra={
-                    'days_overdue': days_overdue,
-                    'monto_faltante': float(goal.monto_faltante)
-                }
+                **NotificationService.goal_overdue_data(goal, days_overdue)
             )
+
+    @staticmethod
+    def goal_overdue_data(goal, days_overdue):
+        """Contenido de la notificación de meta vencida"""
+        return {
+            'tipo': 'goal_overdue',
+            'titulo': '📅 Meta vencida',
+            'mensaje': f'Tu meta "{goal.nombre}" venció hace {days_overdue} día{"s" if days_overdue > 1 else ""}. ¿Quieres extender la fecha límite?',
+            'meta_relacionada': goal,
+            'prioridad': 'medium',
+            'data_extra': {
+                'days_overdue': days_overdue,
+                'monto_faltante': float(goal.monto_faltante)
+            }
+        }
     
     @staticmethod
     def notify_savings_reminder(goal):
@@ -123,68 +183,143 @@ class NotificationService:
         if preferences:
             return NotificationService.create_notification(
                 usuario=goal.usuario,
-                tipo='milestone_reached',
-                titulo=f'🎯 ¡{milestone_percentage}% completado!',
-                mensaje=f'¡Excelente progreso! Has completado el {milestone_percentage}% de tu meta "{goal.nombre}". ¡Sigue así!',
-                meta_relacionada=goal,
-                prioridad='medium',
-                data_extra={
-                    'milestone_percentage': milestone_percentage,
-                    'monto_actual': float(goal.monto_actual),
-                    'monto_objetivo': float(goal.monto_objetivo)
-                }
+                **NotificationService.milestone_reached_data(goal, milestone_percentage)
             )
-    
+
     @staticmethod
-    def check_and_create_goal_notifications():
-        """Verificar todas las metas y crear notificaciones necesarias"""
-        today = timezone.now().date()
-        
-        # Obtener todas las metas activas
-        active_goals = SavingGoal.objects.filter(completada=False)
-        
-        for goal in active_goals:
+    def milestone_reached_data(goal, milestone_percentage):
+        """Contenido de la notificación de hito alcanzado"""
+        return {
+            'tipo': 'milestone_reached',
+            'titulo': f'🎯 ¡{milestone_percentage}% completado!',
+            'mensaje': f'¡Excelente progreso! Has completado el {milestone_percentage}% de tu meta "{goal.nombre}". ¡Sigue así!',
+            'meta_relacionada': goal,
+            'prioridad': 'medium',
+            'data_extra': {
+                'milestone_percentage': milestone_percentage,
+                'monto_actual': float(goal.monto_actual),
+                'monto_objetivo': float(goal.monto_objetivo)
+            }
+        }
+
+    @staticmethod
+    def check_and_create_goal_notifications(batch_size=1000, after_id=0, partition=None,
+                                            today=None, dry_run=False, on_batch=None):
+        """
+        Verificar todas las metas activas y crear notificaciones necesarias.
+
+        Recorre las metas por lotes de id; cada lote cuesta una consulta de
+        metas, una de preferencias, una de notificaciones previas y un
+        bulk_create, sin importar cuántas metas contenga.
+
+        Args:
+            batch_size (int): Metas por lote
+            after_id (int): Continuar después de esta meta
+            partition (tuple): (índice, total) para procesar solo los usuarios
+                con usuario_id % total == índice
+            today (date): Fecha de referencia, hoy por defecto
+            dry_run (bool): Calcular sin crear notificaciones
+            on_batch (callable): Se llama con (último id, estadísticas del lote)
+                después de cada lote
+
+        Returns:
+            Counter: Metas revisadas ('goals') y notificaciones creadas por tipo
+        """
+        stats = Counter()
+        goals = SavingGoal.objects.filter(completada=False).order_by('id')
+        if partition is not None:
+            index, total = partition
+            goals = goals.annotate(particion=Mod('usuario_id', total)).filter(particion=index)
+        last_id = after_id
+
+        while True:
+            batch = list(goals.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return stats
+            last_id = batch[-1].id
+            # Un lote y su callback (p. ej. un checkpoint) se confirman juntos
+            with transaction.atomic():
+                batch_stats = NotificationService.check_goal_batch(batch, today=today, dry_run=dry_run)
+                if on_batch is not None:
+                    on_batch(last_id, batch_stats)
+            stats.update(batch_stats)
+
+    @staticmethod
+    def check_goal_batch(goals, today=None, dry_run=False):
+        """
+        Crear las notificaciones de vencimiento, atraso e hitos de un lote de
+        metas.
+
+        Args:
+            goals (list): Metas activas del lote
+            today (date): Fecha de referencia, hoy por defecto
+            dry_run (bool): Calcular sin crear notificaciones
+
+        Returns:
+            Counter: Metas revisadas ('goals') y notificaciones por tipo
+        """
+        today = today or timezone.localdate()
+        stats = Counter(goals=len(goals))
+        if not goals:
+            return stats
+
+        preferences = {
+            preference.usuario_id: preference
+            for preference in NotificationPreference.objects.filter(
+                usuario_id__in={goal.usuario_id for goal in goals}
+            )
+        }
+
+        # Notificaciones previas que impiden repetir: vencimiento del último
+        # día, atraso de la última semana e hitos ya notificados
+        start_of_today = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+        already_sent = set()
+        for goal_id, tipo, milestone in Notification.objects.filter(
+            Q(tipo='goal_deadline', created_at__gte=start_of_today - timedelta(days=1)) |
+            Q(tipo='goal_overdue', created_at__gte=start_of_today - timedelta(days=7)) |
+            Q(tipo='milestone_reached'),
+            meta_relacionada_id__in=[goal.id for goal in goals]
+        ).values_list('meta_relacionada_id', 'tipo', 'data_extra__milestone_percentage'):
+            already_sent.add((goal_id, tipo, milestone if tipo == 'milestone_reached' else None))
+
+        notifications = []
+        for goal in goals:
+            preference = preferences.get(goal.usuario_id)
+            if preference is None:
+                continue
+
+            candidates = []
             if goal.fecha_limite:
                 days_remaining = (goal.fecha_limite - today).days
-                
-                # Verificar si está próxima a vencer
-                if days_remaining > 0:
-                    # Verificar si ya existe una notificación reciente del mismo tipo
-                    recent_deadline_notification = Notification.objects.filter(
-                        usuario=goal.usuario,
-                        meta_relacionada=goal,
-                        tipo='goal_deadline',
-                        created_at__gte=today - timedelta(days=1)
-                    ).exists()
-                    
-                    if not recent_deadline_notification:
-                        NotificationService.notify_goal_deadline_approaching(goal, days_remaining)
-                
-                # Verificar si está vencida
-                elif days_remaining < 0:
-                    recent_overdue_notification = Notification.objects.filter(
-                        usuario=goal.usuario,
-                        meta_relacionada=goal,
-                        tipo='goal_overdue',
-                        created_at__gte=today - timedelta(days=7)  # Una vez por semana
-                    ).exists()
-                    
-                    if not recent_overdue_notification:
-                        NotificationService.notify_goal_overdue(goal)
-            
-            # Verificar hitos alcanzados
-            percentage = goal.porcentaje_completado
-            milestones = [25, 50, 75]
-            
-            for milestone in milestones:
-                if percentage >= milestone:
-                    # Verificar si ya se notificó este hito
-                    milestone_notification = Notification.objects.filter(
-                        usuario=goal.usuario,
-                        meta_relacionada=goal,
-                        tipo='milestone_reached',
-                        data_extra__milestone_percentage=milestone
-                    ).exists()
-                    
-                    if not milestone_notification:
-                        NotificationService.notify_milestone_reached(goal, milestone)
\ No newline at end of file
+                if (
+                    0 < days_remaining <= preference.deadline_days_before
+                    and preference.goal_deadline_enabled
+                    and (goal.id, 'goal_deadline', None) not in already_sent
+                ):
+                    candidates.append(NotificationService.goal_deadline_data(goal, days_remaining))
+                elif (
+                    days_remaining < 0
+                    and preference.goal_overdue_enabled
+                    and (goal.id, 'goal_overdue', None) not in already_sent
+                ):
+                    candidates.append(NotificationService.goal_overdue_data(goal, -days_remaining))
+
+            if preference.milestone_reached_enabled:
+                percentage = goal.porcentaje_completado
+                for milestone in [25, 50, 75]:
+                    if percentage >= milestone and (goal.id, 'milestone_reached', milestone) not in already_sent:
+                        candidates.append(NotificationService.milestone_reached_data(goal, milestone))
+
+            for data in candidates:
+                stats[data['tipo']] += 1
+                notifications.append(Notification(usuario_id=goal.usuario_id, **data))
+
+        if dry_run or not notifications:
+            return stats
+
+        Notification.objects.bulk_create(notifications, batch_size=500)
+        # bulk_create no dispara señales
+        for usuario_id in {notification.usuario_id for notification in notifications}:
+            bump_user_cache_version(usuario_id)
+        NotificationService.publish_notifications(notifications)
+        return stats
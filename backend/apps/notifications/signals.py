@@ -0,0 +1,8 @@
+"""
+Signal handlers for notification models.
+"""
+from apps.common.cache_utils import invalidate_user_cache_on_change
+from .models import Notification, NotificationPreference
+
+invalidate_user_cache_on_change(Notification, lambda instance: instance.usuario_id)
+invalidate_user_cache_on_change(NotificationPreference, lambda instance: instance.usuario_id)
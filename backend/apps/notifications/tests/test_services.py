@@ -0,0 +1,173 @@
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from django.utils import timezone
+from apps.goals.models import SavingGoal
+from apps.notifications.models import Notification, NotificationPreference
+from apps.notifications.services import NotificationService
+
+
+def create_goal(user, dias=None, monto_actual='0', **kwargs):
+    fecha_limite = timezone.localdate() + timedelta(days=dias) if dias is not None else None
+    return SavingGoal.objects.create(
+        usuario=user,
+        nombre=kwargs.pop('nombre', 'Meta'),
+        monto_objetivo=Decimal('1000'),
+        monto_actual=Decimal(monto_actual),
+        fecha_limite=fecha_limite,
+        **kwargs
+    )
+
+
+@pytest.mark.django_db
+class TestGoalNotificationSweep:
+    """Tests para la revisión por lotes de metas"""
+
+    def test_creates_expected_notifications(self, user, another_user):
+        """Verifica vencimientos, atrasos e hitos según las preferencias"""
+        NotificationPreference.objects.create(usuario=user)
+        NotificationPreference.objects.create(usuario=another_user, milestone_reached_enabled=False)
+        proxima = create_goal(user, dias=3)
+        vencida = create_goal(user, dias=-2, monto_actual='600')
+        create_goal(user, dias=30)
+        create_goal(user, dias=3, completada=True)
+        create_goal(another_user, dias=-1, monto_actual='900')
+
+        stats = NotificationService.check_and_create_goal_notifications()
+
+        assert stats['goals'] == 4
+        assert stats['goal_deadline'] == 1
+        assert stats['goal_overdue'] == 2
+        assert stats['milestone_reached'] == 2
+        deadline = Notification.objects.get(tipo='goal_deadline')
+        assert deadline.meta_relacionada == proxima
+        assert deadline.prioridad == 'urgent'
+        assert set(Notification.objects.filter(meta_relacionada=vencida).values_list('tipo', flat=True)) == {
+            'goal_overdue', 'milestone_reached'
+        }
+        assert not Notification.objects.filter(usuario=another_user, tipo='milestone_reached').exists()
+
+    def test_second_run_does_not_repeat(self, user):
+        """Verifica que una segunda ejecución no duplica notificaciones"""
+        NotificationPreference.objects.create(usuario=user)
+        create_goal(user, dias=2, monto_actual='800')
+        NotificationService.check_and_create_goal_notifications()
+        total = Notification.objects.count()
+
+        stats = NotificationService.check_and_create_goal_notifications()
+
+        assert Notification.objects.count() == total == 4
+        assert stats['goals'] == 1
+        assert sum(stats.values()) == 1
+
+    def test_without_preferences_creates_nothing(self, user):
+        """Verifica que sin preferencias no se notifica"""
+        create_goal(user, dias=2)
+        NotificationService.check_and_create_goal_notifications()
+        assert Notification.objects.count() == 0
+
+    def test_constant_queries_per_batch(self, user, django_assert_max_num_queries):
+        """Verifica que el costo por lote no depende de la cantidad de metas"""
+        NotificationPreference.objects.create(usuario=user)
+        for i in range(60):
+            create_goal(user, dias=(i % 10) - 5, monto_actual=str(i * 15), nombre=f'Meta {i}')
+
+        # Metas + preferencias + notificaciones previas + bulk_create (SQLite lo
+        # parte según su límite de parámetros) + savepoint del lote + fin del recorrido
+        with django_assert_max_num_queries(8):
+            NotificationService.check_and_create_goal_notifications()
+
+        assert Notification.objects.count() > 60
+
+    def test_partition_only_processes_its_users(self, user, another_user):
+        """Verifica que una partición solo revisa los usuarios que le corresponden"""
+        NotificationPreference.objects.create(usuario=user)
+        NotificationPreference.objects.create(usuario=another_user)
+        create_goal(user, dias=2)
+        create_goal(another_user, dias=2)
+
+        stats = NotificationService.check_and_create_goal_notifications(partition=(user.id % 2, 2))
+
+        assert stats['goals'] == 1
+        assert list(Notification.objects.values_list('usuario_id', flat=True)) == [user.id]
+
+
+@pytest.mark.django_db
+class TestCheckGoalNotificationsCommand:
+    """Tests para el comando check_goal_notifications"""
+
+    def test_dry_run_reports_without_creating(self, user):
+        """Verifica que --dry-run informa estadísticas sin crear nada"""
+        from io import StringIO
+        from django.core.management import call_command
+        from apps.notifications.models import GoalNotificationCheckpoint
+
+        NotificationPreference.objects.create(usuario=user)
+        create_goal(user, dias=2)
+        out = StringIO()
+
+        call_command('check_goal_notifications', '--dry-run', stdout=out)
+
+        assert 'Metas revisadas: 1' in out.getvalue()
+        assert 'goal_deadline: 1' in out.getvalue()
+        assert Notification.objects.count() == 0
+        assert GoalNotificationCheckpoint.objects.count() == 0
+
+    def test_resumes_from_checkpoint(self, user):
+        """Verifica que una ejecución interrumpida continúa desde el checkpoint"""
+        from django.core.management import call_command
+        from apps.notifications.models import GoalNotificationCheckpoint
+
+        NotificationPreference.objects.create(usuario=user)
+        procesada = create_goal(user, dias=2)
+        pendiente = create_goal(user, dias=2)
+        GoalNotificationCheckpoint.objects.create(
+            fecha=timezone.localdate(), ultimo_id=procesada.id, estadisticas={'goals': 1}
+        )
+
+        call_command('check_goal_notifications', '--batch-size', '1')
+
+        assert list(Notification.objects.values_list('meta_relacionada_id', flat=True)) == [pendiente.id]
+        checkpoint = GoalNotificationCheckpoint.objects.get()
+        assert checkpoint.completado
+        assert checkpoint.ultimo_id == pendiente.id
+        assert checkpoint.estadisticas == {'goals': 2, 'goal_deadline': 1}
+
+        # Con el día completado, una nueva ejecución recorre todas las metas
+        nueva = create_goal(user, dias=2)
+        call_command('check_goal_notifications')
+        assert set(Notification.objects.values_list('meta_relacionada_id', flat=True)) == {
+            procesada.id, pendiente.id, nueva.id
+        }
+        checkpoint.refresh_from_db()
+        assert checkpoint.completado
+        assert checkpoint.estadisticas['goals'] == 3
+
+    def test_restart_discards_interrupted_progress(self, user):
+        """Verifica que --restart descarta el avance de una ejecución interrumpida"""
+        from django.core.management import call_command
+        from apps.notifications.models import GoalNotificationCheckpoint
+
+        NotificationPreference.objects.create(usuario=user)
+        procesada = create_goal(user, dias=2)
+        GoalNotificationCheckpoint.objects.create(
+            fecha=timezone.localdate(), ultimo_id=procesada.id, estadisticas={'goals': 1}
+        )
+
+        call_command('check_goal_notifications', '--restart')
+
+        assert list(Notification.objects.values_list('meta_relacionada_id', flat=True)) == [procesada.id]
+        assert GoalNotificationCheckpoint.objects.get().estadisticas == {'goals': 1, 'goal_deadline': 1}
+
+    def test_failure_exits_with_error(self, user, monkeypatch):
+        """Verifica que un error en la revisión termina el comando con CommandError"""
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        def fail(*args, **kwargs):
+            raise RuntimeError('sin conexión')
+
+        monkeypatch.setattr(NotificationService, 'check_and_create_goal_notifications', fail)
+
+        with pytest.raises(CommandError, match='sin conexión'):
+            call_command('check_goal_notifications')
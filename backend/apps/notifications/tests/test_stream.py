@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import pytest
+from django.test import Client
+from apps.notifications.models import Notification
+from apps.notifications.pubsub import InProcessPubSub, LocalSocketPubSub, reset_pubsub
+from apps.notifications.services import NotificationService
+
+
+@pytest.fixture
+def in_process_pubsub(settings):
+    settings.NOTIFICATIONS_PUBSUB_BACKEND = 'apps.notifications.pubsub.InProcessPubSub'
+    settings.NOTIFICATIONS_STREAM_ENABLED = True
+    reset_pubsub()
+    yield
+    reset_pubsub()
+
+
+def read_event(chunk):
+    """Convierte un evento SSE en (tipo, datos)"""
+    lines = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+    return lines['event'], json.loads(lines['data'])
+
+
+class TestPubSub:
+    """Tests para los backends de pub/sub"""
+
+    def test_in_process_delivers_only_to_user(self):
+        """Verifica que los eventos llegan solo a los suscriptores del usuario"""
+        pubsub = InProcessPubSub()
+        subscription = pubsub.subscribe(1)
+        other = pubsub.subscribe(2)
+
+        pubsub.publish(1, {'type': 'unread_count', 'unread_count': 3})
+
+        assert subscription.get(timeout=1) == {'type': 'unread_count', 'unread_count': 3}
+        assert other.get(timeout=0.01) is None
+        subscription.close()
+        other.close()
+
+    def test_local_socket_delivers_and_cleans_up(self, tmp_path):
+        """Verifica la entrega por socket local y la limpieza de sockets huérfanos"""
+        pubsub = LocalSocketPubSub(str(tmp_path))
+        subscription = pubsub.subscribe(1)
+        (tmp_path / '1-huerfano.sock').touch()
+
+        pubsub.publish(1, {'type': 'unread_count', 'unread_count': 5})
+
+        assert subscription.get(timeout=1) == {'type': 'unread_count', 'unread_count': 5}
+        assert not (tmp_path / '1-huerfano.sock').exists()
+        subscription.close()
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.parametrize('backend', ['in_process', 'local_socket'])
+    def test_async_get(self, backend, tmp_path):
+        """Verifica que aget espera en el event loop los eventos publicados desde otro hilo"""
+        pubsub = InProcessPubSub() if backend == 'in_process' else LocalSocketPubSub(str(tmp_path))
+        subscription = pubsub.subscribe(1)
+
+        async def receive():
+            assert await subscription.aget(timeout=0.01) is None
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, lambda: threading.Thread(
+                target=pubsub.publish, args=(1, {'type': 'unread_count', 'unread_count': 7})
+            ).start())
+            return await subscription.aget(timeout=2)
+
+        assert asyncio.run(receive()) == {'type': 'unread_count', 'unread_count': 7}
+        subscription.close()
+
+
+@pytest.mark.django_db
+class TestNotificationStream:
+    """Tests para el endpoint SSE de notificaciones"""
+
+    def test_requires_authentication(self):
+        """Verifica que se requiere autenticación"""
+        response = Client().get('/api/notifications/stream/')
+        assert response.status_code == 403
+
+    def test_disabled_stream_returns_no_content(self, user, settings):
+        """Verifica que con workers sync el stream responde 204 para que el cliente consulte"""
+        settings.NOTIFICATIONS_STREAM_ENABLED = False
+        client = Client()
+        client.force_login(user)
+
+        response = client.get('/api/notifications/stream/')
+
+        assert response.status_code == 204
+        assert not response.streaming
+
+    def test_stream_limit_per_process(self, user, settings, in_process_pubsub):
+        """Verifica que al llegar al máximo de streams abiertos responde 204 y libera el cupo al cerrar"""
+        settings.NOTIFICATIONS_STREAM_MAX_CONNECTIONS = 1
+        client = Client()
+        client.force_login(user)
+
+        response = client.get('/api/notifications/stream/')
+        assert next(iter(response.streaming_content)).startswith(b'retry:')
+        assert client.get('/api/notifications/stream/').status_code == 204
+
+        response.close()
+        second = client.get('/api/notifications/stream/')
+        assert second.streaming
+        next(iter(second.streaming_content))
+        second.close()
+
+    def test_stream_pushes_new_notifications(self, user, in_process_pubsub, django_capture_on_commit_callbacks):
+        """Verifica que el stream envía el contador inicial y las notificaciones nuevas"""
+        Notification.objects.create(usuario=user, tipo='savings_reminder', titulo='Previa', mensaje='...')
+        client = Client()
+        client.force_login(user)
+
+        response = client.get('/api/notifications/stream/')
+        assert response['Content-Type'] == 'text/event-stream'
+        chunks = iter(response.streaming_content)
+        assert next(chunks).startswith(b'retry:')
+        assert read_event(next(chunks)) == ('unread_count', {'type': 'unread_count', 'unread_count': 1})
+
+        with django_capture_on_commit_callbacks(execute=True):
+            NotificationService.create_notification(user, 'savings_reminder', 'Nueva', 'Hola')
+
+        event_type, data = read_event(next(chunks))
+        assert event_type == 'notification'
+        assert data['notification']['titulo'] == 'Nueva'
+        assert read_event(next(chunks))[1]['unread_count'] == 2
+        response.close()
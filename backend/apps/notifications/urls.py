@@ -1,11 +1,17 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import NotificationViewSet, NotificationPreferenceViewSet
+from .views import NotificationViewSet, NotificationPreferenceViewSet, notification_stream, notification_stream_async
 
 router = DefaultRouter()
 router.register(r'notifications', NotificationViewSet, basename='notifications')
 router.register(r'preferences', NotificationPreferenceViewSet, basename='notification-preferences')
 
 urlpatterns = [
+    path(
+        'stream/',
+        notification_stream_async if settings.ASYNC_VIEWS else notification_stream,
+        name='notification-stream'
+    ),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -2,11 +2,24 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+import json
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.views.decorators.http import require_GET
+from apps.common.cache_utils import cache_user_response, bump_user_cache_version, ConditionalGetMixin
 from .models import Notification, NotificationPreference
+from .pubsub import get_pubsub
 from .serializers import NotificationSerializer, NotificationPreferenceSerializer
+from .services import NotificationService
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
     
@@ -16,7 +29,12 @@ class NotificationViewSet(viewsets.ModelViewSet):
             usuario=self.request.user
         ).order_by('-created_at')
     
+    def perform_destroy(self, instance):
+        instance.delete()
+        NotificationService.publish_unread_count(self.request.user.pk)
+
     @action(detail=False, methods=['get'])
+    @cache_user_response('notifications.unread_count')
     def unread_count(self, request):
         """Obtener cantidad de notificaciones no leídas"""
         count = self.get_queryset().filter(leida=False).count()
@@ -29,6 +47,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
             leida=True,
             read_at=timezone.now()
         )
+        # update() no dispara señales
+        bump_user_cache_version(request.user.pk)
+        NotificationService.publish_unread_count(request.user.pk)
         return Response({'marked_read': updated})
     
     @action(detail=True, methods=['post'])
@@ -36,6 +57,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """Marcar una notificación específica como leída"""
         notification = self.get_object()
         notification.mark_as_read()
+        NotificationService.publish_unread_count(request.user.pk)
         return Response({'status': 'marked_read'})
     
     @action(detail=False, methods=['get'])
@@ -45,7 +67,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(notifications, many=True)
         return Response(serializer.data)
 
-class NotificationPreferenceViewSet(viewsets.ModelViewSet):
+class NotificationPreferenceViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = NotificationPreferenceSerializer
     permission_classes = [IsAuthenticated]
     
@@ -74,4 +96,128 @@ class NotificationPreferenceViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _sse_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+class _StreamSlots:
+    """Cuenta los streams abiertos por este proceso con hilos de WSGI"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._active >= settings.NOTIFICATIONS_STREAM_MAX_CONNECTIONS:
+                return False
+            self._active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+
+
+_stream_slots = _StreamSlots()
+
+
+@require_GET
+def notification_stream(request):
+    """
+    Stream SSE con las notificaciones nuevas y los cambios del contador de no
+    leídas del usuario. La conexión se cierra tras
+    NOTIFICATIONS_STREAM_MAX_SECONDS para liberar el worker; EventSource
+    reconecta solo y recibe el contador actual al conectarse.
+
+    Con NOTIFICATIONS_STREAM_ENABLED desactivado (workers sync) responde 204:
+    EventSource deja de reconectar y el frontend consulta periódicamente. Cada
+    stream ocupa un hilo, así que también responde 204 cuando el proceso ya
+    tiene NOTIFICATIONS_STREAM_MAX_CONNECTIONS abiertos.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+    if not settings.NOTIFICATIONS_STREAM_ENABLED or not _stream_slots.acquire():
+        return HttpResponse(status=204)
+
+    user_id = request.user.pk
+    try:
+        # Suscribirse antes de leer el contador para no perder eventos intermedios
+        subscription = get_pubsub().subscribe(user_id)
+        unread_count = Notification.objects.filter(usuario_id=user_id, leida=False).count()
+    except Exception:
+        _stream_slots.release()
+        raise
+    # El stream no usa la base de datos mientras espera eventos
+    close_old_connections()
+
+    def events():
+        try:
+            yield f"retry: {settings.NOTIFICATIONS_STREAM_RETRY_MS}\n\n"
+            yield _sse_event({'type': 'unread_count', 'unread_count': unread_count})
+
+            deadline = time.monotonic() + settings.NOTIFICATIONS_STREAM_MAX_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = subscription.get(
+                    timeout=min(settings.NOTIFICATIONS_STREAM_KEEPALIVE_SECONDS, remaining)
+                )
+                if event is None:
+                    # Comentario SSE para mantener viva la conexión en proxies
+                    yield ': keepalive\n\n'
+                else:
+                    yield _sse_event(event)
+        finally:
+            subscription.close()
+            _stream_slots.release()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+async def notification_stream_async(request):
+    """
+    Versión async del stream SSE para el modo ASGI: la espera de eventos
+    ocurre en el event loop, así que una conexión abierta no ocupa un hilo.
+    """
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+
+    # Suscribirse antes de leer el contador para no perder eventos intermedios
+    subscription = get_pubsub().subscribe(user.pk)
+    unread_count = await Notification.objects.filter(usuario_id=user.pk, leida=False).acount()
+
+    async def events():
+        try:
+            yield f"retry: {settings.NOTIFICATIONS_STREAM_RETRY_MS}\n\n"
+            yield _sse_event({'type': 'unread_count', 'unread_count': unread_count})
+
+            deadline = time.monotonic() + settings.NOTIFICATIONS_STREAM_MAX_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = await subscription.aget(
+                    timeout=min(settings.NOTIFICATIONS_STREAM_KEEPALIVE_SECONDS, remaining)
+                )
+                if event is None:
+                    # Comentario SSE para mantener viva la conexión en proxies
+                    yield ': keepalive\n\n'
+                else:
+                    yield _sse_event(event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
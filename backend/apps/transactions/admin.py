@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Income, Expense
+from .models import Income, Expense, MonthlyRollup, UserBalance, DailyBalance
 
 @admin.register(Income)
 class IncomeAdmin(admin.ModelAdmin):
@@ -13,4 +13,21 @@ class ExpenseAdmin(admin.ModelAdmin):
     list_display = ['descripcion', 'monto', 'fecha', 'categoria', 'usuario', 'es_recurrente']
     list_filter = ['categoria', 'es_recurrente', 'fecha', 'created_at']
     search_fields = ['descripcion', 'usuario__username']
-    date_hierarchy = 'fecha'
\ No newline at end of file
+    date_hierarchy = 'fecha'
+
+@admin.register(MonthlyRollup)
+class MonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'año', 'mes', 'categoria', 'total_ingresos', 'total_gastos', 'updated_at']
+    list_filter = ['año', 'mes']
+    search_fields = ['usuario__username']
+
+@admin.register(UserBalance)
+class UserBalanceAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'total_ingresos', 'total_gastos', 'saldo', 'updated_at']
+    search_fields = ['usuario__username']
+
+@admin.register(DailyBalance)
+class DailyBalanceAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'fecha', 'ingresos', 'gastos', 'saldo']
+    search_fields = ['usuario__username']
+    date_hierarchy = 'fecha'
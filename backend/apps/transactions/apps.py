@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class TransactionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.transactions'
\ No newline at end of file
+    name = 'apps.transactions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Lectores en streaming de archivos de transacciones (CSV y OFX).
+
+Cada lector recorre el archivo sin cargarlo completo en memoria y produce
+tuplas ``(línea, tipo, datos)`` donde ``tipo`` es 'ingreso' o 'gasto' y
+``datos`` es un dict con los campos de IncomeSerializer/ExpenseSerializer.
+"""
+import csv
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+TIPOS = ('ingreso', 'gasto')
+
+
+class ImportFormatError(ValueError):
+    """El archivo no tiene un formato que se pueda importar"""
+
+
+def _split_signed_amount(monto, tipo):
+    """Deducir el tipo por el signo del monto cuando no viene indicado"""
+    try:
+        value = Decimal(str(monto).strip().replace(',', '.'))
+    except (InvalidOperation, ValueError):
+        return tipo or 'gasto', monto
+    if tipo is None:
+        tipo = 'gasto' if value < 0 else 'ingreso'
+    return tipo, str(abs(value))
+
+
+def iter_csv_rows(uploaded_file, tipo=None, categorias=None):
+    """
+    Leer un CSV con encabezados ``fecha``, ``monto`` y opcionalmente
+    ``descripcion``, ``categoria`` (id o nombre) y ``tipo`` (ingreso/gasto).
+
+    Sin columna ni parámetro ``tipo``, los montos negativos son gastos y los
+    positivos ingresos.
+
+    Args:
+        uploaded_file: Archivo subido (se lee por líneas)
+        tipo (str): Tipo para todas las filas si el CSV no lo indica
+        categorias (dict): Nombre de categoría en minúsculas -> id
+    """
+    categorias = categorias or {}
+    reader = csv.DictReader(io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline=''))
+    if not reader.fieldnames or not {'fecha', 'monto'} <= {name.strip().lower() for name in reader.fieldnames}:
+        raise ImportFormatError('El CSV debe tener las columnas fecha y monto')
+
+    for row in reader:
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+        row_tipo = row.get('tipo', '').lower() or tipo
+        row_tipo, monto = _split_signed_amount(row.get('monto', ''), row_tipo)
+
+        data = {
+            'fecha': row.get('fecha', ''),
+            'monto': monto,
+            'descripcion': row.get('descripcion', ''),
+        }
+        categoria = row.get('categoria', '')
+        if row_tipo == 'gasto' and categoria:
+            data['categoria'] = categoria if categoria.isdigit() else categorias.get(categoria.lower(), categoria)
+
+        # La línea 1 es el encabezado
+        yield reader.line_num, row_tipo, data
+
+
+OFX_TOKEN = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def _iter_ofx_tokens(uploaded_file, chunk_size=64 * 1024):
+    """Producir (cierre, etiqueta, valor) leyendo el archivo por bloques"""
+    buffer = ''
+    while True:
+        chunk = uploaded_file.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk.decode('latin-1') if isinstance(chunk, bytes) else chunk
+        # Conservar el último token, puede estar incompleto
+        cut = buffer.rfind('<')
+        if cut <= 0:
+            continue
+        for match in OFX_TOKEN.finditer(buffer, 0, cut):
+            yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+        buffer = buffer[cut:]
+    for match in OFX_TOKEN.finditer(buffer):
+        yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+
+
+def _parse_ofx_date(value):
+    # Formato OFX: AAAAMMDD[HHMMSS[.XXX]][zona]
+    try:
+        return datetime.strptime(value[:8], '%Y%m%d').date().isoformat()
+    except ValueError:
+        return value
+
+
+def iter_ofx_rows(uploaded_file):
+    """
+    Leer las transacciones (bloques STMTTRN) de un OFX en formato SGML o XML.
+    TRNAMT negativo es gasto y positivo ingreso; la descripción es NAME o MEMO.
+    """
+    numero = 0
+    current = None
+    found_header = False
+
+    for closing, tag, value in _iter_ofx_tokens(uploaded_file):
+        found_header = found_header or tag == 'OFX'
+        if tag == 'STMTTRN':
+            if closing and current is not None:
+                numero += 1
+                yield _ofx_row(numero, current)
+                current = None
+            elif not closing:
+                if current is not None:
+                    # SGML sin etiqueta de cierre
+                    numero += 1
+                    yield _ofx_row(numero, current)
+                current = {}
+        elif current is not None and not closing and value:
+            current[tag] = value
+        elif current is not None and closing and tag == 'BANKTRANLIST':
+            numero += 1
+            yield _ofx_row(numero, current)
+            current = None
+
+    if not found_header:
+        raise ImportFormatError('El archivo no es un OFX válido')
+    if current is not None:
+        numero += 1
+        yield _ofx_row(numero, current)
+
+
+def _ofx_row(numero, fields):
+    tipo, monto = _split_signed_amount(fields.get('TRNAMT', ''), None)
+    descripcion = fields.get('NAME') or fields.get('MEMO') or ''
+    return numero, tipo, {
+        'fecha': _parse_ofx_date(fields.get('DTPOSTED', '')),
+        'monto': monto,
+        'descripcion': descripcion[:255],
+    }
+
+
+def iter_rows(uploaded_file, formato=None, tipo=None, categorias=None):
+    """Elegir el lector según ``formato`` o la extensión del archivo"""
+    formato = (formato or uploaded_file.name.rsplit('.', 1)[-1]).lower()
+    if formato == 'csv':
+        return iter_csv_rows(uploaded_file, tipo=tipo, categorias=categorias)
+    if formato in ('ofx', 'qfx'):
+        return iter_ofx_rows(uploaded_file)
+    raise ImportFormatError(f'Formato no soportado: {formato}. Use CSV u OFX')
@@ -0,0 +1,262 @@
+"""
+Maintenance of the per-user balance ledger.
+
+``UserBalance`` holds the running total of every user and ``DailyBalance``
+one closing snapshot per day with transactions. Writes to Income/Expense
+apply signed deltas (see ``signals.py``), so the current balance is a
+primary-key lookup and the balance at any date is a single index seek on
+``(usuario, fecha)``, no matter how long the history is.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from .models import Income, Expense, UserBalance, DailyBalance
+
+ZERO = Decimal('0')
+
+
+def _lock_balance(usuario_id):
+    """Lock (creating it if needed) the balance row that serializes a user's ledger writes."""
+    balance = UserBalance.objects.select_for_update().filter(usuario_id=usuario_id).first()
+    if balance is not None:
+        return balance
+    try:
+        with transaction.atomic():
+            UserBalance.objects.create(usuario_id=usuario_id)
+    except IntegrityError:
+        # Otra petición creó la fila al mismo tiempo
+        pass
+    return UserBalance.objects.select_for_update().get(usuario_id=usuario_id)
+
+
+def lock_balances(usuario_ids):
+    """
+    Lock (creating them if needed) the balance rows of several users, in id
+    order so that concurrent callers cannot deadlock. Must run inside a
+    transaction.
+
+    Returns:
+        dict: {usuario_id: UserBalance}
+    """
+    usuario_ids = sorted(set(usuario_ids))
+    locked = {
+        balance.usuario_id: balance
+        for balance in UserBalance.objects.select_for_update().filter(
+            usuario_id__in=usuario_ids
+        ).order_by('usuario_id')
+    }
+    missing = [usuario_id for usuario_id in usuario_ids if usuario_id not in locked]
+    if missing:
+        UserBalance.objects.bulk_create(
+            [UserBalance(usuario_id=usuario_id) for usuario_id in missing], ignore_conflicts=True
+        )
+        locked.update(
+            (balance.usuario_id, balance)
+            for balance in UserBalance.objects.select_for_update().filter(
+                usuario_id__in=missing
+            ).order_by('usuario_id')
+        )
+    return locked
+
+
+def apply_balance_delta(usuario_id, fecha, ingresos=0, gastos=0):
+    """
+    Add signed amounts to a user's balance and to the snapshots from ``fecha`` on.
+
+    Args:
+        usuario_id (int): User id
+        fecha (date): Date of the transaction
+        ingresos (Decimal): Amount to add to incomes (may be negative)
+        gastos (Decimal): Amount to add to expenses (may be negative)
+    """
+    if not ingresos and not gastos:
+        return
+    neto = ingresos - gastos
+
+    with transaction.atomic():
+        _lock_balance(usuario_id)
+
+        day = DailyBalance.objects.filter(usuario_id=usuario_id, fecha=fecha)
+        if not day.update(
+            ingresos=F('ingresos') + ingresos,
+            gastos=F('gastos') + gastos,
+            total_ingresos=F('total_ingresos') + ingresos,
+            total_gastos=F('total_gastos') + gastos,
+            saldo=F('saldo') + neto,
+        ):
+            previous = DailyBalance.objects.filter(
+                usuario_id=usuario_id, fecha__lt=fecha
+            ).order_by('-fecha').values('total_ingresos', 'total_gastos').first() or {
+                'total_ingresos': ZERO, 'total_gastos': ZERO
+            }
+            DailyBalance.objects.create(
+                usuario_id=usuario_id,
+                fecha=fecha,
+                ingresos=ingresos,
+                gastos=gastos,
+                total_ingresos=previous['total_ingresos'] + ingresos,
+                total_gastos=previous['total_gastos'] + gastos,
+                saldo=previous['total_ingresos'] + ingresos - previous['total_gastos'] - gastos,
+            )
+        elif ingresos < 0 or gastos < 0:
+            # El día se quedó sin transacciones
+            day.filter(ingresos=0, gastos=0).delete()
+
+        DailyBalance.objects.filter(usuario_id=usuario_id, fecha__gt=fecha).update(
+            total_ingresos=F('total_ingresos') + ingresos,
+            total_gastos=F('total_gastos') + gastos,
+            saldo=F('saldo') + neto,
+        )
+        UserBalance.objects.filter(usuario_id=usuario_id).update(
+            total_ingresos=F('total_ingresos') + ingresos,
+            total_gastos=F('total_gastos') + gastos,
+            saldo=F('saldo') + neto,
+        )
+
+
+def get_balance(usuario_id, fecha=None):
+    """
+    Balance of a user, either current or at the close of ``fecha``.
+
+    Returns:
+        dict: total_ingresos, total_gastos and saldo
+    """
+    if fecha is None:
+        row = UserBalance.objects.filter(usuario_id=usuario_id).values(
+            'total_ingresos', 'total_gastos', 'saldo'
+        ).first()
+    else:
+        row = DailyBalance.objects.filter(usuario_id=usuario_id, fecha__lte=fecha).order_by('-fecha').values(
+            'total_ingresos', 'total_gastos', 'saldo'
+        ).first()
+    return row or {'total_ingresos': ZERO, 'total_gastos': ZERO, 'saldo': ZERO}
+
+
+def compute_ledger(usuario_ids, desde=None):
+    """
+    Compute the expected ledger of some users from the raw transactions.
+
+    Args:
+        usuario_ids (list): User ids
+        desde (date): Only compute snapshots from this date on
+
+    Returns:
+        tuple: ({usuario_id: (total_ingresos, total_gastos)},
+                {(usuario_id, fecha): (ingresos, gastos, total_ingresos, total_gastos)})
+    """
+    totals = defaultdict(lambda: [ZERO, ZERO])
+    if desde is not None:
+        # Acumulado anterior al rango que se recalcula
+        for index, model in enumerate((Income, Expense)):
+            for row in model.objects.filter(usuario_id__in=usuario_ids, fecha__lt=desde).values(
+                'usuario_id'
+            ).annotate(total=Sum('monto')).order_by():
+                totals[row['usuario_id']][index] += row['total']
+
+    days = defaultdict(lambda: [ZERO, ZERO])
+    for index, model in enumerate((Income, Expense)):
+        queryset = model.objects.filter(usuario_id__in=usuario_ids)
+        if desde is not None:
+            queryset = queryset.filter(fecha__gte=desde)
+        for row in queryset.values('usuario_id', 'fecha').annotate(total=Sum('monto')).order_by():
+            days[(row['usuario_id'], row['fecha'])][index] += row['total']
+
+    snapshots = {}
+    for (usuario_id, fecha), (ingresos, gastos) in sorted(days.items()):
+        total = totals[usuario_id]
+        total[0] += ingresos
+        total[1] += gastos
+        snapshots[(usuario_id, fecha)] = (ingresos, gastos, total[0], total[1])
+
+    return {usuario_id: tuple(total) for usuario_id, total in totals.items()}, snapshots
+
+
+def _iter_user_chunks(usuario_ids, batch_size):
+    if usuario_ids is None:
+        usuario_ids = User.objects.order_by('id').values_list('id', flat=True)
+    usuario_ids = list(usuario_ids)
+    for start in range(0, len(usuario_ids), batch_size):
+        yield usuario_ids[start:start + batch_size]
+
+
+def rebuild_ledger(usuario_ids=None, desde=None, batch_size=500):
+    """
+    Rebuild balances and snapshots from scratch for the given scope.
+
+    Args:
+        usuario_ids (list): Optional user ids, all users when None
+        desde (date): Keep the snapshots before this date and rebuild the rest
+        batch_size (int): Users rebuilt per transaction
+
+    Returns:
+        int: Number of snapshot rows written
+    """
+    written = 0
+    for chunk in _iter_user_chunks(usuario_ids, batch_size):
+        with transaction.atomic():
+            # Same lock as apply_balance_delta: a write that commits while the
+            # chunk is rebuilt would otherwise update rows about to be replaced
+            # and be missing from the totals read before it
+            locked = lock_balances(chunk)
+            balances, snapshots = compute_ledger(chunk, desde)
+            existing = DailyBalance.objects.filter(usuario_id__in=chunk)
+            if desde is not None:
+                existing = existing.filter(fecha__gte=desde)
+            existing.delete()
+            DailyBalance.objects.bulk_create([
+                DailyBalance(
+                    usuario_id=usuario_id,
+                    fecha=fecha,
+                    ingresos=ingresos,
+                    gastos=gastos,
+                    total_ingresos=total_ingresos,
+                    total_gastos=total_gastos,
+                    saldo=total_ingresos - total_gastos,
+                )
+                for (usuario_id, fecha), (ingresos, gastos, total_ingresos, total_gastos) in snapshots.items()
+            ], batch_size=1000)
+
+            for usuario_id, balance in locked.items():
+                balance.total_ingresos, balance.total_gastos = balances.get(usuario_id, (ZERO, ZERO))
+                balance.saldo = balance.total_ingresos - balance.total_gastos
+            UserBalance.objects.bulk_update(
+                list(locked.values()), ['total_ingresos', 'total_gastos', 'saldo'], batch_size=1000
+            )
+        written += len(snapshots)
+    return written
+
+
+def find_ledger_drift(usuario_ids=None, batch_size=500):
+    """
+    Compare stored balances and snapshots against the raw transactions.
+
+    Returns:
+        list: Dicts describing every balance or snapshot that differs
+    """
+    drift = []
+    for chunk in _iter_user_chunks(usuario_ids, batch_size):
+        balances, snapshots = compute_ledger(chunk)
+
+        stored = {
+            row.usuario_id: (row.total_ingresos, row.total_gastos)
+            for row in UserBalance.objects.filter(usuario_id__in=chunk)
+        }
+        for usuario_id in set(balances) | set(stored):
+            esperado = balances.get(usuario_id, (ZERO, ZERO))
+            almacenado = stored.get(usuario_id, (ZERO, ZERO))
+            if esperado != almacenado:
+                drift.append({'usuario_id': usuario_id, 'fecha': None, 'esperado': esperado, 'almacenado': almacenado})
+
+        stored = {
+            (row.usuario_id, row.fecha): (row.ingresos, row.gastos, row.total_ingresos, row.total_gastos)
+            for row in DailyBalance.objects.filter(usuario_id__in=chunk)
+        }
+        for key in set(snapshots) | set(stored):
+            esperado = snapshots.get(key)
+            almacenado = stored.get(key)
+            if esperado != almacenado:
+                usuario_id, fecha = key
+                drift.append({'usuario_id': usuario_id, 'fecha': fecha, 'esperado': esperado, 'almacenado': almacenado})
+    return drift
@@ -0,0 +1,42 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from apps.common.metrics import track_job
+from apps.transactions.services import TransactionService
+
+
+class Command(BaseCommand):
+    help = 'Generar las ocurrencias vencidas de los ingresos y gastos recurrentes de todos los usuarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Plantillas por lote (por defecto 1000)')
+        parser.add_argument(
+            '--date',
+            help='Materializar hasta esta fecha (AAAA-MM-DD) en lugar de hoy'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError('La fecha debe tener el formato AAAA-MM-DD')
+
+        self.stdout.write('Generando transacciones recurrentes...')
+
+        def report(stats):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {stats['plantillas']} plantillas procesadas")
+
+        with track_job('recurring_transactions') as job:
+            stats = TransactionService.materialize_recurring(
+                today=today,
+                batch_size=max(options['batch_size'], 1),
+                on_batch=report
+            )
+            for kind in ('plantillas', 'ingresos', 'gastos'):
+                job.add_rows(kind, stats[kind])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {stats['ingresos']} ingresos y {stats['gastos']} gastos generados "
+                f"a partir de {stats['plantillas']} plantillas"
+            )
+        )
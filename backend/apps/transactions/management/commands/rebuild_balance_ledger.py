@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from apps.transactions.ledger import rebuild_ledger, find_ledger_drift
+
+
+class Command(BaseCommand):
+    help = 'Reconstruir el saldo acumulado y los saldos diarios o verificar diferencias con las transacciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo verificar diferencias, sin modificar datos'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='usuario_ids',
+            help='Limitar a un usuario (id). Se puede repetir'
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Usuarios por lote (por defecto 500)')
+
+    def handle(self, *args, **options):
+        usuario_ids = options['usuario_ids']
+        batch_size = max(options['batch_size'], 1)
+
+        if options['check']:
+            self.stdout.write('Verificando saldos...')
+            drift = find_ledger_drift(usuario_ids, batch_size=batch_size)
+            if not drift:
+                self.stdout.write(self.style.SUCCESS('✅ Los saldos están al día'))
+                return
+
+            for item in drift:
+                self.stdout.write(
+                    f"usuario={item['usuario_id']} fecha={item['fecha'] or 'actual'} "
+                    f"esperado={item['esperado']} almacenado={item['almacenado']}"
+                )
+            self.stdout.write(
+                self.style.WARNING(f'⚠️ {len(drift)} saldos con diferencias. Ejecuta el comando sin --check para corregirlos')
+            )
+            return
+
+        self.stdout.write('Reconstruyendo saldos...')
+        rows = rebuild_ledger(usuario_ids, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'✅ Saldos reconstruidos ({rows} saldos diarios)'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from apps.transactions.rollups import rebuild_rollups, find_rollup_drift
+
+
+class Command(BaseCommand):
+    help = 'Reconstruir el resumen mensual del dashboard o verificar diferencias con las transacciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo verificar diferencias, sin modificar datos'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='usuario_ids',
+            help='Limitar a un usuario (id). Se puede repetir'
+        )
+
+    def handle(self, *args, **options):
+        usuario_ids = options['usuario_ids']
+
+        if options['check']:
+            self.stdout.write('Verificando resumen mensual...')
+            drift = find_rollup_drift(usuario_ids)
+            if not drift:
+                self.stdout.write(self.style.SUCCESS('✅ El resumen mensual está al día'))
+                return
+
+            for item in drift:
+                self.stdout.write(
+                    f"usuario={item['usuario_id']} {item['mes']}/{item['año']} "
+                    f"categoria={item['categoria_id']} esperado={item['esperado']} "
+                    f"almacenado={item['almacenado']}"
+                )
+            self.stdout.write(
+                self.style.WARNING(f'⚠️ {len(drift)} filas con diferencias. Ejecuta el comando sin --check para corregirlas')
+            )
+            return
+
+        self.stdout.write('Reconstruyendo resumen mensual...')
+        rows = rebuild_rollups(usuario_ids)
+        self.stdout.write(self.style.SUCCESS(f'✅ Resumen mensual reconstruido ({rows} filas)'))
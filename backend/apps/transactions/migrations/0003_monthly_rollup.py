@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    """Calcular el resumen mensual a partir de las transacciones existentes"""
+    Income = apps.get_model('transactions', 'Income')
+    Expense = apps.get_model('transactions', 'Expense')
+    MonthlyRollup = apps.get_model('transactions', 'MonthlyRollup')
+
+    totals = {}
+    for row in Income.objects.values('usuario_id', 'fecha__year', 'fecha__month').annotate(
+        total=models.Sum('monto')
+    ).order_by():
+        key = (row['usuario_id'], row['fecha__year'], row['fecha__month'], None)
+        totals.setdefault(key, [0, 0])[0] += row['total']
+
+    for row in Expense.objects.values('usuario_id', 'fecha__year', 'fecha__month', 'categoria_id').annotate(
+        total=models.Sum('monto')
+    ).order_by():
+        key = (row['usuario_id'], row['fecha__year'], row['fecha__month'], row['categoria_id'])
+        totals.setdefault(key, [0, 0])[1] += row['total']
+
+    MonthlyRollup.objects.bulk_create([
+        MonthlyRollup(
+            usuario_id=usuario_id, año=año, mes=mes, categoria_id=categoria_id,
+            total_ingresos=ingresos, total_gastos=gastos
+        )
+        for (usuario_id, año, mes, categoria_id), (ingresos, gastos) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0002_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('año', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('total_ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_gastos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='categories.category')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups_mensuales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual',
+                'verbose_name_plural': 'Resúmenes Mensuales',
+                'ordering': ['-año', '-mes'],
+                'indexes': [models.Index(fields=['usuario', 'año', 'mes'], name='transaction_usuario_e9864e_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('categoria__isnull', False)), fields=('usuario', 'año', 'mes', 'categoria'), name='unique_rollup_usuario_mes_categoria'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('categoria__isnull', True)), fields=('usuario', 'año', 'mes'), name='unique_rollup_usuario_mes_sin_categoria'),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
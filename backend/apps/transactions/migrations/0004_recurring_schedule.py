@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:01
+
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def schedule_existing_templates(apps, schema_editor):
+    """
+    Programar la próxima ocurrencia de las plantillas recurrentes existentes.
+    Hasta ahora nunca se generaron ocurrencias y los usuarios las registraban
+    a mano, así que se programa la primera posterior a hoy en lugar de
+    rellenar el pasado.
+    """
+    today = timezone.localdate()
+    for model_name in ('Income', 'Expense'):
+        model = apps.get_model('transactions', model_name)
+        pending = []
+        templates = model.objects.filter(es_recurrente=True, frecuencia_dias__gt=0).only('id', 'fecha', 'frecuencia_dias')
+        for template in templates.iterator(chunk_size=2000):
+            periodos = max((today - template.fecha).days // template.frecuencia_dias + 1, 1)
+            template.next_due = template.fecha + timedelta(days=periodos * template.frecuencia_dias)
+            pending.append(template)
+            if len(pending) >= 2000:
+                model.objects.bulk_update(pending, ['next_due'])
+                pending = []
+        model.objects.bulk_update(pending, ['next_due'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_monthly_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='next_due',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='plantilla',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ocurrencias', to='transactions.expense'),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='next_due',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='plantilla',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ocurrencias', to='transactions.income'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['es_recurrente', 'next_due'], name='transaction_es_recu_ccad8e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['es_recurrente', 'next_due'], name='transaction_es_recu_c76bd2_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='expense',
+            constraint=models.UniqueConstraint(fields=('plantilla', 'fecha'), name='unique_expense_ocurrencia'),
+        ),
+        migrations.AddConstraint(
+            model_name='income',
+            constraint=models.UniqueConstraint(fields=('plantilla', 'fecha'), name='unique_income_ocurrencia'),
+        ),
+        migrations.RunPython(schedule_existing_templates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_ledger(apps, schema_editor):
+    """Calcular saldos acumulados y diarios a partir de las transacciones existentes"""
+    Income = apps.get_model('transactions', 'Income')
+    Expense = apps.get_model('transactions', 'Expense')
+    UserBalance = apps.get_model('transactions', 'UserBalance')
+    DailyBalance = apps.get_model('transactions', 'DailyBalance')
+
+    days = {}
+    for index, model in enumerate((Income, Expense)):
+        for row in model.objects.values('usuario_id', 'fecha').annotate(total=models.Sum('monto')).order_by():
+            days.setdefault((row['usuario_id'], row['fecha']), [0, 0])[index] += row['total']
+
+    totals = {}
+    snapshots = []
+    for (usuario_id, fecha), (ingresos, gastos) in sorted(days.items()):
+        total = totals.setdefault(usuario_id, [0, 0])
+        total[0] += ingresos
+        total[1] += gastos
+        snapshots.append(DailyBalance(
+            usuario_id=usuario_id, fecha=fecha, ingresos=ingresos, gastos=gastos,
+            total_ingresos=total[0], total_gastos=total[1], saldo=total[0] - total[1]
+        ))
+
+    DailyBalance.objects.bulk_create(snapshots, batch_size=1000)
+    UserBalance.objects.bulk_create([
+        UserBalance(usuario_id=usuario_id, total_ingresos=ingresos, total_gastos=gastos, saldo=ingresos - gastos)
+        for usuario_id, (ingresos, gastos) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0004_recurring_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_gastos', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='saldo_acumulado', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Saldo Acumulado',
+                'verbose_name_plural': 'Saldos Acumulados',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('gastos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_gastos', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_diarios', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Saldo Diario',
+                'verbose_name_plural': 'Saldos Diarios',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailybalance',
+            constraint=models.UniqueConstraint(fields=('usuario', 'fecha'), name='unique_saldo_usuario_fecha'),
+        ),
+        migrations.RunPython(populate_ledger, migrations.RunPython.noop),
+    ]
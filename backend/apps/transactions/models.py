@@ -1,14 +1,40 @@
+from datetime import timedelta
 from django.db import models
 from django.contrib.auth.models import User
 from apps.categories.models import Category
 
-class Income(models.Model):
+class RecurrenceMixin:
+    """Programación de las ocurrencias de una transacción recurrente"""
+
+    def schedule_next_due(self):
+        """
+        Mantener ``next_due`` coherente con la recurrencia: ``None`` si no es
+        recurrente y la primera ocurrencia (fecha + frecuencia) si aún no
+        tiene una programada. Debe llamarse también antes de bulk_create.
+        """
+        if not self.es_recurrente or not self.frecuencia_dias or self.frecuencia_dias <= 0:
+            self.next_due = None
+        elif self.next_due is None:
+            self.next_due = self.fecha + timedelta(days=self.frecuencia_dias)
+
+    def save(self, *args, **kwargs):
+        self.schedule_next_due()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'next_due' not in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'next_due'}
+        super().save(*args, **kwargs)
+
+class Income(RecurrenceMixin, models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ingresos')
     monto = models.DecimalField(max_digits=12, decimal_places=2)
     descripcion = models.CharField(max_length=255, blank=True)
     fecha = models.DateField()
     es_recurrente = models.BooleanField(default=False)
     frecuencia_dias = models.IntegerField(null=True, blank=True)
+    # Próxima ocurrencia pendiente de materializar (solo plantillas recurrentes)
+    next_due = models.DateField(null=True, blank=True)
+    # Plantilla recurrente que generó esta transacción
+    plantilla = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='ocurrencias')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -20,12 +46,16 @@ class Income(models.Model):
             models.Index(fields=['usuario', '-fecha']),
             models.Index(fields=['usuario', 'fecha']),
             models.Index(fields=['fecha']),
+            models.Index(fields=['es_recurrente', 'next_due']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['plantilla', 'fecha'], name='unique_income_ocurrencia'),
         ]
 
     def __str__(self):
         return f"{self.descripcion} - ${self.monto}"
 
-class Expense(models.Model):
+class Expense(RecurrenceMixin, models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gastos')
     categoria = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     monto = models.DecimalField(max_digits=12, decimal_places=2)
@@ -33,6 +63,10 @@ class Expense(models.Model):
     fecha = models.DateField()
     es_recurrente = models.BooleanField(default=False)
     frecuencia_dias = models.IntegerField(null=True, blank=True)
+    # Próxima ocurrencia pendiente de materializar (solo plantillas recurrentes)
+    next_due = models.DateField(null=True, blank=True)
+    # Plantilla recurrente que generó esta transacción
+    plantilla = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='ocurrencias')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -45,7 +79,82 @@ class Expense(models.Model):
             models.Index(fields=['usuario', 'fecha']),
             models.Index(fields=['usuario', 'categoria', 'fecha']),
             models.Index(fields=['fecha']),
+            models.Index(fields=['es_recurrente', 'next_due']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['plantilla', 'fecha'], name='unique_expense_ocurrencia'),
+        ]
+
+    def __str__(self):
+        return f"{self.descripcion} - ${self.monto}"
+
+class MonthlyRollup(models.Model):
+    """Totales mensuales precalculados por usuario y categoría para el dashboard"""
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rollups_mensuales')
+    año = models.IntegerField()
+    mes = models.IntegerField()  # 1-12
+    # Los ingresos no tienen categoría, por lo que se acumulan en la fila sin categoría
+    categoria = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    total_ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_gastos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Resumen Mensual'
+        verbose_name_plural = 'Resúmenes Mensuales'
+        ordering = ['-año', '-mes']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'año', 'mes', 'categoria'],
+                condition=models.Q(categoria__isnull=False),
+                name='unique_rollup_usuario_mes_categoria',
+            ),
+            models.UniqueConstraint(
+                fields=['usuario', 'año', 'mes'],
+                condition=models.Q(categoria__isnull=True),
+                name='unique_rollup_usuario_mes_sin_categoria',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['usuario', 'año', 'mes']),
+        ]
+
+    def __str__(self):
+        return f"Resumen {self.mes}/{self.año} - {self.usuario.username}"
+
+class UserBalance(models.Model):
+    """Saldo acumulado de cada usuario (todos sus ingresos menos todos sus gastos)"""
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='saldo_acumulado')
+    total_ingresos = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_gastos = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    saldo = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Saldo Acumulado'
+        verbose_name_plural = 'Saldos Acumulados'
+
+    def __str__(self):
+        return f"Saldo {self.usuario.username}: ${self.saldo}"
+
+class DailyBalance(models.Model):
+    """Movimientos de un día y saldo de cierre acumulado hasta ese día (solo días con transacciones)"""
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saldos_diarios')
+    fecha = models.DateField()
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    gastos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Acumulados al cierre del día
+    total_ingresos = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_gastos = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    saldo = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Saldo Diario'
+        verbose_name_plural = 'Saldos Diarios'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'fecha'], name='unique_saldo_usuario_fecha'),
         ]
 
     def __str__(self):
-        return f"{self.descripcion} - ${self.monto}"
\ No newline at end of file
+        return f"Saldo {self.fecha} - {self.usuario.username}: ${self.saldo}"
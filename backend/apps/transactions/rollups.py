@@ -0,0 +1,219 @@
+"""
+Maintenance of the per-user monthly rollup used by the dashboard.
+
+Writes to Income/Expense apply signed deltas to ``MonthlyRollup`` rows, so
+reading a month never has to aggregate the raw transaction tables.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from apps.common.cache_utils import bump_user_cache_version
+from apps.common.date_utils import get_month_date_range
+from .ledger import lock_balances
+from .models import Income, Expense, MonthlyRollup
+
+
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_rollups():
+    """
+    Skip the per-row rollup deltas applied by the Income/Expense signals.
+
+    For bulk writes whose caller rebuilds the affected months once at the
+    end (see ``TransactionService.refresh_periods``).
+    """
+    previous = rollups_deferred()
+    _deferred.active = True
+    try:
+        yield
+    finally:
+        _deferred.active = previous
+
+
+def rollups_deferred():
+    return getattr(_deferred, 'active', False)
+
+
+def apply_rollup_delta(usuario_id, fecha, categoria_id=None, ingresos=0, gastos=0):
+    """
+    Add signed amounts to the rollup row of a user, month and category.
+
+    Args:
+        usuario_id (int): User id
+        fecha (date): Any date inside the month to update
+        categoria_id (int): Category id, None for incomes and uncategorized expenses
+        ingresos (Decimal): Amount to add to total_ingresos (may be negative)
+        gastos (Decimal): Amount to add to total_gastos (may be negative)
+    """
+    if not ingresos and not gastos:
+        return
+
+    lookup = {
+        'usuario_id': usuario_id,
+        'año': fecha.year,
+        'mes': fecha.month,
+        'categoria_id': categoria_id,
+    }
+    updates = {
+        'total_ingresos': F('total_ingresos') + ingresos,
+        'total_gastos': F('total_gastos') + gastos,
+    }
+
+    if MonthlyRollup.objects.filter(**lookup).update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            MonthlyRollup.objects.create(total_ingresos=ingresos, total_gastos=gastos, **lookup)
+    except IntegrityError:
+        # Otra petición creó la fila al mismo tiempo
+        MonthlyRollup.objects.filter(**lookup).update(**updates)
+
+
+def _period_filter(periodos):
+    """Build a Q over ``fecha`` that matches any of the (year, month) pairs."""
+    filtro = Q()
+    for año, mes in periodos:
+        filtro |= Q(fecha__range=get_month_date_range(año, mes))
+    return filtro
+
+
+def compute_rollups(usuario_ids=None, periodos=None):
+    """
+    Aggregate Income/Expense into the rollup shape.
+
+    Args:
+        usuario_ids (list): Optional user ids to restrict the computation to
+        periodos (set): Optional (year, month) pairs to restrict the computation to
+
+    Returns:
+        dict: {(usuario_id, año, mes, categoria_id): (total_ingresos, total_gastos)}
+    """
+    incomes = Income.objects.all()
+    expenses = Expense.objects.all()
+    if usuario_ids is not None:
+        incomes = incomes.filter(usuario_id__in=usuario_ids)
+        expenses = expenses.filter(usuario_id__in=usuario_ids)
+    if periodos:
+        incomes = incomes.filter(_period_filter(periodos))
+        expenses = expenses.filter(_period_filter(periodos))
+
+    totals = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+
+    for row in incomes.values('usuario_id', 'fecha__year', 'fecha__month').annotate(
+        total=Sum('monto')
+    ).order_by():
+        key = (row['usuario_id'], row['fecha__year'], row['fecha__month'], None)
+        totals[key][0] += row['total']
+
+    for row in expenses.values('usuario_id', 'fecha__year', 'fecha__month', 'categoria_id').annotate(
+        total=Sum('monto')
+    ).order_by():
+        key = (row['usuario_id'], row['fecha__year'], row['fecha__month'], row['categoria_id'])
+        totals[key][1] += row['total']
+
+    return {key: tuple(values) for key, values in totals.items()}
+
+
+def _existing_rollups(usuario_ids=None, periodos=None):
+    queryset = MonthlyRollup.objects.all()
+    if usuario_ids is not None:
+        queryset = queryset.filter(usuario_id__in=usuario_ids)
+    if periodos:
+        filtro = Q()
+        for año, mes in periodos:
+            filtro |= Q(año=año, mes=mes)
+        queryset = queryset.filter(filtro)
+    return queryset
+
+
+def rebuild_rollups(usuario_ids=None, periodos=None):
+    """
+    Rebuild rollup rows from scratch for the given scope.
+
+    Args:
+        usuario_ids (list): Optional user ids, all users when None
+        periodos (set): Optional (year, month) pairs, all months when None
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    with transaction.atomic():
+        # The signals hold the user's UserBalance lock while applying rollup
+        # deltas; taking it before reading the totals keeps a concurrent write
+        # from landing between the read and the delete below
+        lock_balances(
+            usuario_ids if usuario_ids is not None
+            else User.objects.values_list('id', flat=True)
+        )
+        expected = compute_rollups(usuario_ids, periodos)
+        _existing_rollups(usuario_ids, periodos).delete()
+        MonthlyRollup.objects.bulk_create([
+            MonthlyRollup(
+                usuario_id=usuario_id,
+                año=año,
+                mes=mes,
+                categoria_id=categoria_id,
+                total_ingresos=ingresos,
+                total_gastos=gastos,
+            )
+            for (usuario_id, año, mes, categoria_id), (ingresos, gastos) in expected.items()
+        ], batch_size=1000)
+
+    for usuario_id in usuario_ids if usuario_ids is not None else {key[0] for key in expected}:
+        bump_user_cache_version(usuario_id)
+
+    return len(expected)
+
+
+def find_rollup_drift(usuario_ids=None, periodos=None):
+    """
+    Compare stored rollups against the raw transactions.
+
+    Returns:
+        list: Dicts describing every key whose stored totals differ
+    """
+    expected = compute_rollups(usuario_ids, periodos)
+    actual = {
+        (row.usuario_id, row.año, row.mes, row.categoria_id): (row.total_ingresos, row.total_gastos)
+        for row in _existing_rollups(usuario_ids, periodos)
+    }
+
+    zero = (Decimal('0'), Decimal('0'))
+    drift = []
+    for key in set(expected) | set(actual):
+        esperado = expected.get(key, zero)
+        almacenado = actual.get(key, zero)
+        if esperado != almacenado:
+            usuario_id, año, mes, categoria_id = key
+            drift.append({
+                'usuario_id': usuario_id,
+                'año': año,
+                'mes': mes,
+                'categoria_id': categoria_id,
+                'esperado': esperado,
+                'almacenado': almacenado,
+            })
+    return drift
+
+
+def fold_category_rollups(categoria):
+    """
+    Move the totals of a category that is about to be deleted to the
+    uncategorized row, mirroring ``Expense.categoria`` being SET_NULL.
+    """
+    for row in MonthlyRollup.objects.filter(categoria=categoria):
+        apply_rollup_delta(
+            row.usuario_id,
+            date(row.año, row.mes, 1),
+            None,
+            ingresos=row.total_ingresos,
+            gastos=row.total_gastos,
+        )
@@ -6,8 +6,8 @@ class IncomeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Income
         fields = ['id', 'monto', 'descripcion', 'fecha', 'es_recurrente', 
-                 'frecuencia_dias', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+                 'frecuencia_dias', 'next_due', 'plantilla', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'next_due', 'plantilla', 'created_at', 'updated_at']
 
     def validate(self, data):
         # Si no es recurrente, limpiar frecuencia_dias
@@ -25,8 +25,9 @@ class ExpenseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expense
         fields = ['id', 'categoria', 'categoria_info', 'monto', 'descripcion', 
-                 'fecha', 'es_recurrente', 'frecuencia_dias', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at', 'categoria_info']
+                 'fecha', 'es_recurrente', 'frecuencia_dias', 'next_due', 'plantilla',
+                 'created_at', 'updated_at']
+        read_only_fields = ['id', 'next_due', 'plantilla', 'created_at', 'updated_at', 'categoria_info']
 
     def validate(self, data):
         # Si no es recurrente, limpiar frecuencia_dias
@@ -0,0 +1,531 @@
+import calendar
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateField, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from rest_framework import serializers
+from apps.categories.models import Category
+from apps.common.cache_utils import bump_user_cache_version
+from apps.common.date_utils import iter_periods, shift_month
+from .importers import TIPOS, iter_rows
+from .ledger import rebuild_ledger
+from .models import Income, Expense, MonthlyRollup
+from .rollups import deferred_rollups, rebuild_rollups
+from .serializers import IncomeSerializer, ExpenseSerializer
+
+
+class PreloadedCategoryField(serializers.PrimaryKeyRelatedField):
+    """Categoría resuelta contra un dict precargado en lugar de una consulta por fila"""
+
+    def to_internal_value(self, data):
+        categorias = self.context['categorias']
+        try:
+            return categorias[int(data)]
+        except (KeyError, TypeError, ValueError):
+            self.fail('does_not_exist', pk_value=data)
+
+
+class ExpenseBulkSerializer(ExpenseSerializer):
+    categoria = PreloadedCategoryField(queryset=Category.objects.all(), required=False, allow_null=True)
+
+
+class TransactionService:
+    """Servicio para operaciones masivas sobre ingresos y gastos"""
+
+    # Errores detallados que se devuelven como máximo en una importación
+    MAX_REPORTED_ERRORS = 100
+
+    # Ocurrencias que se generan como máximo por plantilla en cada lote
+    MAX_OCCURRENCES_PER_TEMPLATE = 366
+
+    @staticmethod
+    def refresh_periods(usuario, periodos, include_budgets=True):
+        """
+        Recalcular una sola vez los efectos derivados de escrituras masivas
+        (bulk_create/update no disparan señales): resumen mensual, saldo
+        acumulado y gasto de los presupuestos de cada mes afectado.
+
+        Args:
+            usuario (User): Usuario dueño de las transacciones
+            periodos (set): Pares (año, mes) afectados
+            include_budgets (bool): False si solo cambiaron ingresos
+        """
+        TransactionService.refresh_user_periods({usuario.pk: periodos}, include_budgets)
+
+    @staticmethod
+    def refresh_user_periods(periodos_por_usuario, include_budgets=True):
+        """
+        Igual que refresh_periods para varios usuarios a la vez.
+
+        Args:
+            periodos_por_usuario (dict): id de usuario -> pares (año, mes) afectados
+            include_budgets (bool): False si solo cambiaron ingresos
+        """
+        from apps.budgets.models import MonthlyBudget
+        from apps.budgets.services import BudgetService
+
+        periodos_por_usuario = {
+            usuario_id: periodos for usuario_id, periodos in periodos_por_usuario.items() if periodos
+        }
+        if not periodos_por_usuario:
+            return
+        todos = set().union(*periodos_por_usuario.values())
+        rebuild_rollups(list(periodos_por_usuario), todos)
+        rebuild_ledger(list(periodos_por_usuario), desde=date(*min(todos), 1))
+        if not include_budgets:
+            return
+        budgets = MonthlyBudget.objects.filter(
+            usuario_id__in=list(periodos_por_usuario),
+            año__in={año for año, _ in todos},
+            mes__in={mes for _, mes in todos},
+            activo=True
+        )
+        for budget in budgets:
+            if (budget.año, budget.mes) in periodos_por_usuario[budget.usuario_id]:
+                BudgetService.refresh_budget_spending(budget)
+
+    @staticmethod
+    def import_file(usuario, uploaded_file, formato=None, tipo=None, batch_size=None):
+        """
+        Importar un archivo CSV u OFX leyéndolo en streaming.
+
+        Cada lote se valida con IncomeSerializer/ExpenseSerializer en modo
+        many=True y se inserta con bulk_create; las filas inválidas se omiten
+        y se informan. Resumen mensual y presupuestos se recalculan una vez
+        por mes afectado al final. Todo ocurre en una transacción.
+
+        Returns:
+            dict: Cantidades importadas y errores por línea
+        """
+        batch_size = batch_size or settings.TRANSACTION_IMPORT_BATCH_SIZE
+        categorias = {categoria.id: categoria for categoria in Category.objects.all()}
+        context = {'categorias': categorias}
+        rows = iter_rows(
+            uploaded_file,
+            formato=formato,
+            tipo=tipo,
+            categorias={categoria.nombre.lower(): categoria.id for categoria in categorias.values()}
+        )
+
+        result = {'ingresos': 0, 'gastos': 0, 'errores': [], 'total_errores': 0}
+        periodos = set()
+
+        def report(linea, errores):
+            result['total_errores'] += 1
+            if len(result['errores']) < TransactionService.MAX_REPORTED_ERRORS:
+                result['errores'].append({'linea': linea, 'errores': errores})
+
+        with transaction.atomic():
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+
+                por_tipo = {'ingreso': [], 'gasto': []}
+                for linea, row_tipo, data in batch:
+                    if row_tipo not in TIPOS:
+                        report(linea, {'tipo': ['Debe ser ingreso o gasto.']})
+                    else:
+                        por_tipo[row_tipo].append((linea, data))
+
+                for row_tipo, model, serializer_class, key in (
+                    ('ingreso', Income, IncomeSerializer, 'ingresos'),
+                    ('gasto', Expense, ExpenseBulkSerializer, 'gastos'),
+                ):
+                    valid = TransactionService._validate_batch(
+                        serializer_class, por_tipo[row_tipo], context, report
+                    )
+                    objs = [model(usuario=usuario, **data) for data in valid]
+                    for obj in objs:
+                        obj.schedule_next_due()
+                    model.objects.bulk_create(objs, batch_size=batch_size)
+                    result[key] += len(valid)
+                    periodos.update((data['fecha'].year, data['fecha'].month) for data in valid)
+
+            TransactionService.refresh_periods(usuario, periodos)
+
+        return result
+
+    @staticmethod
+    def apply_batch(usuario, model, serializer_class, operations):
+        """
+        Aplicar una lista de operaciones create/update/delete en una sola
+        transacción con bulk_create, bulk_update y un DELETE.
+
+        Cada operación es ``{'op': 'create', 'data': {...}}``,
+        ``{'op': 'update', 'id': 1, 'data': {...}}`` o
+        ``{'op': 'delete', 'id': 1}``. Si alguna es inválida no se aplica
+        ninguna. Resumen mensual y presupuestos se recalculan una vez por mes
+        afectado.
+
+        Returns:
+            tuple: (aplicado, resultados por operación)
+        """
+        categorias = {categoria.id: categoria for categoria in Category.objects.all()}
+        context = {'categorias': categorias}
+        ids = [op.get('id') for op in operations if isinstance(op, dict) and op.get('op') in ('update', 'delete')]
+        instances = model.objects.filter(usuario=usuario, id__in=[pk for pk in ids if isinstance(pk, int)]).in_bulk()
+        if model is Expense:
+            # Evita una consulta por gasto al serializar categoria_info
+            for instance in instances.values():
+                instance.categoria = categorias.get(instance.categoria_id)
+
+        results = []
+        creates, updates, deletes = [], [], []
+        seen_ids = set()
+        for index, op in enumerate(operations):
+            kind = op.get('op') if isinstance(op, dict) else None
+            result = {'index': index, 'op': kind}
+            results.append(result)
+
+            if kind not in ('create', 'update', 'delete'):
+                result.update(status=400, errores={'op': ['Debe ser create, update o delete.']})
+                continue
+            if kind == 'create':
+                creates.append((result, op.get('data') or {}))
+                continue
+
+            instance = instances.get(op.get('id'))
+            if instance is None:
+                result.update(id=op.get('id'), status=404, errores={'id': ['No encontrado.']})
+            elif instance.pk in seen_ids:
+                result.update(id=instance.pk, status=400, errores={'id': ['Operación repetida en el lote.']})
+            elif kind == 'delete':
+                result['id'] = instance.pk
+                deletes.append((result, instance))
+            else:
+                result['id'] = instance.pk
+                serializer = serializer_class(instance, data=op.get('data') or {}, partial=True, context=context)
+                if serializer.is_valid():
+                    updates.append((result, instance, serializer.validated_data))
+                else:
+                    result.update(status=400, errores=serializer.errors)
+            if instance is not None:
+                seen_ids.add(instance.pk)
+
+        create_serializer = serializer_class(data=[data for _, data in creates], many=True, context=context)
+        if creates:
+            if not create_serializer.is_valid():
+                for (result, _), errores in zip(creates, create_serializer.errors):
+                    if errores:
+                        result.update(status=400, errores=errores)
+
+        if any('errores' in result for result in results):
+            return False, results
+
+        periodos = set()
+        now = timezone.now()
+        with transaction.atomic(), deferred_rollups():
+            created = [
+                model(usuario=usuario, **data) for data in create_serializer.validated_data
+            ] if creates else []
+            for instance in created:
+                instance.schedule_next_due()
+            if created:
+                model.objects.bulk_create(created)
+
+            update_fields = {'updated_at', 'next_due'}
+            for _, instance, data in updates:
+                periodos.add((instance.fecha.year, instance.fecha.month))
+                for field, value in data.items():
+                    setattr(instance, field, value)
+                    update_fields.add(field)
+                instance.schedule_next_due()
+                instance.updated_at = now
+            if updates:
+                model.objects.bulk_update([instance for _, instance, _ in updates], sorted(update_fields))
+
+            for _, instance in deletes:
+                periodos.add((instance.fecha.year, instance.fecha.month))
+            if deletes:
+                model.objects.filter(id__in=[instance.pk for _, instance in deletes]).delete()
+
+            for instance in [*created, *(instance for _, instance, _ in updates)]:
+                periodos.add((instance.fecha.year, instance.fecha.month))
+            TransactionService.refresh_periods(usuario, periodos, include_budgets=model is Expense)
+
+        for (result, _), instance in zip(creates, created):
+            result.update(id=instance.pk, status=201, data=serializer_class(instance, context=context).data)
+        for result, instance, _ in updates:
+            result.update(status=200, data=serializer_class(instance, context=context).data)
+        for result, _ in deletes:
+            result['status'] = 204
+        return True, results
+
+    @staticmethod
+    def time_series(usuario, granularidad, fecha_desde, fecha_hasta, por_categoria=False):
+        """
+        Series de ingresos, gastos y balance entre dos fechas (incluidas).
+
+        Cada serie sale de una sola consulta agrupada por
+        ``Trunc('fecha', granularidad)`` (los gastos por categoría salen de la
+        misma consulta) y los períodos sin movimientos se completan con cero
+        en Python.
+
+        Args:
+            usuario (User): Usuario dueño de las transacciones
+            granularidad (str): 'day', 'week', 'month' o 'year'
+            fecha_desde (date): Primer día del rango
+            fecha_hasta (date): Último día del rango
+            por_categoria (bool): Incluir la serie de gastos de cada categoría
+
+        Returns:
+            dict: Períodos, serie total y, si se pidió, series por categoría
+        """
+        periodos = list(iter_periods(fecha_desde, fecha_hasta, granularidad))
+        periodo = Trunc('fecha', granularidad, output_field=DateField())
+
+        ingresos = {
+            row['periodo']: row['total']
+            for row in Income.objects.filter(
+                usuario=usuario, fecha__range=[fecha_desde, fecha_hasta]
+            ).annotate(periodo=periodo).values('periodo').annotate(total=Sum('monto')).order_by()
+        }
+
+        campos = ['periodo']
+        if por_categoria:
+            campos += ['categoria_id', 'categoria__nombre', 'categoria__color']
+        gastos = defaultdict(Decimal)
+        categorias = {}
+        for row in Expense.objects.filter(
+            usuario=usuario, fecha__range=[fecha_desde, fecha_hasta]
+        ).annotate(periodo=periodo).values(*campos).annotate(total=Sum('monto')).order_by():
+            gastos[row['periodo']] += row['total']
+            if por_categoria:
+                categoria = categorias.setdefault(row['categoria_id'], {
+                    'categoria_id': row['categoria_id'],
+                    'categoria': row['categoria__nombre'] or 'Sin categoría',
+                    'color': row['categoria__color'] or '#95a5a6',
+                    'totales': {},
+                })
+                categoria['totales'][row['periodo']] = row['total']
+
+        data = {
+            'granularidad': granularidad,
+            'fecha_desde': fecha_desde,
+            'fecha_hasta': fecha_hasta,
+            'series': [
+                {
+                    'periodo': inicio,
+                    'ingresos': float(ingresos.get(inicio, 0)),
+                    'gastos': float(gastos.get(inicio, 0)),
+                    'balance': float(ingresos.get(inicio, 0) - gastos.get(inicio, 0)),
+                }
+                for inicio in periodos
+            ],
+        }
+        if por_categoria:
+            data['por_categoria'] = sorted(
+                (
+                    {
+                        'categoria_id': categoria['categoria_id'],
+                        'categoria': categoria['categoria'],
+                        'color': categoria['color'],
+                        'total': float(sum(categoria['totales'].values())),
+                        'gastos': [float(categoria['totales'].get(inicio, 0)) for inicio in periodos],
+                    }
+                    for categoria in categorias.values()
+                ),
+                key=lambda item: item['total'],
+                reverse=True
+            )
+        return data
+
+    @staticmethod
+    def dashboard_months(hoy):
+        """Los 6 meses de la evolución del dashboard, del más antiguo al actual"""
+        return [shift_month(hoy.year, hoy.month, -i) for i in range(5, -1, -1)]
+
+    @staticmethod
+    def dashboard_rollups(usuario, periodos):
+        """
+        Filas del resumen mensual precalculado de los periodos (año, mes)
+        indicados, por categoría.
+        """
+        if not periodos:
+            return []
+        filtro_periodos = Q()
+        for año_periodo, mes_periodo in periodos:
+            filtro_periodos |= Q(año=año_periodo, mes=mes_periodo)
+        return list(MonthlyRollup.objects.filter(filtro_periodos, usuario=usuario).values(
+            'año', 'mes', 'categoria__nombre', 'categoria__color',
+            'total_ingresos', 'total_gastos'
+        ))
+
+    @staticmethod
+    def build_dashboard(rollups, año, mes, meses_evolucion):
+        """
+        Armar los datos del dashboard a partir de las filas del resumen
+        mensual del mes pedido y de los meses de la evolución.
+
+        Returns:
+            dict: Datos para DashboardSerializer
+        """
+        ingresos_mes = Decimal('0')
+        gastos_mes = Decimal('0')
+        gastos_por_categoria = []
+        totales_por_mes = {}
+
+        for row in rollups:
+            periodo = (row['año'], row['mes'])
+            ingresos_periodo, gastos_periodo = totales_por_mes.get(periodo, (0, 0))
+            totales_por_mes[periodo] = (
+                ingresos_periodo + row['total_ingresos'],
+                gastos_periodo + row['total_gastos']
+            )
+
+            if periodo == (año, mes):
+                ingresos_mes += row['total_ingresos']
+                gastos_mes += row['total_gastos']
+                if row['total_gastos']:
+                    gastos_por_categoria.append(row)
+
+        # Gastos por categoría
+        gastos_por_categoria.sort(key=lambda item: item['total_gastos'], reverse=True)
+
+        # Evolución de los últimos 6 meses
+        evolucion_mensual = []
+        for año_num, mes_num in meses_evolucion:
+            ingresos, gastos = totales_por_mes.get((año_num, mes_num), (0, 0))
+
+            evolucion_mensual.append({
+                'mes': calendar.month_name[mes_num],
+                'año': año_num,
+                'ingresos': float(ingresos),
+                'gastos': float(gastos),
+                'balance': float(ingresos - gastos)
+            })
+
+        return {
+            'total_ingresos': ingresos_mes,
+            'total_gastos': gastos_mes,
+            'balance': ingresos_mes - gastos_mes,
+            'gastos_por_categoria': [
+                {
+                    'categoria': item['categoria__nombre'] or 'Sin categoría',
+                    'total': float(item['total_gastos']),
+                    'color': item['categoria__color'] or '#95a5a6'
+                }
+                for item in gastos_por_categoria
+            ],
+            'evolucion_mensual': evolucion_mensual
+        }
+
+    @staticmethod
+    def materialize_recurring(today=None, batch_size=1000, on_batch=None):
+        """
+        Generar las ocurrencias vencidas de todas las plantillas recurrentes.
+
+        Las plantillas se toman por lotes con una consulta sobre el índice
+        ``(es_recurrente, next_due)``; cada lote inserta sus ocurrencias con
+        bulk_create, adelanta ``next_due`` con bulk_update y recalcula una
+        vez el resumen mensual y los presupuestos de cada mes afectado, todo
+        en su propia transacción. Las plantillas procesadas dejan de estar
+        vencidas, así que el siguiente lote es de nuevo el primero de la
+        consulta; con ``skip_locked`` varios procesos pueden ejecutarse a la
+        vez. La restricción única (plantilla, fecha) hace idempotente la
+        generación.
+
+        Args:
+            today (date): Fecha hasta la que se materializa (hoy por defecto)
+            batch_size (int): Plantillas por lote
+            on_batch (callable): Se llama con las estadísticas acumuladas
+                después de cada lote
+
+        Returns:
+            Counter: Plantillas procesadas y ocurrencias creadas por tipo
+        """
+        today = today or timezone.localdate()
+        stats = Counter()
+        for model, key in ((Income, 'ingresos'), (Expense, 'gastos')):
+            while True:
+                with transaction.atomic():
+                    templates = list(
+                        model.objects.select_for_update(skip_locked=True)
+                        .filter(es_recurrente=True, next_due__lte=today)
+                        .order_by('next_due', 'id')[:batch_size]
+                    )
+                    if not templates:
+                        break
+                    stats[key] += TransactionService._materialize_batch(model, templates, today)
+                stats['plantillas'] += len(templates)
+                if on_batch:
+                    on_batch(stats)
+        return stats
+
+    @staticmethod
+    def _materialize_batch(model, templates, today):
+        """Materializar un lote de plantillas; devuelve las ocurrencias creadas"""
+        existing = set(
+            model.objects.filter(
+                plantilla__in=templates,
+                fecha__gte=min(template.next_due for template in templates),
+                fecha__lte=today
+            ).values_list('plantilla_id', 'fecha')
+        )
+
+        occurrences = []
+        periodos = defaultdict(set)
+        for template in templates:
+            if not template.frecuencia_dias or template.frecuencia_dias <= 0:
+                template.next_due = None
+                continue
+            step = timedelta(days=template.frecuencia_dias)
+            due = template.next_due
+            # Una plantilla muy atrasada se completa en los lotes siguientes
+            for _ in range(TransactionService.MAX_OCCURRENCES_PER_TEMPLATE):
+                if due > today:
+                    break
+                if (template.pk, due) not in existing:
+                    occurrence = model(
+                        usuario_id=template.usuario_id,
+                        monto=template.monto,
+                        descripcion=template.descripcion,
+                        fecha=due,
+                        plantilla=template,
+                    )
+                    if model is Expense:
+                        occurrence.categoria_id = template.categoria_id
+                    occurrences.append(occurrence)
+                    periodos[template.usuario_id].add((due.year, due.month))
+                due += step
+            template.next_due = due
+
+        # ignore_conflicts cubre la carrera con otro proceso que haya insertado
+        # la misma ocurrencia entre la consulta de existentes y el INSERT
+        model.objects.bulk_create(occurrences, batch_size=1000, ignore_conflicts=True)
+        model.objects.bulk_update(templates, ['next_due'], batch_size=1000)
+
+        TransactionService.refresh_user_periods(periodos, include_budgets=model is Expense)
+        # next_due también forma parte de la respuesta de las plantillas
+        for usuario_id in {template.usuario_id for template in templates} - set(periodos):
+            bump_user_cache_version(usuario_id)
+        return len(occurrences)
+
+    @staticmethod
+    def _validate_batch(serializer_class, rows, context, report):
+        """Validar un lote con many=True; devuelve los datos válidos"""
+        if not rows:
+            return []
+        serializer = serializer_class(data=[data for _, data in rows], many=True, context=context)
+        if serializer.is_valid():
+            return serializer.validated_data
+
+        # ListSerializer descarta todo el lote si una fila falla: se informan
+        # las inválidas y se vuelven a validar solo las demás
+        valid_rows = []
+        for (linea, data), errores in zip(rows, serializer.errors):
+            if errores:
+                report(linea, errores)
+            else:
+                valid_rows.append(data)
+        if not valid_rows:
+            return []
+        serializer = serializer_class(data=valid_rows, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
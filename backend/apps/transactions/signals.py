@@ -0,0 +1,124 @@
+"""
+Signal handlers that keep derived transaction data (monthly rollups and
+balance ledger) in sync.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_init, pre_save, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from apps.categories.models import Category
+from apps.common.cache_utils import invalidate_user_cache_on_change
+from .models import Income, Expense
+from .ledger import apply_balance_delta
+from .rollups import apply_rollup_delta, fold_category_rollups, rollups_deferred
+
+SNAPSHOT_FIELDS = {
+    Income: ('usuario_id', 'fecha', 'monto'),
+    Expense: ('usuario_id', 'fecha', 'categoria_id', 'monto'),
+}
+
+def _snapshot(instance):
+    """Return the persisted-relevant values of a transaction, or None if some are deferred."""
+    values = {}
+    for field in SNAPSHOT_FIELDS[type(instance)]:
+        if field not in instance.__dict__:
+            return None
+        values[field] = instance.__dict__[field]
+    values.setdefault('categoria_id', None)
+    # Las instancias creadas con cadenas ('2024-01-15', '100.00') se normalizan
+    values['fecha'] = instance._meta.get_field('fecha').to_python(values['fecha'])
+    values['monto'] = instance._meta.get_field('monto').to_python(values['monto'])
+    return values
+
+
+def _load_state(sender, pk):
+    state = sender.objects.filter(pk=pk).values(*SNAPSHOT_FIELDS[sender]).first()
+    if state is not None:
+        state.setdefault('categoria_id', None)
+    return state
+
+
+def _deleted_with_user(origin):
+    """Indicar si el borrado lo inició un usuario (instancia o queryset)"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is User
+
+
+def _apply(sender, state, sign):
+    if rollups_deferred():
+        return
+    # apply_balance_delta toma primero el bloqueo del UserBalance y lo mantiene
+    # hasta el final, así el delta del resumen no se cruza con rebuild_rollups
+    with transaction.atomic(savepoint=False):
+        if sender is Income:
+            apply_balance_delta(state['usuario_id'], state['fecha'], ingresos=sign * state['monto'])
+            apply_rollup_delta(state['usuario_id'], state['fecha'], ingresos=sign * state['monto'])
+        else:
+            apply_balance_delta(state['usuario_id'], state['fecha'], gastos=sign * state['monto'])
+            apply_rollup_delta(
+                state['usuario_id'], state['fecha'], state['categoria_id'], gastos=sign * state['monto']
+            )
+
+
+@receiver(post_init, sender=Income)
+@receiver(post_init, sender=Expense)
+def remember_transaction_state(sender, instance, **kwargs):
+    """Guardar los valores originales para calcular deltas al guardar"""
+    instance._rollup_state = _snapshot(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=Income)
+@receiver(pre_save, sender=Expense)
+def load_transaction_state(sender, instance, raw=False, **kwargs):
+    """Recuperar los valores originales si la instancia se cargó con campos diferidos"""
+    if raw or not instance.pk or getattr(instance, '_rollup_state', None) is not None:
+        return
+    instance._rollup_state = _load_state(sender, instance.pk)
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    """Aplicar al resumen mensual la diferencia entre el valor anterior y el nuevo"""
+    if raw:
+        return
+
+    previous = None if created else getattr(instance, '_rollup_state', None)
+    current = _snapshot(instance)
+    if current is None:
+        current = _load_state(sender, instance.pk)
+
+    if previous != current:
+        if previous is not None:
+            _apply(sender, previous, -1)
+        if current is not None:
+            _apply(sender, current, 1)
+
+    instance._rollup_state = current
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    """Restar del resumen mensual la transacción eliminada"""
+    # Al borrar un usuario, la cascada elimina sus rollups, UserBalance y
+    # DailyBalance antes que sus transacciones: aplicar los deltas volvería a
+    # crear filas huérfanas (_lock_balance crea el UserBalance si no existe).
+    # origin sale del propio borrado, así que no queda estado que limpiar si
+    # este falla o se revierte
+    if _deleted_with_user(origin):
+        return
+    state = getattr(instance, '_rollup_state', None) or _snapshot(instance)
+    if state is not None:
+        _apply(sender, state, -1)
+
+
+@receiver(pre_delete, sender=Category)
+def fold_rollups_on_category_delete(sender, instance, **kwargs):
+    """Los gastos pasan a 'Sin categoría' al eliminar la categoría"""
+    fold_category_rollups(instance)
+
+
+invalidate_user_cache_on_change(Income, lambda instance: instance.usuario_id)
+invalidate_user_cache_on_change(Expense, lambda instance: instance.usuario_id)
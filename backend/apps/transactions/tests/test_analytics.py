@@ -0,0 +1,78 @@
+import pytest
+from decimal import Decimal
+from datetime import date
+from apps.transactions.models import Income, Expense
+
+URL = '/api/transactions/analytics/'
+
+
+@pytest.mark.django_db
+class TestTransactionAnalytics:
+    """Tests para el endpoint de series temporales"""
+
+    @pytest.fixture
+    def transacciones(self, user, categories):
+        Income.objects.create(usuario=user, monto=Decimal('1000'), fecha=date(2023, 12, 30))
+        Income.objects.create(usuario=user, monto=Decimal('500'), fecha=date(2024, 3, 1))
+        Expense.objects.create(usuario=user, categoria=categories[0], monto=Decimal('100'), fecha=date(2024, 1, 2))
+        Expense.objects.create(usuario=user, categoria=categories[1], monto=Decimal('40'), fecha=date(2024, 1, 3))
+        Expense.objects.create(usuario=user, categoria=categories[0], monto=Decimal('60'), fecha=date(2024, 3, 9))
+
+    def test_monthly_series_fills_gaps(self, authenticated_client, transacciones):
+        """Verifica la serie mensual con los meses sin movimientos en cero"""
+        response = authenticated_client.get(URL, {
+            'granularidad': 'month', 'fecha_desde': '2023-12-01', 'fecha_hasta': '2024-03-31'
+        })
+
+        assert response.status_code == 200
+        assert response.data['series'] == [
+            {'periodo': date(2023, 12, 1), 'ingresos': 1000.0, 'gastos': 0.0, 'balance': 1000.0},
+            {'periodo': date(2024, 1, 1), 'ingresos': 0.0, 'gastos': 140.0, 'balance': -140.0},
+            {'periodo': date(2024, 2, 1), 'ingresos': 0.0, 'gastos': 0.0, 'balance': 0.0},
+            {'periodo': date(2024, 3, 1), 'ingresos': 500.0, 'gastos': 60.0, 'balance': 440.0},
+        ]
+
+    def test_weekly_series_by_category(self, authenticated_client, transacciones, categories, django_assert_num_queries):
+        """Verifica la serie semanal por categoría con una consulta por serie"""
+        # Ingresos y gastos
+        with django_assert_num_queries(2):
+            response = authenticated_client.get(URL, {
+                'granularidad': 'week', 'fecha_desde': '2024-01-01', 'fecha_hasta': '2024-01-21',
+                'por_categoria': 'true'
+            })
+
+        assert response.status_code == 200
+        assert [item['periodo'] for item in response.data['series']] == [
+            date(2024, 1, 1), date(2024, 1, 8), date(2024, 1, 15)
+        ]
+        assert [item['gastos'] for item in response.data['series']] == [140.0, 0.0, 0.0]
+        por_categoria = response.data['por_categoria']
+        assert [item['categoria_id'] for item in por_categoria] == [categories[0].id, categories[1].id]
+        assert por_categoria[0]['gastos'] == [100.0, 0.0, 0.0]
+
+    def test_invalid_parameters(self, authenticated_client):
+        """Verifica que se rechazan granularidades, fechas y rangos inválidos"""
+        assert authenticated_client.get(URL, {'granularidad': 'hour'}).status_code == 400
+        assert authenticated_client.get(URL, {'fecha_desde': '2024-13-01'}).status_code == 400
+        assert authenticated_client.get(URL, {'fecha_desde': '2024-02-01', 'fecha_hasta': '2024-01-01'}).status_code == 400
+        response = authenticated_client.get(URL, {
+            'granularidad': 'day', 'fecha_desde': '2000-01-01', 'fecha_hasta': '2024-01-01'
+        })
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('granularidad', ['day', 'week', 'month', 'year'])
+    def test_range_ending_at_max_date(self, authenticated_client, granularidad):
+        """Verifica que un rango que termina en 9999-12-31 no desborda al generar los períodos"""
+        response = authenticated_client.get(URL, {'granularidad': granularidad, 'fecha_hasta': '9999-12-31'})
+
+        assert response.status_code == 200
+        assert response.data['series'][-1]['periodo'] <= date.max
+
+    def test_only_own_transactions(self, api_client, another_user, transacciones):
+        """Verifica que cada usuario solo ve sus propias transacciones"""
+        api_client.force_authenticate(user=another_user)
+
+        response = api_client.get(URL, {'fecha_desde': '2024-01-01', 'fecha_hasta': '2024-03-31'})
+
+        assert response.status_code == 200
+        assert all(item['ingresos'] == 0 and item['gastos'] == 0 for item in response.data['series'])
@@ -403,3 +403,55 @@ class TestDashboardAPI:
         assert Decimal(response.data['total_ingresos']) == Decimal('1000')
         assert Decimal(response.data['total_gastos']) == Decimal('500')
         assert Decimal(response.data['balance']) == Decimal('500')
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    """Tests para la paginación por cursor de transacciones"""
+
+    def test_walks_all_pages_forward_and_back(self, authenticated_client, user):
+        """Verifica que el cursor recorre todo sin repetir, incluso con fechas iguales"""
+        for i in range(25):
+            Expense.objects.create(usuario=user, monto=Decimal('10'), fecha=date(2024, 1, 1 + i // 3))
+
+        response = authenticated_client.get('/api/transactions/gastos/?cursor=&page_size=10')
+        assert response.data['count'] == 25
+        assert response.data['previous'] is None
+        pages = [response.data]
+        while pages[-1]['next']:
+            pages.append(authenticated_client.get(pages[-1]['next']).data)
+
+        ids = [item['id'] for page in pages for item in page['results']]
+        assert [len(page['results']) for page in pages] == [10, 10, 5]
+        expected = list(Expense.objects.order_by('-fecha', '-id').values_list('id', flat=True))
+        assert ids == expected
+
+        previous = authenticated_client.get(pages[-1]['previous']).data
+        assert [item['id'] for item in previous['results']] == ids[10:20]
+
+    def test_page_cost_is_constant(self, authenticated_client, user, django_assert_max_num_queries):
+        """Verifica que una página profunda no hace COUNT ni OFFSET"""
+        for i in range(30):
+            Income.objects.create(usuario=user, monto=Decimal('10'), fecha=date(2024, 1, 1) + timedelta(days=i))
+        response = authenticated_client.get('/api/transactions/ingresos/?cursor=&page_size=5')
+
+        for _ in range(3):
+            response = authenticated_client.get(response.data['next'])
+
+        # Solo la consulta de la página: el total sale de la cache
+        with django_assert_max_num_queries(1) as queries:
+            response = authenticated_client.get(response.data['next'])
+        assert response.data['count'] == 30
+        assert 'OFFSET' not in queries.captured_queries[0]['sql']
+
+    def test_invalid_cursor(self, authenticated_client):
+        """Verifica que un cursor inválido responde 404"""
+        response = authenticated_client.get('/api/transactions/gastos/?cursor=basura')
+        assert response.status_code == 404
+
+    def test_page_number_is_default(self, authenticated_client, user):
+        """Verifica que sin cursor se mantiene la paginación por número de página"""
+        Income.objects.create(usuario=user, monto=Decimal('10'), fecha=date(2024, 1, 1))
+        response = authenticated_client.get('/api/transactions/ingresos/?page=1')
+        assert response.data['count'] == 1
+        assert response.data['next'] is None
@@ -0,0 +1,77 @@
+import pytest
+from decimal import Decimal
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient
+from django.urls import include, path
+from django.utils import timezone
+from apps.transactions.models import Income, Expense
+from apps.transactions.views import dashboard_async
+
+# Las vistas async solo se enrutan con ASYNC_VIEWS; aquí se montan aparte
+urlpatterns = [
+    path('async/dashboard/', dashboard_async),
+    path('', include('finance_api.urls')),
+]
+
+
+async def async_get(client, url, **extra):
+    return await client.get(url, **extra)
+
+
+@pytest.mark.urls(__name__)
+@pytest.mark.django_db(transaction=True)
+class TestDashboardAsync:
+    """Tests para la versión async del dashboard"""
+
+    def test_matches_sync_dashboard(self, user, category, authenticated_client):
+        """Verifica que la versión async devuelve lo mismo que la acción síncrona"""
+        hoy = timezone.now().date()
+        Income.objects.create(usuario=user, monto=Decimal('1000'), fecha=hoy)
+        Expense.objects.create(usuario=user, categoria=category, monto=Decimal('250'), fecha=hoy)
+        expected = authenticated_client.get('/api/transactions/gastos/dashboard/').json()
+        cache.clear()
+
+        client = AsyncClient()
+        client.force_login(user)
+        response = async_to_sync(async_get)(client, '/async/dashboard/')
+
+        assert response.status_code == 200
+        assert response.json() == expected
+        assert expected['total_gastos'] == '250.00'
+
+    def test_single_rollup_query(self, user):
+        """Verifica que el mes pedido y la evolución salen de una sola consulta al resumen"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        client = AsyncClient()
+        client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = async_to_sync(async_get)(client, '/async/dashboard/', data={'mes': 1, 'año': 2020})
+
+        assert response.status_code == 200
+        assert sum('monthlyrollup' in query['sql'] for query in queries.captured_queries) == 1
+
+    def test_requires_authentication(self):
+        """Verifica que se requiere autenticación"""
+        response = async_to_sync(async_get)(AsyncClient(), '/async/dashboard/')
+        assert response.status_code == 403
+
+    def test_conditional_get_matches_sync(self, user, authenticated_client):
+        """Verifica que la versión async usa el mismo ETag y responde 304"""
+        etag = authenticated_client.get('/api/transactions/gastos/dashboard/')['ETag']
+
+        client = AsyncClient()
+        client.force_login(user)
+        response = async_to_sync(async_get)(client, '/async/dashboard/')
+        assert response['ETag'] == etag
+
+        response = async_to_sync(async_get)(client, '/async/dashboard/', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+
+        Income.objects.create(usuario=user, monto=Decimal('10'), fecha=timezone.now().date())
+        response = async_to_sync(async_get)(client, '/async/dashboard/', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response['ETag'] != etag
@@ -0,0 +1,82 @@
+import pytest
+from decimal import Decimal
+from datetime import date
+from apps.budgets.models import MonthlyBudget, CategoryBudget
+from apps.transactions.models import Income, Expense
+from apps.transactions.rollups import find_rollup_drift
+
+URL = '/api/transactions/gastos/batch/'
+
+
+@pytest.mark.django_db
+class TestTransactionBatch:
+    """Tests para el endpoint de operaciones por lote"""
+
+    def test_mixed_operations(self, authenticated_client, user, categories):
+        """Verifica create, update y delete en un lote con presupuestos y resumen consistentes"""
+        budget = MonthlyBudget.objects.create(usuario=user, año=2024, mes=1, presupuesto_total=Decimal('1000'))
+        category_budget = CategoryBudget.objects.create(
+            presupuesto_mensual=budget, categoria=categories[0], limite_asignado=Decimal('500')
+        )
+        editar = Expense.objects.create(usuario=user, categoria=categories[0], monto=Decimal('100'), fecha=date(2024, 1, 5))
+        borrar = Expense.objects.create(usuario=user, categoria=categories[0], monto=Decimal('40'), fecha=date(2024, 1, 6))
+
+        response = authenticated_client.post(URL, {'operaciones': [
+            {'op': 'create', 'data': {'categoria': categories[0].id, 'monto': '25.00', 'fecha': '2024-01-10'}},
+            {'op': 'create', 'data': {'categoria': categories[1].id, 'monto': '10.00', 'fecha': '2024-02-01'}},
+            {'op': 'update', 'id': editar.id, 'data': {'monto': '150.00'}},
+            {'op': 'delete', 'id': borrar.id},
+        ]}, format='json')
+
+        assert response.status_code == 200
+        resultados = response.data['resultados']
+        assert [r['status'] for r in resultados] == [201, 201, 200, 204]
+        assert resultados[0]['data']['categoria_info']['nombre'] == categories[0].nombre
+        assert resultados[2]['data']['monto'] == '150.00'
+        assert not Expense.objects.filter(pk=borrar.pk).exists()
+
+        category_budget.refresh_from_db()
+        budget.refresh_from_db()
+        assert category_budget.gastado_actual == Decimal('175')
+        assert budget.gastado_actual == Decimal('175')
+        assert find_rollup_drift([user.id]) == []
+
+    def test_invalid_operation_applies_nothing(self, authenticated_client, user, another_user):
+        """Verifica que si una operación falla no se aplica ninguna"""
+        ajeno = Income.objects.create(usuario=another_user, monto=Decimal('10'), fecha=date(2024, 1, 1))
+
+        response = authenticated_client.post('/api/transactions/ingresos/batch/', [
+            {'op': 'create', 'data': {'monto': '25.00', 'fecha': '2024-01-10'}},
+            {'op': 'create', 'data': {'monto': 'abc', 'fecha': '2024-01-10'}},
+            {'op': 'delete', 'id': ajeno.id},
+            {'op': 'mover'},
+        ], format='json')
+
+        assert response.status_code == 400
+        assert [r.get('status') for r in response.data['resultados']] == [None, 400, 404, 400]
+        assert 'monto' in response.data['resultados'][1]['errores']
+        assert Income.objects.filter(usuario=user).count() == 0
+        assert Income.objects.filter(pk=ajeno.pk).exists()
+
+    def test_queries_do_not_grow_with_operations(self, authenticated_client, user, category, django_assert_max_num_queries):
+        """Verifica que el costo del lote no crece con la cantidad de operaciones"""
+        existentes = [
+            Expense.objects.create(usuario=user, categoria=category, monto=Decimal('10'), fecha=date(2024, 1, 1))
+            for _ in range(20)
+        ]
+        operaciones = [
+            {'op': 'create', 'data': {'categoria': category.id, 'monto': '5.00', 'fecha': '2024-01-15'}}
+            for _ in range(20)
+        ] + [
+            {'op': 'update', 'id': expense.id, 'data': {'monto': '7.00'}} for expense in existentes[:10]
+        ] + [
+            {'op': 'delete', 'id': expense.id} for expense in existentes[10:]
+        ]
+
+        # Incluye el bloqueo de saldos y la reconstrucción del resumen mensual
+        # y del libro de saldos de los meses afectados, un número fijo de consultas
+        with django_assert_max_num_queries(27):
+            response = authenticated_client.post(URL, operaciones, format='json')
+
+        assert response.status_code == 200
+        assert find_rollup_drift([user.id]) == []
@@ -0,0 +1,129 @@
+import csv
+import io
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+import zipfile
+from xml.etree import ElementTree
+import pytest
+from decimal import Decimal
+from datetime import date
+from apps.transactions.models import Income, Expense
+
+
+SHEET_NS = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def read_content(response):
+    return b''.join(response.streaming_content)
+
+
+def read_xlsx_rows(content):
+    """Abre el XLSX como lo haría un lector: zip válido, XML bien formado en todas las partes"""
+    archive = zipfile.ZipFile(io.BytesIO(content))
+    assert archive.testzip() is None
+    for name in archive.namelist():
+        ElementTree.fromstring(archive.read(name))
+    sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+    return [
+        [''.join(cell.itertext()) for cell in row.findall('s:c', SHEET_NS)]
+        for row in sheet.iterfind('s:sheetData/s:row', SHEET_NS)
+    ]
+
+
+@pytest.mark.django_db
+class TestTransactionExport:
+    """Tests para la exportación en streaming"""
+
+    def test_csv_export_with_filters(self, authenticated_client, user, another_user, categories):
+        """Verifica el CSV exportado con filtros de fecha y categoría"""
+        Expense.objects.create(usuario=user, categoria=categories[0], monto=Decimal('10.50'), descripcion='Pan', fecha=date(2024, 1, 5))
+        Expense.objects.create(usuario=user, categoria=categories[1], monto=Decimal('20'), descripcion='Bus', fecha=date(2024, 1, 6))
+        Expense.objects.create(usuario=user, categoria=categories[0], monto=Decimal('30'), descripcion='Viejo', fecha=date(2023, 12, 31))
+        Expense.objects.create(usuario=another_user, categoria=categories[0], monto=Decimal('99'), fecha=date(2024, 1, 5))
+
+        response = authenticated_client.get(
+            f'/api/transactions/gastos/export/?fecha_desde=2024-01-01&categoria={categories[0].id}'
+        )
+
+        assert response.status_code == 200
+        assert response['Content-Disposition'] == 'attachment; filename="gastos.csv"'
+        rows = list(csv.reader(io.StringIO(read_content(response).decode('utf-8-sig'))))
+        assert rows == [
+            ['Fecha', 'Descripción', 'Categoría', 'Monto', 'Recurrente'],
+            ['2024-01-05', 'Pan', categories[0].nombre, '10.50', 'False'],
+        ]
+
+    def test_xlsx_export(self, authenticated_client, user):
+        """Verifica que el XLSX generado es un libro válido con todas las filas"""
+        for day in range(1, 29):
+            Income.objects.create(usuario=user, monto=Decimal('100'), descripcion=f'Ingreso <{day}>', fecha=date(2024, 2, day))
+
+        response = authenticated_client.get('/api/transactions/ingresos/export/?formato=xlsx')
+
+        assert response.status_code == 200
+        rows = read_xlsx_rows(read_content(response))
+        assert len(rows) == 29
+        assert rows[0][0] == 'Fecha'
+        assert 'Ingreso <1>' in [row[1] for row in rows]
+
+    def test_xlsx_strips_xml_illegal_characters(self, authenticated_client, user):
+        """Verifica que un carácter de control en la descripción no corrompe el XLSX"""
+        Income.objects.create(usuario=user, monto=Decimal('5'), descripcion='Banco\x0bSA\x00 & cía', fecha=date(2024, 2, 1))
+
+        response = authenticated_client.get('/api/transactions/ingresos/export/?formato=xlsx')
+
+        rows = read_xlsx_rows(read_content(response))
+        assert 'BancoSA & cía' in rows[1]
+
+    def test_csv_neutralizes_formulas(self, authenticated_client, user, category):
+        """Verifica que los textos que parecen fórmulas se exportan como texto"""
+        for descripcion in ('=HYPERLINK("http://x")', '+1', '-2', '@SUM(A1)', 'Normal'):
+            Expense.objects.create(usuario=user, categoria=category, monto=Decimal('-3'), descripcion=descripcion, fecha=date(2024, 1, 5))
+
+        response = authenticated_client.get('/api/transactions/gastos/export/')
+
+        rows = list(csv.reader(io.StringIO(read_content(response).decode('utf-8-sig'))))
+        descripciones = sorted(row[1] for row in rows[1:])
+        assert descripciones == ["'+1", "'-2", "'=HYPERLINK(\"http://x\")", "'@SUM(A1)", 'Normal']
+        assert {row[3] for row in rows[1:]} == {'-3.00'}
+
+    def test_export_streams_in_chunks(self, authenticated_client, user, category):
+        """Verifica que la respuesta se genera por bloques"""
+        from apps.transactions import exporters
+
+        Expense.objects.bulk_create([
+            Expense(usuario=user, categoria=category, monto=Decimal('1'), fecha=date(2024, 1, 1))
+            for _ in range(exporters.ROWS_PER_CHUNK * 2 + 1)
+        ])
+
+        response = authenticated_client.get('/api/transactions/gastos/export/')
+
+        chunks = list(response.streaming_content)
+        assert len(chunks) == 3
+        assert sum(chunk.count(b'\n') for chunk in chunks) == exporters.ROWS_PER_CHUNK * 2 + 2
+
+    def test_invalid_filters(self, authenticated_client):
+        """Verifica que filtros o formato inválidos responden 400"""
+        assert authenticated_client.get('/api/transactions/gastos/export/?fecha_desde=ayer').status_code == 400
+        assert authenticated_client.get('/api/transactions/gastos/export/?formato=pdf').status_code == 400
+
+    def test_asgi_export_streams_without_buffering(self, user, category):
+        """Verifica que bajo ASGI el export se entrega como iterador async por bloques"""
+        from apps.transactions import exporters
+
+        Expense.objects.bulk_create([
+            Expense(usuario=user, categoria=category, monto=Decimal('1'), fecha=date(2024, 1, 1))
+            for _ in range(exporters.ROWS_PER_CHUNK * 2 + 1)
+        ])
+        client = AsyncClient()
+        client.force_login(user)
+
+        async def fetch():
+            response = await client.get('/api/transactions/gastos/export/')
+            assert response.is_async
+            return [chunk async for chunk in response.streaming_content]
+
+        chunks = async_to_sync(fetch)()
+
+        assert len(chunks) == 3
+        assert sum(chunk.count(b'\n') for chunk in chunks) == exporters.ROWS_PER_CHUNK * 2 + 2
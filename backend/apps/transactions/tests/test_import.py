@@ -0,0 +1,122 @@
+import pytest
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+from apps.budgets.models import MonthlyBudget, CategoryBudget
+from apps.transactions.models import Income, Expense
+from apps.transactions.rollups import find_rollup_drift
+
+OFX = b"""OFXHEADER:100
+DATA:OFXSGML
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240115120000[-5:EST]
+<TRNAMT>-45.50
+<NAME>Supermercado
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240201
+<TRNAMT>1500.00
+<MEMO>Salario
+</BANKTRANLIST>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+
+def upload(content, name='movimientos.csv'):
+    return SimpleUploadedFile(name, content, content_type='application/octet-stream')
+
+
+@pytest.mark.django_db
+class TestTransactionImport:
+    """Tests para la importación masiva de transacciones"""
+
+    def test_csv_import_with_errors(self, authenticated_client, user, categories):
+        """Verifica que se importan las filas válidas y se informan las inválidas"""
+        csv = (
+            'fecha,monto,descripcion,categoria,tipo\n'
+            '2024-01-05,1000,Salario,,ingreso\n'
+            '2024-01-10,200,Mercado,alimentación,gasto\n'
+            f'2024-02-03,50.25,Bus,{categories[1].id},gasto\n'
+            'no-es-fecha,10,Mala,,gasto\n'
+            '2024-01-11,30,Sin categoría valida,Inexistente,gasto\n'
+        ).encode('utf-8')
+
+        response = authenticated_client.post(
+            '/api/transactions/importar/', {'archivo': upload(csv)}, format='multipart'
+        )
+
+        assert response.status_code == 201
+        assert response.data['ingresos'] == 1
+        assert response.data['gastos'] == 2
+        assert response.data['total_errores'] == 2
+        assert [error['linea'] for error in response.data['errores']] == [5, 6]
+        assert Expense.objects.get(descripcion='Mercado').categoria == categories[0]
+        assert find_rollup_drift([user.id]) == []
+
+    def test_signed_amounts_and_budget_refresh(self, authenticated_client, user, category):
+        """Verifica el tipo por signo y el recálculo de presupuestos al final"""
+        budget = MonthlyBudget.objects.create(usuario=user, año=2024, mes=1, presupuesto_total=Decimal('1000'))
+        category_budget = CategoryBudget.objects.create(
+            presupuesto_mensual=budget, categoria=category, limite_asignado=Decimal('100')
+        )
+        rows = ''.join(f'2024-01-{day:02d},-10,Gasto {day},{category.id}\n' for day in range(1, 21))
+        csv = ('fecha,monto,descripcion,categoria\n' + rows + '2024-01-21,500,Ingreso,\n').encode('utf-8')
+
+        response = authenticated_client.post(
+            '/api/transactions/importar/', {'archivo': upload(csv)}, format='multipart'
+        )
+
+        assert response.data['gastos'] == 20
+        assert response.data['ingresos'] == 1
+        budget.refresh_from_db()
+        category_budget.refresh_from_db()
+        assert budget.gastado_actual == Decimal('200')
+        assert category_budget.gastado_actual == Decimal('200')
+        assert category_budget.budgetalert_set.count() == 1
+
+    def test_query_count_independent_of_rows(self, user, category, django_assert_max_num_queries):
+        """Verifica que el costo por lote no depende de la cantidad de filas"""
+        from apps.transactions.services import TransactionService
+
+        rows = ''.join(f'2024-03-{day % 28 + 1:02d},12.5,Fila {day},{category.nombre}\n' for day in range(500))
+        archivo = upload(('fecha,monto,descripcion,categoria\n' + rows).encode('utf-8'))
+
+        # Categorías + inserts (SQLite parte cada bulk_create según su límite de
+        # parámetros) + bloqueo de saldos + recálculo de resumen, saldos y
+        # presupuestos una sola vez
+        with django_assert_max_num_queries(29):
+            result = TransactionService.import_file(user, archivo, tipo='gasto', batch_size=250)
+
+        assert result['gastos'] == 500
+        assert Expense.objects.filter(usuario=user).count() == 500
+        assert find_rollup_drift([user.id]) == []
+
+    def test_ofx_import(self, authenticated_client, user):
+        """Verifica la importación de un OFX en formato SGML"""
+        response = authenticated_client.post(
+            '/api/transactions/importar/', {'archivo': upload(OFX, 'banco.ofx')}, format='multipart'
+        )
+
+        assert response.status_code == 201
+        expense = Expense.objects.get(usuario=user)
+        assert expense.monto == Decimal('45.50')
+        assert str(expense.fecha) == '2024-01-15'
+        assert expense.descripcion == 'Supermercado'
+        assert Income.objects.get(usuario=user).descripcion == 'Salario'
+
+    def test_invalid_format(self, authenticated_client):
+        """Verifica que un formato desconocido responde 400"""
+        response = authenticated_client.post(
+            '/api/transactions/importar/', {'archivo': upload(b'x', 'datos.xls')}, format='multipart'
+        )
+        assert response.status_code == 400
+
+        response = authenticated_client.post(
+            '/api/transactions/importar/', {'archivo': upload(b'a,b\n1,2\n')}, format='multipart'
+        )
+        assert response.status_code == 400
@@ -0,0 +1,90 @@
+import pytest
+from decimal import Decimal
+from datetime import date
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from apps.transactions.ledger import find_ledger_drift, get_balance, rebuild_ledger
+from apps.transactions.models import Income, Expense, UserBalance, DailyBalance
+
+URL = '/api/transactions/balance/'
+
+
+@pytest.mark.django_db
+class TestBalanceLedger:
+    """Tests para el libro de saldos acumulados"""
+
+    def test_signals_keep_ledger_in_sync(self, user, categories):
+        """Verifica que crear, editar y eliminar transacciones actualiza saldo y cierres diarios"""
+        Income.objects.create(usuario=user, monto=Decimal('1000'), fecha=date(2024, 1, 1))
+        gasto = Expense.objects.create(usuario=user, categoria=categories[0], monto=Decimal('100'), fecha=date(2024, 1, 10))
+        Expense.objects.create(usuario=user, categoria=categories[0], monto=Decimal('50'), fecha=date(2024, 1, 20))
+
+        # Mover un gasto a una fecha anterior actualiza los cierres posteriores
+        gasto.fecha = date(2024, 1, 5)
+        gasto.monto = Decimal('120')
+        gasto.save()
+
+        assert get_balance(user.id)['saldo'] == Decimal('830')
+        assert get_balance(user.id, date(2024, 1, 4))['saldo'] == Decimal('1000')
+        assert get_balance(user.id, date(2024, 1, 12))['saldo'] == Decimal('880')
+        assert not DailyBalance.objects.filter(usuario=user, fecha=date(2024, 1, 10)).exists()
+        assert find_ledger_drift([user.id]) == []
+
+        gasto.delete()
+        assert get_balance(user.id)['saldo'] == Decimal('950')
+        assert find_ledger_drift([user.id]) == []
+
+    def test_bulk_import_updates_ledger(self, authenticated_client, user):
+        """Verifica que la importación masiva deja el libro de saldos consistente"""
+        Income.objects.create(usuario=user, monto=Decimal('500'), fecha=date(2023, 12, 1))
+        csv = b'fecha,monto\n2024-01-05,-40\n2024-01-06,200\n'
+
+        response = authenticated_client.post(
+            '/api/transactions/importar/',
+            {'archivo': SimpleUploadedFile('movimientos.csv', csv)},
+            format='multipart'
+        )
+
+        assert response.status_code == 201
+        assert get_balance(user.id)['saldo'] == Decimal('660')
+        assert find_ledger_drift([user.id]) == []
+
+    def test_balance_endpoint(self, authenticated_client, user, django_assert_max_num_queries):
+        """Verifica el saldo actual y a una fecha con una sola consulta"""
+        Income.objects.create(usuario=user, monto=Decimal('1000'), fecha=date(2024, 1, 1))
+        Expense.objects.create(usuario=user, monto=Decimal('300'), fecha=date(2024, 2, 1))
+
+        with django_assert_max_num_queries(1):
+            response = authenticated_client.get(URL)
+        assert response.status_code == 200
+        assert response.data['saldo'] == Decimal('700')
+        assert response.data['total_gastos'] == Decimal('300')
+
+        response = authenticated_client.get(URL, {'fecha': '2024-01-31'})
+        assert response.data['saldo'] == Decimal('1000')
+        assert authenticated_client.get(URL, {'fecha': 'ayer'}).status_code == 400
+
+    def test_rebuild_command(self, user):
+        """Verifica que el comando detecta y corrige diferencias"""
+        Income.objects.create(usuario=user, monto=Decimal('100'), fecha=date(2024, 1, 1))
+        UserBalance.objects.filter(usuario=user).update(saldo=Decimal('0'), total_ingresos=Decimal('0'))
+        DailyBalance.objects.filter(usuario=user).delete()
+        assert len(find_ledger_drift([user.id])) == 2
+
+        call_command('rebuild_balance_ledger')
+
+        assert find_ledger_drift() == []
+        assert get_balance(user.id)['saldo'] == Decimal('100')
+
+    def test_rebuild_updates_locked_balance_in_place(self, user):
+        """Verifica que la reconstrucción actualiza la fila de saldo bloqueada en lugar de recrearla"""
+        income = Income.objects.create(usuario=user, monto=Decimal('100'), fecha=date(2024, 1, 1))
+        balance_pk = UserBalance.objects.get(usuario=user).pk
+        Income.objects.filter(pk=income.pk).delete()
+
+        rebuild_ledger([user.id])
+
+        balance = UserBalance.objects.get(usuario=user)
+        assert balance.pk == balance_pk
+        assert balance.saldo == Decimal('0')
+        assert not DailyBalance.objects.filter(usuario=user).exists()
@@ -0,0 +1,93 @@
+import pytest
+from decimal import Decimal
+from datetime import date
+from django.core.management import call_command
+from apps.budgets.models import MonthlyBudget, CategoryBudget
+from apps.transactions.models import Income, Expense
+from apps.transactions.rollups import find_rollup_drift
+from apps.transactions.services import TransactionService
+
+
+@pytest.mark.django_db
+class TestRecurringMaterialization:
+    """Tests para la generación de transacciones recurrentes"""
+
+    def test_next_due_is_scheduled(self, user):
+        """Verifica que next_due se programa al crear y se limpia al dejar de ser recurrente"""
+        income = Income.objects.create(
+            usuario=user, monto=Decimal('1000'), fecha=date(2024, 1, 1), es_recurrente=True, frecuencia_dias=30
+        )
+        assert income.next_due == date(2024, 1, 31)
+
+        income.es_recurrente = False
+        income.save(update_fields=['es_recurrente'])
+        income.refresh_from_db()
+        assert income.next_due is None
+
+    def test_materializes_due_occurrences(self, user, categories):
+        """Verifica que se generan las ocurrencias vencidas y se actualizan resumen y presupuestos"""
+        budget = MonthlyBudget.objects.create(usuario=user, año=2024, mes=2, presupuesto_total=Decimal('1000'))
+        category_budget = CategoryBudget.objects.create(
+            presupuesto_mensual=budget, categoria=categories[0], limite_asignado=Decimal('500')
+        )
+        gasto = Expense.objects.create(
+            usuario=user, categoria=categories[0], monto=Decimal('50'), descripcion='Gimnasio',
+            fecha=date(2024, 1, 1), es_recurrente=True, frecuencia_dias=14
+        )
+        Income.objects.create(
+            usuario=user, monto=Decimal('1000'), fecha=date(2024, 1, 1), es_recurrente=True, frecuencia_dias=31
+        )
+
+        stats = TransactionService.materialize_recurring(today=date(2024, 2, 15), batch_size=1)
+
+        assert stats == {'gastos': 3, 'ingresos': 1, 'plantillas': 2}
+        ocurrencias = gasto.ocurrencias.order_by('fecha')
+        assert [o.fecha for o in ocurrencias] == [date(2024, 1, 15), date(2024, 1, 29), date(2024, 2, 12)]
+        assert all(o.categoria_id == categories[0].id and not o.es_recurrente for o in ocurrencias)
+        gasto.refresh_from_db()
+        assert gasto.next_due == date(2024, 2, 26)
+
+        category_budget.refresh_from_db()
+        assert category_budget.gastado_actual == Decimal('50')
+        assert find_rollup_drift([user.id]) == []
+
+    def test_materialization_is_idempotent(self, user):
+        """Verifica que volver a ejecutar o reprogramar la plantilla no duplica ocurrencias"""
+        income = Income.objects.create(
+            usuario=user, monto=Decimal('100'), fecha=date(2024, 1, 1), es_recurrente=True, frecuencia_dias=7
+        )
+        TransactionService.materialize_recurring(today=date(2024, 1, 20))
+        assert TransactionService.materialize_recurring(today=date(2024, 1, 20))['ingresos'] == 0
+
+        # Reprogramar hacia atrás no vuelve a crear las ocurrencias existentes
+        Income.objects.filter(pk=income.pk).update(next_due=date(2024, 1, 8))
+        stats = TransactionService.materialize_recurring(today=date(2024, 1, 22))
+
+        assert stats['ingresos'] == 1
+        assert income.ocurrencias.count() == 3
+
+    def test_batch_query_count(self, user, another_user, django_assert_max_num_queries):
+        """Verifica que un lote de plantillas usa un número constante de consultas"""
+        Income.objects.bulk_create([
+            Income(usuario=usuario, monto=Decimal('10'), fecha=date(2024, 1, 1),
+                   es_recurrente=True, frecuencia_dias=1, next_due=date(2024, 1, 2))
+            for usuario in (user, another_user) for _ in range(20)
+        ])
+
+        # Selección, existentes, INSERT (SQLite lo divide por su límite de
+        # parámetros), UPDATE, resumen mensual, bloqueo y libro de saldos y la
+        # selección vacía que termina cada tipo, más los savepoints
+        with django_assert_max_num_queries(32):
+            stats = TransactionService.materialize_recurring(today=date(2024, 1, 5))
+
+        assert stats['ingresos'] == 160
+
+    def test_command(self, user):
+        """Verifica que el comando genera las ocurrencias hasta la fecha indicada"""
+        Expense.objects.create(
+            usuario=user, monto=Decimal('20'), fecha=date(2024, 1, 1), es_recurrente=True, frecuencia_dias=10
+        )
+
+        call_command('materialize_recurring_transactions', '--date', '2024-01-25')
+
+        assert Expense.objects.filter(plantilla__isnull=False).count() == 2
@@ -0,0 +1,174 @@
+import pytest
+from decimal import Decimal
+from datetime import date
+from django.core.management import call_command
+from apps.transactions.models import Income, Expense, MonthlyRollup, UserBalance, DailyBalance
+from apps.transactions.rollups import rebuild_rollups, find_rollup_drift
+
+
+def get_rollup(user, año, mes, categoria=None):
+    return MonthlyRollup.objects.get(usuario=user, año=año, mes=mes, categoria=categoria)
+
+
+@pytest.mark.django_db
+class TestMonthlyRollupSignals:
+    """Tests para el mantenimiento incremental del resumen mensual"""
+
+    def test_create_income_and_expense(self, user, category):
+        """Verifica que crear transacciones suma al resumen"""
+        Income.objects.create(usuario=user, monto=Decimal('1000'), fecha=date(2024, 1, 5))
+        Expense.objects.create(usuario=user, categoria=category, monto=Decimal('300'), fecha=date(2024, 1, 10))
+        Expense.objects.create(usuario=user, categoria=category, monto='200.50', fecha='2024-01-20')
+
+        assert get_rollup(user, 2024, 1).total_ingresos == Decimal('1000')
+        assert get_rollup(user, 2024, 1, category).total_gastos == Decimal('500.50')
+
+    def test_update_moves_between_months_and_categories(self, user, categories):
+        """Verifica que editar un gasto ajusta el mes/categoría anterior y el nuevo"""
+        expense = Expense.objects.create(
+            usuario=user, categoria=categories[0], monto=Decimal('300'), fecha=date(2024, 1, 10)
+        )
+
+        expense = Expense.objects.get(pk=expense.pk)
+        expense.categoria = categories[1]
+        expense.fecha = date(2024, 2, 3)
+        expense.monto = Decimal('120')
+        expense.save()
+
+        assert get_rollup(user, 2024, 1, categories[0]).total_gastos == Decimal('0')
+        assert get_rollup(user, 2024, 2, categories[1]).total_gastos == Decimal('120')
+
+    def test_update_with_deferred_fields(self, user, category):
+        """Verifica que las instancias con campos diferidos también se contabilizan"""
+        expense = Expense.objects.create(
+            usuario=user, categoria=category, monto=Decimal('300'), fecha=date(2024, 1, 10)
+        )
+
+        expense = Expense.objects.only('id', 'descripcion').get(pk=expense.pk)
+        expense.monto = Decimal('100')
+        expense.save()
+
+        assert get_rollup(user, 2024, 1, category).total_gastos == Decimal('100')
+
+    def test_delete_subtracts(self, user, category):
+        """Verifica que eliminar una transacción resta del resumen"""
+        income = Income.objects.create(usuario=user, monto=Decimal('1000'), fecha=date(2024, 1, 5))
+        Income.objects.create(usuario=user, monto=Decimal('500'), fecha=date(2024, 1, 6))
+
+        income.delete()
+
+        assert get_rollup(user, 2024, 1).total_ingresos == Decimal('500')
+
+    def test_category_delete_folds_into_uncategorized(self, user, category):
+        """Verifica que al eliminar una categoría sus gastos pasan a 'Sin categoría'"""
+        Expense.objects.create(usuario=user, categoria=category, monto=Decimal('300'), fecha=date(2024, 1, 10))
+
+        category.delete()
+
+        assert get_rollup(user, 2024, 1).total_gastos == Decimal('300')
+        assert find_rollup_drift([user.id]) == []
+
+    def test_user_delete_with_transactions(self, user, another_user, category):
+        """Verifica que borrar un usuario con transacciones no recrea sus rollups ni su ledger"""
+        Income.objects.create(usuario=user, monto=Decimal('1000'), fecha=date(2024, 1, 5))
+        Expense.objects.create(usuario=user, categoria=category, monto=Decimal('300'), fecha=date(2024, 1, 10))
+        Income.objects.create(usuario=another_user, monto=Decimal('50'), fecha=date(2024, 1, 5))
+
+        user.delete()
+
+        assert not MonthlyRollup.objects.filter(usuario_id=user.id).exists()
+        assert not UserBalance.objects.filter(usuario_id=user.id).exists()
+        assert not DailyBalance.objects.filter(usuario_id=user.id).exists()
+        assert not Income.objects.filter(usuario_id=user.id).exists()
+        # Los deltas de los demás usuarios se siguen aplicando
+        Income.objects.create(usuario=another_user, monto=Decimal('25'), fecha=date(2024, 1, 6))
+        assert get_rollup(another_user, 2024, 1).total_ingresos == Decimal('75')
+        assert UserBalance.objects.get(usuario=another_user).saldo == Decimal('75')
+
+
+    def test_failed_user_delete_keeps_applying_deltas(self, user):
+        """Verifica que un borrado de usuario que falla no deja de aplicar los deltas de sus transacciones"""
+        from django.contrib.auth.models import User
+        from django.db import transaction
+        from django.db.models.signals import pre_delete
+
+        Income.objects.create(usuario=user, monto=Decimal('100'), fecha=date(2024, 1, 5))
+
+        def fail(sender, instance, **kwargs):
+            raise RuntimeError('borrado interrumpido')
+
+        pre_delete.connect(fail, sender=User)
+        try:
+            with pytest.raises(RuntimeError), transaction.atomic():
+                user.delete()
+        finally:
+            pre_delete.disconnect(fail, sender=User)
+
+        Income.objects.filter(usuario=user).delete()
+        assert get_rollup(user, 2024, 1).total_ingresos == Decimal('0')
+        assert UserBalance.objects.get(usuario=user).saldo == Decimal('0')
+
+@pytest.mark.django_db
+class TestRollupRebuild:
+    """Tests para la reconstrucción y verificación del resumen"""
+
+    def test_find_drift_and_rebuild(self, user, category):
+        """Verifica que se detectan y corrigen diferencias"""
+        Expense.objects.create(usuario=user, categoria=category, monto=Decimal('300'), fecha=date(2024, 1, 10))
+        MonthlyRollup.objects.filter(usuario=user).update(total_gastos=Decimal('1'))
+
+        drift = find_rollup_drift([user.id])
+        assert len(drift) == 1
+        assert drift[0]['esperado'] == (Decimal('0'), Decimal('300'))
+
+        rebuild_rollups([user.id])
+
+        assert find_rollup_drift([user.id]) == []
+        assert get_rollup(user, 2024, 1, category).total_gastos == Decimal('300')
+
+    def test_management_command(self, user, category):
+        """Verifica el comando de reconstrucción"""
+        Expense.objects.create(usuario=user, categoria=category, monto=Decimal('300'), fecha=date(2024, 1, 10))
+        MonthlyRollup.objects.all().delete()
+
+        call_command('rebuild_monthly_rollups', '--check')
+        assert MonthlyRollup.objects.count() == 0
+
+        call_command('rebuild_monthly_rollups')
+        assert get_rollup(user, 2024, 1, category).total_gastos == Decimal('300')
+
+
+@pytest.mark.django_db
+class TestDashboardRollup:
+    """Tests para el dashboard basado en el resumen mensual"""
+
+    def test_dashboard_uses_single_query(self, authenticated_client, user, categories, django_assert_max_num_queries):
+        """Verifica que el costo del dashboard no depende del historial"""
+        for month in range(1, 13):
+            Income.objects.create(usuario=user, monto=Decimal('1000'), fecha=date(2023, month, 1))
+            for categoria in categories:
+                Expense.objects.create(usuario=user, categoria=categoria, monto=Decimal('10'), fecha=date(2023, month, 2))
+
+        # Sesión + usuario + resumen mensual
+        with django_assert_max_num_queries(3):
+            response = authenticated_client.get('/api/transactions/gastos/dashboard/?mes=6&año=2023')
+
+        assert response.status_code == 200
+        assert Decimal(response.data['total_gastos']) == Decimal('30')
+        assert len(response.data['gastos_por_categoria']) == 3
+
+    def test_dashboard_is_cached_until_write(self, authenticated_client, user, category, django_assert_max_num_queries):
+        """Verifica que el dashboard se sirve de cache y se invalida al escribir"""
+        url = '/api/transactions/gastos/dashboard/?mes=1&año=2024'
+        Expense.objects.create(usuario=user, categoria=category, monto=Decimal('100'), fecha=date(2024, 1, 10))
+        assert Decimal(authenticated_client.get(url).data['total_gastos']) == Decimal('100')
+
+        # Solo sesión + usuario, sin consultas de agregación
+        with django_assert_max_num_queries(2):
+            response = authenticated_client.get(url)
+        assert Decimal(response.data['total_gastos']) == Decimal('100')
+
+        Expense.objects.create(usuario=user, categoria=category, monto=Decimal('50'), fecha=date(2024, 1, 11))
+
+        response = authenticated_client.get(url)
+        assert Decimal(response.data['total_gastos']) == Decimal('150')
@@ -290,3 +290,47 @@ class TestBudgetUpdateLogic:
         # Debería seguir habiendo solo 1 alerta
         alerts = BudgetAlert.objects.filter(usuario=user)
         assert alerts.count() == 1
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    """Tests para ETag/Last-Modified en los viewsets"""
+
+    def test_if_none_match_returns_304_without_queries(self, authenticated_client, user, django_assert_max_num_queries):
+        """Verifica que un ETag vigente responde 304 sin consultar la base de datos"""
+        Income.objects.create(usuario=user, monto=Decimal('100'), fecha=date(2024, 1, 1))
+        response = authenticated_client.get('/api/transactions/ingresos/')
+        etag = response['ETag']
+        assert response['Cache-Control'] == 'private, no-cache'
+        assert 'Last-Modified' in response
+
+        with django_assert_max_num_queries(0):
+            response = authenticated_client.get('/api/transactions/ingresos/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert not response.content
+
+        response = authenticated_client.get('/api/transactions/ingresos/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == 304
+
+    def test_write_changes_etag(self, authenticated_client, user, another_user):
+        """Verifica que una escritura del usuario cambia el ETag y la de otro no"""
+        etag = authenticated_client.get('/api/transactions/gastos/')['ETag']
+
+        Income.objects.create(usuario=another_user, monto=Decimal('100'), fecha=date(2024, 1, 1))
+        response = authenticated_client.get('/api/transactions/gastos/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        Expense.objects.create(usuario=user, monto=Decimal('50'), fecha=date(2024, 1, 1))
+        response = authenticated_client.get('/api/transactions/gastos/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_disabled_without_shared_cache(self, authenticated_client, settings):
+        """Verifica que sin cache compartida no se envían validadores ni 304"""
+        settings.CONDITIONAL_GET_ENABLED = False
+        response = authenticated_client.get('/api/transactions/gastos/')
+        assert 'ETag' not in response
+
+        response = authenticated_client.get('/api/transactions/gastos/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 200
@@ -1,11 +1,21 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import IncomeViewSet, ExpenseViewSet
+from .views import (
+    IncomeViewSet, ExpenseViewSet, TransactionImportView, TransactionAnalyticsView, BalanceView, dashboard_async
+)
 
 router = DefaultRouter()
 router.register(r'ingresos', IncomeViewSet, basename='ingresos')
 router.register(r'gastos', ExpenseViewSet, basename='gastos')
 
 urlpatterns = [
+    path('analytics/', TransactionAnalyticsView.as_view(), name='transactions-analytics'),
+    path('balance/', BalanceView.as_view(), name='transactions-balance'),
+    path('importar/', TransactionImportView.as_view(), name='transactions-import'),
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_VIEWS:
+    # Antes que la ruta de la acción dashboard del router
+    urlpatterns.insert(0, path('gastos/dashboard/', dashboard_async, name='gastos-dashboard-async'))
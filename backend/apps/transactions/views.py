@@ -2,25 +2,151 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Q
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.views import APIView
+from datetime import date
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from datetime import datetime, timedelta
 from .models import Income, Expense
 from .serializers import IncomeSerializer, ExpenseSerializer, DashboardSerializer
-from apps.common.date_utils import get_month_date_range
+from .exporters import stream_csv, stream_xlsx
+from .importers import ImportFormatError
+from .ledger import get_balance
+from .services import TransactionService, ExpenseBulkSerializer
+from apps.common.date_utils import GRANULARITIES, iter_periods, shift_month
+from apps.common.async_views import async_api_view, streaming_content
 from apps.common.budget_utils import calculate_budget_spending
-import calendar
+from apps.common.cache_utils import cache_user_response, ConditionalGetMixin
+from apps.common.pagination import OptionalKeysetPagination
 
-class IncomeViewSet(viewsets.ModelViewSet):
+
+class BatchOperationsMixin:
+    """Acción ``batch`` para aplicar varias operaciones en una sola petición"""
+    batch_serializer_class = None
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Aplicar una lista de operaciones create/update/delete en una
+        transacción. Acepta una lista o ``{'operaciones': [...]}`` y devuelve
+        el resultado de cada operación; si alguna falla no se aplica ninguna.
+        """
+        operations = request.data.get('operaciones') if isinstance(request.data, dict) else request.data
+        if not isinstance(operations, list) or not operations:
+            return Response(
+                {'error': 'Debe enviar una lista de operaciones'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(operations) > settings.TRANSACTION_BATCH_MAX_OPERATIONS:
+            return Response(
+                {'error': f'Máximo {settings.TRANSACTION_BATCH_MAX_OPERATIONS} operaciones por lote'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        applied, results = TransactionService.apply_batch(
+            request.user,
+            self.get_queryset().model,
+            self.batch_serializer_class or self.get_serializer_class(),
+            operations
+        )
+        return Response(
+            {'resultados': results},
+            status=status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST
+        )
+
+
+class ExportMixin:
+    """Acción ``export`` que descarga las transacciones del usuario en CSV o XLSX"""
+    # (encabezado, campo para values_list)
+    export_columns = ()
+    export_filename = 'transacciones'
+    export_chunk_size = 2000
+
+    EXPORT_FORMATS = {
+        'csv': (stream_csv, 'text/csv; charset=utf-8'),
+        'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    }
+
+    def filter_export_queryset(self, queryset, params):
+        """Aplicar los filtros ``fecha_desde``, ``fecha_hasta`` y ``categoria``"""
+        for param, lookup in (('fecha_desde', 'fecha__gte'), ('fecha_hasta', 'fecha__lte')):
+            if params.get(param):
+                queryset = queryset.filter(**{lookup: date.fromisoformat(params[param])})
+        # Los ingresos no tienen categoría
+        if params.get('categoria') and hasattr(queryset.model, 'categoria'):
+            queryset = queryset.filter(categoria_id__in=[int(pk) for pk in params['categoria'].split(',')])
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Descargar las transacciones filtradas en ``formato`` csv (por defecto)
+        o xlsx. Las filas se leen con values_list e iterator por bloques y se
+        envían a medida que se generan, con memoria constante (también bajo
+        ASGI, donde el cuerpo se entrega como iterador async).
+        """
+        formato = request.query_params.get('formato', 'csv').lower()
+        if formato not in self.EXPORT_FORMATS:
+            return Response(
+                {'error': 'Formato no soportado. Use csv o xlsx'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            queryset = self.filter_export_queryset(
+                self.get_queryset().model.objects.filter(usuario=request.user),
+                request.query_params
+            )
+        except ValueError:
+            return Response(
+                {'error': 'Filtros inválidos: use fechas AAAA-MM-DD e ids de categoría separados por comas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = queryset.order_by('fecha', 'id').values_list(
+            *[field for _, field in self.export_columns]
+        ).iterator(chunk_size=self.export_chunk_size)
+        stream, content_type = self.EXPORT_FORMATS[formato]
+
+        response = StreamingHttpResponse(
+            streaming_content(request._request, stream([header for header, _ in self.export_columns], rows)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.export_filename}.{formato}"'
+        return response
+
+
+class IncomeViewSet(BatchOperationsMixin, ExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = IncomeSerializer
+    export_filename = 'ingresos'
+    export_columns = (
+        ('Fecha', 'fecha'),
+        ('Descripción', 'descripcion'),
+        ('Monto', 'monto'),
+        ('Recurrente', 'es_recurrente'),
+    )
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
 
     def get_queryset(self):
         return Income.objects.filter(usuario=self.request.user)
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(BatchOperationsMixin, ExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ExpenseSerializer
+    export_filename = 'gastos'
+    export_columns = (
+        ('Fecha', 'fecha'),
+        ('Descripción', 'descripcion'),
+        ('Categoría', 'categoria__nombre'),
+        ('Monto', 'monto'),
+        ('Recurrente', 'es_recurrente'),
+    )
+    batch_serializer_class = ExpenseBulkSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
 
     def get_queryset(self):
         return Expense.objects.filter(usuario=self.request.user).select_related('categoria')
@@ -32,8 +158,12 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     
     def perform_update(self, serializer):
         """Actualizar presupuestos cuando se modifica un gasto"""
+        # Guardar datos anteriores para ajustar el mes/categoría de origen
+        instance = serializer.instance
+        previous = (instance.fecha, instance.categoria_id, instance.monto)
+        
         expense = serializer.save()
-        self.update_budgets_after_expense(expense)
+        self.update_budgets_after_expense(expense, previous=previous)
     
     def perform_destroy(self, instance):
         """Actualizar presupuestos cuando se elimina un gasto"""
@@ -41,65 +171,41 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         usuario = instance.usuario
         fecha = instance.fecha
         categoria = instance.categoria
+        monto = instance.monto
         
         super().perform_destroy(instance)
         
         # Actualizar presupuestos después de eliminar
-        self.update_budgets_after_deletion(usuario, fecha, categoria)
+        self.update_budgets_after_deletion(usuario, fecha, categoria, monto)
     
-    def update_budgets_after_expense(self, expense):
-        """Actualizar presupuestos relacionados después de crear/modificar un gasto"""
+    def update_budgets_after_expense(self, expense, previous=None):
+        """
+        Actualizar presupuestos relacionados después de crear/modificar un gasto.
+        
+        Se aplican deltas con F() en lugar de recalcular el mes completo;
+        ``previous`` es la tupla (fecha, categoria_id, monto) antes de editar.
+        """
         try:
-            from apps.budgets.models import MonthlyBudget, CategoryBudget
-            
-            # Buscar presupuesto mensual correspondiente
-            monthly_budget = MonthlyBudget.objects.filter(
-                usuario=expense.usuario,
-                año=expense.fecha.year,
-                mes=expense.fecha.month,
-                activo=True
-            ).first()
+            from apps.budgets.services import BudgetService
             
-            if monthly_budget:
-                # Actualizar gastos del presupuesto mensual
-                self.recalculate_monthly_budget(monthly_budget)
-                
-                # Actualizar presupuesto de categoría si existe
-                if expense.categoria:
-                    category_budget = CategoryBudget.objects.filter(
-                        presupuesto_mensual=monthly_budget,
-                        categoria=expense.categoria
-                    ).first()
-                    
-                    if category_budget:
-                        self.recalculate_category_budget(category_budget)
+            BudgetService.apply_expense_change(
+                expense.usuario,
+                previous=previous,
+                current=(expense.fecha, expense.categoria_id, expense.monto)
+            )
         except Exception as e:
             # Log error but don't fail the transaction
             print(f"Error updating budgets: {e}")
     
-    def update_budgets_after_deletion(self, usuario, fecha, categoria):
+    def update_budgets_after_deletion(self, usuario, fecha, categoria, monto):
         """Actualizar presupuestos después de eliminar un gasto"""
         try:
-            from apps.budgets.models import MonthlyBudget, CategoryBudget
+            from apps.budgets.services import BudgetService
             
-            monthly_budget = MonthlyBudget.objects.filter(
-                usuario=usuario,
-                año=fecha.year,
-                mes=fecha.month,
-                activo=True
-            ).first()
-            
-            if monthly_budget:
-                self.recalculate_monthly_budget(monthly_budget)
-                
-                if categoria:
-                    category_budget = CategoryBudget.objects.filter(
-                        presupuesto_mensual=monthly_budget,
-                        categoria=categoria
-                    ).first()
-                    
-                    if category_budget:
-                        self.recalculate_category_budget(category_budget)
+            BudgetService.apply_expense_change(
+                usuario,
+                previous=(fecha, categoria.id if categoria else None, monto)
+            )
         except Exception as e:
             print(f"Error updating budgets after deletion: {e}")
     
@@ -134,33 +240,14 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     def check_budget_alerts(self, category_budget):
         """Verificar y crear alertas de presupuesto"""
         try:
-            from apps.budgets.models import BudgetAlert
+            from apps.budgets.services import BudgetService
             
-            if category_budget.necesita_alerta:
-                # Verificar si ya existe una alerta reciente
-                existing_alert = BudgetAlert.objects.filter(
-                    usuario=category_budget.presupuesto_mensual.usuario,
-                    presupuesto_categoria=category_budget,
-                    activa=True,
-                    created_at__date=timezone.now().date()
-                ).exists()
-                
-                if not existing_alert:
-                    alert_type = 'category_exceeded' if category_budget.esta_excedido else 'category_warning'
-                    mensaje = f"Has gastado {category_budget.porcentaje_gastado:.1f}% de tu presupuesto en {category_budget.categoria.nombre}"
-                    
-                    BudgetAlert.objects.create(
-                        usuario=category_budget.presupuesto_mensual.usuario,
-                        tipo=alert_type,
-                        presupuesto_categoria=category_budget,
-                        mensaje=mensaje,
-                        porcentaje_gastado=category_budget.porcentaje_gastado,
-                        monto_excedido=max(category_budget.gastado_actual - category_budget.limite_asignado, 0)
-                    )
+            BudgetService.check_category_alerts(category_budget)
         except Exception as e:
             print(f"Error checking budget alerts: {e}")
 
     @action(detail=False, methods=['get'])
+    @cache_user_response('transactions.dashboard')
     def dashboard(self, request):
         """Endpoint para obtener datos del dashboard"""
         user = request.user
@@ -169,108 +256,145 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         mes = int(request.query_params.get('mes', timezone.now().month))
         año = int(request.query_params.get('año', timezone.now().year))
         
-        # Filtros de fecha para el mes actual
-        inicio_mes, fin_mes = get_month_date_range(año, mes)
-        
-        # Calcular totales del mes
-        ingresos_mes = Income.objects.filter(
-            usuario=user, 
-            fecha__range=[inicio_mes, fin_mes]
-        ).aggregate(total=Sum('monto'))['total'] or 0
-        
-        gastos_mes = Expense.objects.filter(
-            usuario=user, 
-            fecha__range=[inicio_mes, fin_mes]
-        ).aggregate(total=Sum('monto'))['total'] or 0
-        
-        balance = ingresos_mes - gastos_mes
-        
-        # Gastos por categoría
-        gastos_por_categoria = Expense.objects.filter(
-            usuario=user, 
-            fecha__range=[inicio_mes, fin_mes]
-        ).values(
-            'categoria__nombre', 
-            'categoria__color'
-        ).annotate(
-            total=Sum('monto')
-        ).order_by('-total')
-        
-        # Evolución de los últimos 6 meses - optimized with single query
-        evolucion_mensual = []
-        
-        # Calculate date range for last 6 months
-        end_date = timezone.now().date()
-        start_date = end_date.replace(day=1)
-        for i in range(5, -1, -1):
-            # Calculate start of month going backwards
-            month_offset = i
-            year_offset = month_offset // 12
-            month_num = start_date.month - (month_offset % 12)
-            year_num = start_date.year - year_offset
-            
-            if month_num <= 0:
-                month_num += 12
-                year_num -= 1
-        
-        # Get all transactions for the last 6 months in two queries
-        six_months_ago = datetime(year_num, month_num, 1).date()
-        
-        ingresos_data = Income.objects.filter(
-            usuario=user,
-            fecha__gte=six_months_ago,
-            fecha__lte=end_date
-        ).values(
-            'fecha__year', 'fecha__month'
-        ).annotate(
-            total=Sum('monto')
-        ).order_by('fecha__year', 'fecha__month')
-        
-        gastos_data = Expense.objects.filter(
-            usuario=user,
-            fecha__gte=six_months_ago,
-            fecha__lte=end_date
-        ).values(
-            'fecha__year', 'fecha__month'
-        ).annotate(
-            total=Sum('monto')
-        ).order_by('fecha__year', 'fecha__month')
-        
-        # Convert to dictionaries for fast lookup
-        ingresos_dict = {(item['fecha__year'], item['fecha__month']): item['total'] for item in ingresos_data}
-        gastos_dict = {(item['fecha__year'], item['fecha__month']): item['total'] for item in gastos_data}
-        
-        # Build the evolution list
-        for i in range(5, -1, -1):
-            fecha_mes = timezone.now().date().replace(day=1) - timedelta(days=i*30)
-            mes_num = fecha_mes.month
-            año_num = fecha_mes.year
-            
-            ingresos = ingresos_dict.get((año_num, mes_num), 0)
-            gastos = gastos_dict.get((año_num, mes_num), 0)
-            
-            evolucion_mensual.append({
-                'mes': calendar.month_name[mes_num],
-                'año': año_num,
-                'ingresos': float(ingresos),
-                'gastos': float(gastos),
-                'balance': float(ingresos - gastos)
-            })
-        
-        data = {
-            'total_ingresos': ingresos_mes,
-            'total_gastos': gastos_mes,
-            'balance': balance,
-            'gastos_por_categoria': [
-                {
-                    'categoria': item['categoria__nombre'] or 'Sin categoría',
-                    'total': float(item['total']),
-                    'color': item['categoria__color'] or '#95a5a6'
-                }
-                for item in gastos_por_categoria
-            ],
-            'evolucion_mensual': evolucion_mensual
-        }
+        # Los totales salen del resumen mensual precalculado: una sola consulta
+        # sobre el mes pedido y los últimos 6 meses, sin importar el historial
+        meses_evolucion = TransactionService.dashboard_months(timezone.now().date())
+        rollups = TransactionService.dashboard_rollups(user, set(meses_evolucion) | {(año, mes)})
+        data = TransactionService.build_dashboard(rollups, año, mes, meses_evolucion)
         
         serializer = DashboardSerializer(data)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+@async_api_view('transactions.dashboard')
+async def dashboard_async(request):
+    """
+    Versión async del dashboard para el modo ASGI. El mes pedido y la
+    evolución salen de una sola consulta al resumen mensual, como en la
+    acción síncrona: partirla en dos no ahorra tiempo y ocupa otra conexión.
+    """
+    user = request.user
+    mes = int(request.GET.get('mes', timezone.now().month))
+    año = int(request.GET.get('año', timezone.now().year))
+
+    meses_evolucion = TransactionService.dashboard_months(timezone.now().date())
+    rollups = await sync_to_async(TransactionService.dashboard_rollups)(
+        user, set(meses_evolucion) | {(año, mes)}
+    )
+    data = TransactionService.build_dashboard(rollups, año, mes, meses_evolucion)
+    return DashboardSerializer(data).data
+
+
+class TransactionImportView(APIView):
+    """Importación masiva de ingresos y gastos desde un archivo CSV u OFX"""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        """
+        Importar el archivo enviado en el campo ``archivo``.
+
+        Parámetros opcionales: ``formato`` (csv/ofx, por defecto según la
+        extensión) y ``tipo`` (ingreso/gasto para CSV sin columna tipo).
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response(
+                {'error': 'Debe enviar un archivo en el campo archivo'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            result = TransactionService.import_file(
+                request.user,
+                archivo,
+                formato=request.data.get('formato'),
+                tipo=request.data.get('tipo')
+            )
+        except (ImportFormatError, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        imported = result['ingresos'] + result['gastos']
+        return Response(
+            result,
+            status=status.HTTP_201_CREATED if imported else status.HTTP_400_BAD_REQUEST
+        )
+
+
+
+class TransactionAnalyticsView(ConditionalGetMixin, APIView):
+    """Series temporales de ingresos, gastos y balance con granularidad variable"""
+    permission_classes = [IsAuthenticated]
+
+    # Períodos que se devuelven como máximo en una respuesta
+    MAX_PERIODOS = 1500
+
+    @cache_user_response('transactions.analytics')
+    def get(self, request):
+        """
+        Parámetros opcionales: ``granularidad`` (day, week, month o year; por
+        defecto month), ``fecha_desde`` y ``fecha_hasta`` (por defecto los
+        últimos 12 meses) y ``por_categoria`` (true para incluir la serie de
+        gastos de cada categoría).
+        """
+        params = request.query_params
+        granularidad = params.get('granularidad', 'month')
+        if granularidad not in GRANULARITIES:
+            return Response(
+                {'error': f"granularidad debe ser una de: {', '.join(GRANULARITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        hoy = timezone.localdate()
+        try:
+            fecha_hasta = date.fromisoformat(params['fecha_hasta']) if params.get('fecha_hasta') else hoy
+            if params.get('fecha_desde'):
+                fecha_desde = date.fromisoformat(params['fecha_desde'])
+            else:
+                fecha_desde = date(*shift_month(fecha_hasta.year, fecha_hasta.month, -11), 1)
+        except ValueError:
+            return Response(
+                {'error': 'Las fechas deben tener el formato AAAA-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if fecha_desde > fecha_hasta:
+            return Response(
+                {'error': 'fecha_desde debe ser anterior a fecha_hasta'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(list(islice(iter_periods(fecha_desde, fecha_hasta, granularidad), self.MAX_PERIODOS + 1))) > self.MAX_PERIODOS:
+            return Response(
+                {'error': f'El rango supera {self.MAX_PERIODOS} períodos; use una granularidad mayor'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(TransactionService.time_series(
+            request.user,
+            granularidad,
+            fecha_desde,
+            fecha_hasta,
+            por_categoria=params.get('por_categoria', '').lower() in ('1', 'true')
+        ))
+
+
+class BalanceView(ConditionalGetMixin, APIView):
+    """Saldo acumulado del usuario, actual o al cierre de una fecha"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Sin parámetros devuelve el saldo actual (todas las transacciones); con
+        ``fecha`` (AAAA-MM-DD) el saldo al cierre de ese día. Ambos salen del
+        libro de saldos con una sola consulta por índice.
+        """
+        fecha = request.query_params.get('fecha')
+        if fecha:
+            try:
+                fecha = date.fromisoformat(fecha)
+            except ValueError:
+                return Response(
+                    {'error': 'La fecha debe tener el formato AAAA-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        return Response({'fecha': fecha or None, **get_balance(request.user.pk, fecha or None)})
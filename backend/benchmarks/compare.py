@@ -0,0 +1,64 @@
+"""
+Comparar dos archivos de resultados de benchmarks.
+
+    python benchmarks/compare.py base.json nuevo.json [--threshold 20]
+
+Termina con código 1 si algún benchmark hace más consultas o su mediana de
+tiempo empeora más que ``--threshold`` por ciento.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, encoding='utf-8') as source:
+        data = json.load(source)
+    return data['meta'], {result['name']: result for result in data['results']}
+
+
+def _p95(result):
+    # Resultados anteriores al p95 solo tienen el máximo
+    return result['wall_ms'].get('p95', result['wall_ms']['max'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Comparar dos ejecuciones de benchmarks')
+    parser.add_argument('base')
+    parser.add_argument('nuevo')
+    parser.add_argument('--threshold', type=float, default=20, help='Empeoramiento de tiempo tolerado en %% (por defecto 20)')
+    args = parser.parse_args(argv)
+
+    base_meta, base = load(args.base)
+    new_meta, new = load(args.nuevo)
+    print(f"base:  {base_meta.get('commit')} {base_meta['database']} {base_meta['dataset']}")
+    print(f"nuevo: {new_meta.get('commit')} {new_meta['database']} {new_meta['dataset']}")
+    print(
+        f"{'benchmark':<36} {'consultas':>13} {'mediana ms':>21} {'cambio':>8}"
+        f" {'p95 ms':>21} {'memoria KB':>21}"
+    )
+
+    regressions = []
+    for name in sorted(set(base) | set(new)):
+        if name not in base or name not in new:
+            print(f"{name:<36} {'(solo en ' + ('base' if name in base else 'nuevo') + ')':>13}")
+            continue
+        before, after = base[name], new[name]
+        change = (after['wall_ms']['median'] - before['wall_ms']['median']) / before['wall_ms']['median'] * 100
+        print(
+            f"{name:<36} {before['queries']:>6} → {after['queries']:<4}"
+            f" {before['wall_ms']['median']:>9.1f} → {after['wall_ms']['median']:<9.1f} {change:>+7.1f}%"
+            f" {_p95(before):>9.1f} → {_p95(after):<9.1f}"
+            f" {before['peak_memory_kb']:>9.0f} → {after['peak_memory_kb']:<9.0f}"
+        )
+        if after['queries'] > before['queries'] or change > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\nRegresiones: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+import django
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.test import AsyncClient
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .factories import build_dataset
+
+DATASET = {
+    'expenses': int(os.environ.get('BENCHMARK_EXPENSES', 200000)),
+    'users': int(os.environ.get('BENCHMARK_USERS', 10000)),
+}
+ROUNDS = int(os.environ.get('BENCHMARK_ROUNDS', 5))
+OUTPUT = os.environ.get('BENCHMARK_OUTPUT', 'benchmark-results.json')
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Generar el historial una sola vez por sesión (o reutilizarlo con --reuse-db)"""
+    with django_db_blocker.unblock():
+        if not User.objects.filter(username='bench-heavy').exists():
+            started = time.perf_counter()
+            build_dataset(**DATASET)
+            print(f"\nDatos generados en {time.perf_counter() - started:.1f}s: {DATASET}")
+
+
+@pytest.fixture
+def heavy_user(db):
+    return User.objects.get(username='bench-heavy')
+
+
+@pytest.fixture
+def heavy_client(heavy_user):
+    """Autenticado con la sesión, igual que el cliente async, para comparar las mismas consultas"""
+    client = APIClient()
+    client.force_login(heavy_user)
+    return client
+
+
+@pytest.fixture
+def heavy_async_client(heavy_user):
+    """Cliente para las vistas async; se autentican con la sesión, no con DRF"""
+    client = AsyncClient()
+    client.force_login(heavy_user)
+    return client
+
+
+class QueryCounter:
+    """
+    Cuenta las consultas de todas las conexiones, también las que
+    run_concurrently abre en otros hilos (CaptureQueriesContext solo ve la
+    conexión del hilo que mide).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.active = False
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.active and 'SAVEPOINT' not in sql:
+            with self._lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, db_connection):
+        if self not in db_connection.execute_wrappers:
+            db_connection.execute_wrappers.append(self)
+
+    @contextmanager
+    def counting(self):
+        for db_connection in connections.all():
+            self.install(db_connection)
+        self.count = 0
+        self.active = True
+        try:
+            yield self
+        finally:
+            self.active = False
+
+
+query_counter = QueryCounter()
+
+
+@receiver(connection_created)
+def count_queries(sender, connection, **kwargs):
+    query_counter.install(connection)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@pytest.fixture(scope='session')
+def benchmark_results():
+    """Acumular los resultados de la sesión y escribirlos en BENCHMARK_OUTPUT"""
+    results = []
+    yield results
+    if not results:
+        return
+    with open(OUTPUT, 'w', encoding='utf-8') as output:
+        json.dump({
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'commit': _git_commit(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'dataset': DATASET,
+                'rounds': ROUNDS,
+            },
+            'results': results,
+        }, output, indent=2)
+    print(f'\nResultados de benchmarks en {OUTPUT}')
+
+
+def _percentile(values, percent):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+def _run_once(func):
+    """Ejecutar sin cache y deshacer lo que escriba, para que cada ronda haga el mismo trabajo"""
+    cache.clear()
+    with transaction.atomic():
+        result = func()
+        transaction.set_rollback(True)
+    return result
+
+
+@pytest.fixture
+def benchmark(benchmark_results):
+    """
+    Medir una operación: una ronda con tracemalloc para consultas y pico de
+    memoria y BENCHMARK_ROUNDS rondas para el tiempo de reloj.
+    """
+    def measure(name, func):
+        tracemalloc.start()
+        try:
+            with query_counter.counting() as queries:
+                result = _run_once(func)
+            _, peak = tracemalloc.get_traced_memory()
+            query_count = queries.count
+        finally:
+            tracemalloc.stop()
+
+        times = []
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            _run_once(func)
+            times.append((time.perf_counter() - started) * 1000)
+
+        benchmark_results.append({
+            'name': name,
+            # Sin contar los SAVEPOINT de cada ronda
+            'queries': query_count,
+            'wall_ms': {
+                'min': round(min(times), 3),
+                'median': round(statistics.median(times), 3),
+                'p95': round(_percentile(times, 95), 3),
+                'max': round(max(times), 3),
+            },
+            'peak_memory_kb': round(peak / 1024, 1),
+        })
+        return result
+    return measure
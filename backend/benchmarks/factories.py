@@ -0,0 +1,176 @@
+"""
+Factories y generadores de historiales sintéticos para los benchmarks.
+
+Las factories sirven para objetos sueltos; ``create_bulk`` construye los
+objetos con la factory sin guardarlos y los inserta con bulk_create por
+bloques, para poder generar cientos de miles de filas en segundos. Los
+valores aleatorios usan la semilla fija de factory_boy, así que cada
+ejecución genera los mismos datos.
+"""
+from datetime import timedelta
+from decimal import Decimal
+import factory
+from factory import fuzzy
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+from apps.budgets.models import MonthlyBudget, CategoryBudget
+from apps.budgets.services import BudgetService
+from apps.categories.models import Category
+from apps.goals.models import SavingGoal
+from apps.loans.models import Loan, LoanPayment
+from apps.loans.services import LoanService
+from apps.notifications.models import Notification
+from apps.transactions.ledger import rebuild_ledger
+from apps.transactions.models import Income, Expense
+from apps.transactions.rollups import rebuild_rollups
+
+factory.random.reseed_random('finance-benchmarks')
+
+TODAY = timezone.localdate()
+HISTORY_START = TODAY - timedelta(days=3 * 365)
+
+# Un solo hash para todos los usuarios generados
+PASSWORD = make_password('benchmark123')
+
+
+class UserFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f'bench-{n}')
+    email = factory.LazyAttribute(lambda user: f'{user.username}@example.com')
+    password = PASSWORD
+
+
+class CategoryFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Category
+
+    nombre = factory.Sequence(lambda n: f'Categoría {n}')
+    color = '#3498db'
+    icono = '📦'
+
+
+class IncomeFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Income
+
+    monto = fuzzy.FuzzyDecimal(500, 5000)
+    descripcion = factory.Sequence(lambda n: f'Ingreso {n}')
+    fecha = fuzzy.FuzzyDate(HISTORY_START, TODAY)
+
+
+class ExpenseFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Expense
+
+    monto = fuzzy.FuzzyDecimal(1, 300)
+    descripcion = factory.Sequence(lambda n: f'Gasto {n}')
+    fecha = fuzzy.FuzzyDate(HISTORY_START, TODAY)
+
+
+class LoanFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Loan
+
+    name = factory.Sequence(lambda n: f'Préstamo {n}')
+    amount = fuzzy.FuzzyDecimal(1000, 20000)
+    installments = 24
+    date = fuzzy.FuzzyDate(HISTORY_START, TODAY)
+
+
+class LoanPaymentFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = LoanPayment
+
+    amount = fuzzy.FuzzyDecimal(10, 40)
+    date = fuzzy.FuzzyDate(HISTORY_START, TODAY)
+
+
+class SavingGoalFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = SavingGoal
+
+    nombre = factory.Sequence(lambda n: f'Meta {n}')
+    monto_objetivo = Decimal('1000')
+    monto_actual = fuzzy.FuzzyDecimal(0, 999)
+    # Metas vencidas, próximas a vencer y lejanas
+    fecha_limite = fuzzy.FuzzyDate(TODAY - timedelta(days=10), TODAY + timedelta(days=60))
+
+
+class NotificationFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Notification
+
+    tipo = 'savings_reminder'
+    titulo = factory.Sequence(lambda n: f'Notificación {n}')
+    mensaje = 'Recuerda registrar tus ahorros'
+    leida = fuzzy.FuzzyChoice([True, False])
+
+
+def create_bulk(factory_class, size, batch_size=5000, **kwargs):
+    """Generar ``size`` objetos con la factory e insertarlos con bulk_create por bloques"""
+    model = factory_class._meta.model
+    created = 0
+    while created < size:
+        chunk = min(batch_size, size - created)
+        model.objects.bulk_create(factory_class.build_batch(chunk, **kwargs), batch_size=batch_size)
+        created += chunk
+    return created
+
+
+def build_dataset(expenses=200000, users=10000):
+    """
+    Generar el historial completo de los benchmarks.
+
+    - Un usuario "pesado" con ``expenses`` gastos repartidos en tres años,
+      ingresos, préstamos con pagos, metas, notificaciones y el presupuesto
+      del mes actual.
+    - ``users`` usuarios livianos con dos metas cada uno para el barrido de
+      notificaciones.
+
+    Como bulk_create no dispara señales, al final se reconstruyen el resumen
+    mensual, el libro de saldos y el gasto del presupuesto.
+
+    Returns:
+        User: El usuario pesado
+    """
+    categorias = CategoryFactory.create_batch(8)
+    heavy = UserFactory(username='bench-heavy')
+
+    for index, categoria in enumerate(categorias):
+        create_bulk(
+            ExpenseFactory,
+            expenses // len(categorias) + (1 if index < expenses % len(categorias) else 0),
+            usuario=heavy,
+            categoria=categoria,
+        )
+    create_bulk(IncomeFactory, max(expenses // 100, 1), usuario=heavy)
+
+    for loan in Loan.objects.bulk_create(LoanFactory.build_batch(20, user=heavy)):
+        create_bulk(LoanPaymentFactory, 12, loan=loan)
+    create_bulk(SavingGoalFactory, 10, usuario=heavy)
+    create_bulk(NotificationFactory, 5000, usuario=heavy)
+
+    budget = MonthlyBudget.objects.create(
+        usuario=heavy, año=TODAY.year, mes=TODAY.month, presupuesto_total=Decimal('20000')
+    )
+    CategoryBudget.objects.bulk_create([
+        CategoryBudget(presupuesto_mensual=budget, categoria=categoria, limite_asignado=Decimal('2500'))
+        for categoria in categorias
+    ])
+
+    created = 0
+    while created < users:
+        chunk = User.objects.bulk_create(UserFactory.build_batch(min(5000, users - created)))
+        SavingGoal.objects.bulk_create([
+            goal for usuario in chunk for goal in SavingGoalFactory.build_batch(2, usuario=usuario)
+        ], batch_size=5000)
+        created += len(chunk)
+
+    rebuild_rollups([heavy.pk])
+    rebuild_ledger([heavy.pk])
+    LoanService.rebuild_payment_counters(Loan.objects.filter(user=heavy).values('pk'))
+    BudgetService.refresh_budget_spending(budget)
+    return heavy
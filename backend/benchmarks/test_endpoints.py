@@ -0,0 +1,95 @@
+"""
+Benchmarks de los endpoints principales sobre un historial grande.
+
+No forman parte de la suite normal; se ejecutan con RUN_BENCHMARKS=1 (ver
+README_TESTS.md).
+"""
+import os
+import pytest
+from asgiref.sync import async_to_sync
+from apps.notifications.services import NotificationService
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.skipif(not os.environ.get('RUN_BENCHMARKS'), reason='Defina RUN_BENCHMARKS=1 para ejecutar los benchmarks'),
+]
+
+LIST_ENDPOINTS = [
+    ('transactions.gastos.list', '/api/transactions/gastos/', {}),
+    ('transactions.gastos.keyset', '/api/transactions/gastos/', {'cursor': ''}),
+    ('transactions.ingresos.list', '/api/transactions/ingresos/', {}),
+    ('transactions.analytics.month', '/api/transactions/analytics/', {'por_categoria': 'true'}),
+    ('transactions.analytics.day', '/api/transactions/analytics/', {'granularidad': 'day'}),
+    ('transactions.balance', '/api/transactions/balance/', {}),
+    ('loans.list', '/api/loans/', {}),
+    ('goals.list', '/api/goals/', {}),
+    ('notifications.list', '/api/notifications/notifications/', {}),
+]
+
+
+@pytest.mark.django_db
+class TestEndpointBenchmarks:
+    """Consultas, tiempo y memoria de cada endpoint"""
+
+    def test_dashboard(self, heavy_client, benchmark):
+        """Mide el dashboard del mes actual"""
+        response = benchmark('transactions.dashboard', lambda: heavy_client.get('/api/transactions/gastos/dashboard/'))
+        assert response.status_code == 200
+
+    def test_budget_summary(self, heavy_client, benchmark):
+        """Mide el resumen de presupuestos"""
+        response = benchmark('budgets.summary', lambda: heavy_client.get('/api/budgets/monthly/summary/'))
+        assert response.status_code == 200
+
+    def test_loan_summary(self, heavy_client, benchmark):
+        """Mide el resumen de préstamos"""
+        response = benchmark('loans.summary', lambda: heavy_client.get('/api/loans/summary/'))
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize('name,url,params', LIST_ENDPOINTS, ids=[item[0] for item in LIST_ENDPOINTS])
+    def test_list_endpoints(self, heavy_client, benchmark, name, url, params):
+        """Mide los listados y lecturas más usados"""
+        response = benchmark(name, lambda: heavy_client.get(url, params))
+        assert response.status_code == 200
+
+
+async def async_get(client, url):
+    return await client.get(url)
+
+
+@pytest.mark.urls('benchmarks.urls')
+@pytest.mark.django_db
+class TestAsyncEndpointBenchmarks:
+    """
+    Versiones async (modo ASGI) del dashboard y del resumen de presupuestos,
+    para comparar su p95 con transactions.dashboard y budgets.summary
+    """
+
+    def test_dashboard_async(self, heavy_async_client, benchmark):
+        """Mide el dashboard con las consultas en paralelo"""
+        response = benchmark(
+            'transactions.dashboard.async',
+            lambda: async_to_sync(async_get)(heavy_async_client, '/async/transactions/dashboard/')
+        )
+        assert response.status_code == 200
+
+    def test_budget_summary_async(self, heavy_async_client, benchmark):
+        """Mide el resumen de presupuestos con las consultas en paralelo"""
+        response = benchmark(
+            'budgets.summary.async',
+            lambda: async_to_sync(async_get)(heavy_async_client, '/async/budgets/summary/')
+        )
+        assert response.status_code == 200
+
+
+@pytest.mark.django_db
+class TestBackgroundJobBenchmarks:
+    """Consultas, tiempo y memoria de las tareas periódicas"""
+
+    def test_goal_notification_sweep(self, benchmark):
+        """Mide el barrido de notificaciones de metas sobre todos los usuarios"""
+        stats = benchmark(
+            'notifications.goal_sweep',
+            lambda: NotificationService.check_and_create_goal_notifications(batch_size=1000)
+        )
+        assert stats
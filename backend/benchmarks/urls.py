@@ -0,0 +1,10 @@
+"""Rutas de los benchmarks: las de la API más las vistas async, que solo se enrutan con ASYNC_VIEWS."""
+from django.urls import include, path
+from apps.budgets.views import summary_async
+from apps.transactions.views import dashboard_async
+
+urlpatterns = [
+    path('async/transactions/dashboard/', dashboard_async),
+    path('async/budgets/summary/', summary_async),
+    path('', include('finance_api.urls')),
+]
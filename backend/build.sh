@@ -16,6 +16,9 @@ python manage.py collectstatic --no-input
 # Run migrations
 python manage.py migrate --no-input
 
+# Cache table (only used with CACHE_BACKEND=...DatabaseCache)
+python manage.py createcachetable
+
 # Create default categories (non-blocking)
 python manage.py create_categories || python create_categories_simple.py || true
 
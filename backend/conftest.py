@@ -1,10 +1,19 @@
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from apps.categories.models import Category
 from decimal import Decimal
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Fixture para aislar la cache entre tests"""
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def api_client():
     """Fixture para cliente API"""
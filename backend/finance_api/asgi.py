@@ -0,0 +1,15 @@
+"""
+Punto de entrada ASGI.
+
+    gunicorn finance_api.asgi:application -k uvicorn.workers.UvicornWorker
+
+En este modo el dashboard, el resumen de presupuestos y el stream de
+notificaciones usan sus versiones async (ASYNC_VIEWS).
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finance_api.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+
+application = get_asgi_application()
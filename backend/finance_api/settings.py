@@ -1,5 +1,5 @@
 import os
-from decouple import config
+from decouple import Csv, config
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.common.middleware.QueryProfilingMiddleware',  # Conteo de consultas y Server-Timing
     'corsheaders.middleware.CorsMiddleware',
     'cors_middleware.CorsMiddleware',  # Middleware personalizado para CORS
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -67,6 +68,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'finance_api.wsgi.application'
+ASGI_APPLICATION = 'finance_api.asgi.application'
+
+# Servir las versiones async del dashboard, del resumen de presupuestos y del
+# stream de notificaciones. finance_api.asgi lo activa; bajo WSGI Django
+# tendría que consumir el stream completo antes de enviarlo.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 DATABASES = {
     'default': {
@@ -84,6 +91,28 @@ import dj_database_url
 if config('DATABASE_URL', default=None):
     DATABASES['default'] = dj_database_url.parse(config('DATABASE_URL'))
 
+# Conexiones persistentes: cada worker reutiliza su conexión durante
+# DB_CONN_MAX_AGE segundos y verifica que siga viva antes de reutilizarla.
+DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# Pool acotado por proceso (apps.common.pooled_postgresql), útil con workers
+# de varios hilos: cada petición devuelve su conexión al pool y las que no
+# encuentran una libre esperan hasta DB_POOL_TIMEOUT segundos.
+if config('DB_POOL_ENABLED', default=False, cast=bool) and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default'].update({
+        'ENGINE': 'apps.common.pooled_postgresql',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=5, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=5.0, cast=float),
+            'MAX_IDLE': config('DB_POOL_MAX_IDLE', default=300, cast=int),
+            # Las conexiones inactivas más de estos segundos se prueban con
+            # SELECT 1 antes de entregarlas (el servidor pudo cerrarlas)
+            'CHECK_AFTER': config('DB_POOL_CHECK_AFTER', default=1.0, cast=float),
+        },
+    })
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -129,6 +158,108 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Cache compartida por todos los workers de gunicorn: las generaciones por
+# usuario que invalidan las respuestas cacheadas y los ETag deben verse igual
+# en todos los procesos (LocMemCache es propia de cada worker y serviría datos
+# viejos). Con varias instancias usar la tabla de base de datos:
+# CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache y
+# CACHE_LOCATION=finance_api_cache (build.sh ejecuta createcachetable)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default='/tmp/finance-api-cache'),
+        # Al superar el límite se borra un tercio de las entradas al azar,
+        # incluidas las generaciones de los usuarios
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)},
+    }
+}
+
+# ETag/Last-Modified de ConditionalGetMixin. Salen de las generaciones
+# guardadas en la cache, así que con una cache propia de cada proceso un
+# worker que no vio la escritura respondería 304 con datos viejos: se
+# desactivan salvo que la cache sea compartida.
+CONDITIONAL_GET_ENABLED = config(
+    'CONDITIONAL_GET_ENABLED',
+    default=not CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache')),
+    cast=bool
+)
+
+# Segundos que se guardan en cache las respuestas de dashboard y resúmenes
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=300, cast=int)
+
+# Filas por lote al importar transacciones desde CSV/OFX
+TRANSACTION_IMPORT_BATCH_SIZE = config('TRANSACTION_IMPORT_BATCH_SIZE', default=1000, cast=int)
+
+# Operaciones máximas por petición en /transactions/*/batch/
+TRANSACTION_BATCH_MAX_OPERATIONS = config('TRANSACTION_BATCH_MAX_OPERATIONS', default=500, cast=int)
+
+# Segundos que se guarda el total aproximado de la paginación por cursor
+PAGINATION_COUNT_CACHE_TIMEOUT = config('PAGINATION_COUNT_CACHE_TIMEOUT', default=600, cast=int)
+
+# Stream SSE de notificaciones. Bajo WSGI cada conexión abierta ocupa un hilo
+# del worker, así que está desactivado por defecto: responde 204 y el frontend
+# vuelve a consultar periódicamente. Con ASGI siempre está activo. Con
+# gthread puede activarse, limitado a NOTIFICATIONS_STREAM_MAX_CONNECTIONS
+# streams por proceso para que el resto de hilos siga atendiendo la API.
+NOTIFICATIONS_STREAM_ENABLED = config('NOTIFICATIONS_STREAM_ENABLED', default=False, cast=bool)
+NOTIFICATIONS_STREAM_MAX_CONNECTIONS = config('NOTIFICATIONS_STREAM_MAX_CONNECTIONS', default=2, cast=int)
+# LocalSocketPubSub entrega entre los workers de la misma máquina;
+# InProcessPubSub solo dentro del proceso que publica.
+NOTIFICATIONS_PUBSUB_BACKEND = config(
+    'NOTIFICATIONS_PUBSUB_BACKEND', default='apps.notifications.pubsub.LocalSocketPubSub'
+)
+NOTIFICATIONS_PUBSUB_SOCKET_DIR = config('NOTIFICATIONS_PUBSUB_SOCKET_DIR', default='/tmp/finance-notifications')
+# Menor que el --timeout de gunicorn (120 s en start_render.sh)
+NOTIFICATIONS_STREAM_MAX_SECONDS = config('NOTIFICATIONS_STREAM_MAX_SECONDS', default=60, cast=int)
+NOTIFICATIONS_STREAM_KEEPALIVE_SECONDS = config('NOTIFICATIONS_STREAM_KEEPALIVE_SECONDS', default=15, cast=int)
+NOTIFICATIONS_STREAM_RETRY_MS = config('NOTIFICATIONS_STREAM_RETRY_MS', default=5000, cast=int)
+
+# Perfilado de SQL por petición (apps.common.middleware). Las peticiones que
+# superan algún umbral o repiten una misma consulta se registran en el logger
+# finance_api.sql como JSON. Por defecto se perfila una de cada diez
+# peticiones, y el header Server-Timing (que expone tiempos y número de
+# consultas a cualquier cliente) solo se envía con DEBUG.
+SQL_PROFILING_ENABLED = config('SQL_PROFILING_ENABLED', default=True, cast=bool)
+SQL_PROFILING_SAMPLE_RATE = config('SQL_PROFILING_SAMPLE_RATE', default=0.1, cast=float)
+SQL_PROFILING_SERVER_TIMING = config('SQL_PROFILING_SERVER_TIMING', default=DEBUG, cast=bool)
+SQL_PROFILING_SLOW_REQUEST_MS = config('SQL_PROFILING_SLOW_REQUEST_MS', default=500, cast=int)
+SQL_PROFILING_MAX_QUERIES = config('SQL_PROFILING_MAX_QUERIES', default=50, cast=int)
+SQL_PROFILING_DUPLICATE_THRESHOLD = config('SQL_PROFILING_DUPLICATE_THRESHOLD', default=5, cast=int)
+SQL_PROFILING_SLOW_QUERY_MS = config('SQL_PROFILING_SLOW_QUERY_MS', default=100, cast=int)
+
+# Métricas Prometheus (apps.common.metrics) expuestas en /metrics/ solo para
+# las IPs listadas. Con varios workers de gunicorn definir además
+# PROMETHEUS_MULTIPROC_DIR (ver start_render.sh).
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+
+# Chequeo de disponibilidad (/health/ready/): tiempo máximo de la consulta a
+# la base de datos, fracción del pool de conexiones del proceso ocupada que se
+# considera saturación y segundos que se reutiliza el resultado entre sondas
+HEALTH_CHECK_DB_TIMEOUT = config('HEALTH_CHECK_DB_TIMEOUT', default=2.0, cast=float)
+HEALTH_CHECK_DB_SATURATION = config('HEALTH_CHECK_DB_SATURATION', default=0.9, cast=float)
+HEALTH_CHECK_CACHE_SECONDS = config('HEALTH_CHECK_CACHE_SECONDS', default=5, cast=float)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'finance_api.sql': {
+            'handlers': ['console'],
+            'level': config('SQL_PROFILING_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Intervalo mínimo (segundos) entre recálculos completos del gasto de un presupuesto
+BUDGET_SPENDING_REFRESH_INTERVAL = config('BUDGET_SPENDING_REFRESH_INTERVAL', default=300, cast=int)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from apps.common.views import liveness_view, metrics_view, readiness_view
 
 def health_check(request):
     """Health check endpoint para Render"""
@@ -23,6 +24,9 @@ urlpatterns = [
     path('', health_check, name='health_check'),
     path('health/', health_check, name='health_check_alt'),
     path('api/health/', health_check, name='api_health_check'),
+    path('health/live/', liveness_view, name='liveness'),
+    path('health/ready/', readiness_view, name='readiness'),
+    path('metrics/', metrics_view, name='metrics'),
     path('admin/', admin.site.urls),
     path('api/auth/', include('apps.users.urls')),
     path('api/transactions/', include('apps.transactions.urls')),
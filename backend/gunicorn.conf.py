@@ -0,0 +1,14 @@
+"""
+Configuración de gunicorn.
+
+Con PROMETHEUS_MULTIPROC_DIR definido cada worker escribe sus métricas en
+ese directorio; al terminar un worker se marcan sus archivos como muertos
+para que los gauges no sigan sumando sus valores.
+"""
+import os
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
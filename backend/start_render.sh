@@ -1,13 +1,44 @@
 #!/bin/bash
 set -o errexit
 
-echo "Starting Gunicorn server..."
+# Directorio compartido por los workers para agregar las métricas Prometheus;
+# se vacía en cada arranque para no mezclar valores de procesos anteriores
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/finance-metrics}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# SERVER_MODE=asgi sirve finance_api.asgi con workers de uvicorn (vistas async).
+# SERVER_MODE=gthread usa hilos por worker; el stream SSE sigue desactivado
+# salvo que se defina NOTIFICATIONS_STREAM_ENABLED=True, y aun así cada proceso
+# abre como máximo NOTIFICATIONS_STREAM_MAX_CONNECTIONS streams. Con los
+# workers sync (por defecto) cada stream bloquearía un worker completo.
+THREADS=1
+case "${SERVER_MODE:-wsgi}" in
+    asgi)
+        APP=finance_api.asgi:application
+        WORKER_CLASS=uvicorn.workers.UvicornWorker
+        ;;
+    gthread)
+        APP=finance_api.wsgi:application
+        WORKER_CLASS=gthread
+        THREADS=${GUNICORN_THREADS:-8}
+        ;;
+    *)
+        APP=finance_api.wsgi:application
+        WORKER_CLASS=sync
+        ;;
+esac
+
+echo "Starting Gunicorn server ($APP)..."
 
 # Start Gunicorn
-exec gunicorn finance_api.wsgi:application \
+exec gunicorn "$APP" \
+    -c gunicorn.conf.py \
+    --worker-class "$WORKER_CLASS" \
     --bind 0.0.0.0:${PORT:-8000} \
     --workers 2 \
+    --threads "$THREADS" \
     --timeout 120 \
     --log-level info \
     --access-logfile - \
-    --error-logfile -
\ No newline at end of file
+    --error-logfile -
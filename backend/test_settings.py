@@ -7,3 +7,12 @@ DATABASES = {
         'NAME': ':memory:',
     }
 }
+
+# Los tests corren en un solo proceso
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'finance-api-tests',
+    }
+}
+CONDITIONAL_GET_ENABLED = True
@@ -9,16 +9,54 @@ const NotificationBell = () => {
   const [loading, setLoading] = useState(false);
 
   useEffect(() => {
-    fetchUnreadCount();
     fetchRecentNotifications();
-    
-    // Verificar notificaciones cada 5 minutos
-    const interval = setInterval(() => {
+
+    // Sin stream se mantiene la verificación cada 5 minutos
+    let interval = null;
+    const startPolling = () => {
+      if (interval) return;
       fetchUnreadCount();
-      fetchRecentNotifications();
-    }, 5 * 60 * 1000);
-    
-    return () => clearInterval(interval);
+      interval = setInterval(() => {
+        fetchUnreadCount();
+        fetchRecentNotifications();
+      }, 5 * 60 * 1000);
+    };
+
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return () => clearInterval(interval);
+    }
+
+    // El servidor envía el contador al conectar y cada notificación nueva;
+    // EventSource reconecta solo cuando el servidor cierra el stream
+    const source = new EventSource(`${api.defaults.baseURL}/notifications/stream/`, {
+      withCredentials: true,
+    });
+
+    source.addEventListener('unread_count', (event) => {
+      setUnreadCount(JSON.parse(event.data).unread_count);
+    });
+
+    source.addEventListener('notification', (event) => {
+      const { notification } = JSON.parse(event.data);
+      setNotifications((current) => [
+        notification,
+        ...current.filter((item) => item.id !== notification.id),
+      ].slice(0, 10));
+    });
+
+    // El servidor responde 204 cuando sus workers no pueden mantener el
+    // stream: EventSource se cierra sin reconectar y se pasa a consultar
+    source.addEventListener('error', () => {
+      if (source.readyState === EventSource.CLOSED) {
+        startPolling();
+      }
+    });
+
+    return () => {
+      source.close();
+      clearInterval(interval);
+    };
   }, []);
 
   const fetchUnreadCount = async () => {
@@ -42,8 +80,11 @@ const NotificationBell = () => {
   const markAsRead = async (notificationId) => {
     try {
       await api.post(`/notifications/notifications/${notificationId}/mark_read/`);
-      fetchUnreadCount();
-      fetchRecentNotifications();
+      // El stream envía luego el contador definitivo
+      setUnreadCount((count) => Math.max(count - 1, 0));
+      setNotifications((current) => current.map((item) => (
+        item.id === notificationId ? { ...item, leida: true } : item
+      )));
     } catch (error) {
       // Error silenciado
     }
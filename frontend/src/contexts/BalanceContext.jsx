@@ -1,5 +1,6 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { useAuth } from './AuthContext';
+import api from '../services/api';
 import { loansApi } from '../services/loansApi';
 
 const BalanceContext = createContext();
@@ -24,18 +25,12 @@ export const BalanceProvider = ({ children }) => {
     if (!user) return;
 
     try {
-      // Obtener transacciones del localStorage (por ahora)
-      const transactions = JSON.parse(localStorage.getItem(`transactions_${user.id}`) || '[]');
-      
-      // Calcular balance de transacciones
-      const transactionBalance = transactions.reduce((total, transaction) => {
-        return transaction.type === 'income' 
-          ? total + transaction.amount 
-          : total - transaction.amount;
-      }, 0);
-
-      // Obtener resumen de préstamos de la API
-      const loansResponse = await loansApi.getLoansSummary();
+      // Saldo acumulado precalculado en el servidor y resumen de préstamos
+      const [balanceResponse, loansResponse] = await Promise.all([
+        api.get('/transactions/balance/'),
+        loansApi.getLoansSummary()
+      ]);
+      const transactionBalance = Number(balanceResponse.data.saldo) || 0;
       const debt = loansResponse.data.remaining_debt || 0;
       const progress = loansResponse.data.completion_percentage || 0;
 